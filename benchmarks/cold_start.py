@@ -0,0 +1,51 @@
+"""Measure the time to the first command on a cold connection.
+
+Runs against the simulated controller, so the numbers reflect the library's
+own round trips under the configured link latency rather than real hardware.
+
+Usage: python benchmarks/cold_start.py [latency] [rounds]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import statistics
+import sys
+import time
+
+from bonaparte import Fireplace
+from bonaparte.testing import SimulatedFireplace
+
+
+async def time_to_first_command(latency: float) -> tuple[float, int]:
+    """Return the duration and round trips of the first command after connect."""
+    simulator = SimulatedFireplace(password="1234", latency=latency)
+    fireplace = Fireplace(simulator.ble_device, password="1234")
+    simulator.attach(fireplace)
+
+    start = time.perf_counter()
+    await fireplace.set_flame_height(3)
+    elapsed = time.perf_counter() - start
+    await fireplace.disconnect()
+    return elapsed, simulator.write_count
+
+
+async def main(latency: float, rounds: int) -> None:
+    """Run the benchmark and print a summary."""
+    samples = [await time_to_first_command(latency) for _ in range(rounds)]
+    durations = [duration for duration, _ in samples]
+    print(  # noqa: T201
+        f"time to first command (latency {latency * 1000:.0f} ms, {rounds} rounds):"
+        f" mean {statistics.mean(durations) * 1000:.1f} ms,"
+        f" median {statistics.median(durations) * 1000:.1f} ms,"
+        f" round trips {samples[0][1]}"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            float(sys.argv[1]) if len(sys.argv) > 1 else 0.05,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+        )
+    )
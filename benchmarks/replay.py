@@ -0,0 +1,64 @@
+"""Replay a recorded session and report the command latencies.
+
+The requests of every recorded connection are sent again in their recorded
+order. Run the same recording against two versions of the library to
+compare their throughput and latency on identical device behaviour.
+
+Usage: python benchmarks/replay.py recording [time_scale]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+
+from bleak.exc import BleakError
+
+from bonaparte import Fireplace
+from bonaparte.const import EfireCommand
+from bonaparte.exceptions import EfireException
+from bonaparte.replay import ReplayTransport, load_sessions
+from bonaparte.tracing import STAGE_TOTAL, CommandTracer
+
+
+async def main(path: str, time_scale: float) -> None:
+    """Replay the recording and print a summary."""
+    sessions = load_sessions(path)
+    transport = ReplayTransport(sessions, time_scale=time_scale)
+    fireplace = Fireplace(transport.ble_device)
+    transport.attach(fireplace)
+    tracer = CommandTracer()
+    fireplace.tracer = tracer
+
+    start = time.perf_counter()
+    commands = failures = 0
+    for session in sessions:
+        for exchange in session.exchanges:
+            request = exchange.request
+            commands += 1
+            try:
+                await fireplace.execute_command(request[3], request[4:-2] or None)
+            except (BleakError, EfireException):
+                failures += 1
+        await fireplace.disconnect()
+    elapsed = time.perf_counter() - start
+
+    print(  # noqa: T201
+        f"{commands} commands ({failures} failed) in {elapsed:.3f} s"
+    )
+    for (command, stage), histogram in sorted(tracer.histograms.items()):
+        if stage == STAGE_TOTAL:
+            try:
+                name = EfireCommand(command).name
+            except ValueError:
+                # opcodes unknown to the library may still be in a recording
+                name = f"{command:02x}"
+            print(  # noqa: T201
+                f"{name}: {histogram.count} commands,"
+                f" mean {histogram.mean * 1000:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 1.0))
@@ -4,6 +4,47 @@ from __future__ import annotations
 
 __version__ = "1.0.1"
 
-from .fireplace import Fireplace, FireplaceFeatures, FireplaceState
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
 
-__all__ = ["Fireplace", "FireplaceFeatures", "FireplaceState"]
+from .state import FireplaceSnapshot, FireplaceState
+
+if TYPE_CHECKING:
+    from .fireplace import Fireplace, FireplaceFeatures
+    from .fleet import FireplaceFleet, FleetResult
+    from .polling import AdaptivePoller
+
+__all__ = [
+    "AdaptivePoller",
+    "Fireplace",
+    "FireplaceFeatures",
+    "FireplaceFleet",
+    "FireplaceSnapshot",
+    "FireplaceState",
+    "FleetResult",
+]
+
+# Names of the Bluetooth and asyncio layer, loaded on first access so that
+# the protocol modules can be used without importing bleak or asyncio.
+_LAZY_IMPORTS = {
+    "AdaptivePoller": ".polling",
+    "Fireplace": ".fireplace",
+    "FireplaceFeatures": ".fireplace",
+    "FireplaceFleet": ".fleet",
+    "FleetResult": ".fleet",
+}
+
+
+def __getattr__(name: str) -> Any:
+    """Import the Bluetooth layer when one of its names is first used."""
+    if (module := _LAZY_IMPORTS.get(name)) is None:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    """List the public names including the lazily imported ones."""
+    return sorted({*globals(), *__all__})
@@ -0,0 +1,75 @@
+"""Circuit breaker for devices that keep failing to connect."""
+
+from __future__ import annotations
+
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_RESET_TIMEOUT = 30
+
+
+class CircuitBreaker:
+    """Fail fast while a device keeps failing to connect.
+
+    After ``failure_threshold`` consecutive failed connection attempts the
+    breaker opens and further attempts are rejected for ``reset_timeout``
+    seconds. The first attempt after that is a probe, which closes the breaker
+    if it succeeds and opens it again if it fails. A new advertisement of the
+    device allows a probe right away.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        reset_timeout: float = DEFAULT_RESET_TIMEOUT,
+    ) -> None:
+        """Initialize a closed breaker."""
+        if failure_threshold < 1:
+            msg = "Failure threshold must be at least 1"
+            raise ValueError(msg)
+        self._failure_threshold = failure_threshold
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._reset_timeout = reset_timeout
+
+    @property
+    def failures(self) -> int:
+        """Number of consecutive failed connection attempts."""
+        return self._failures
+
+    @property
+    def is_open(self) -> bool:
+        """Whether connection attempts are currently rejected."""
+        return self._opened_at is not None and not self._probing
+
+    def allow(self, now: float) -> bool:
+        """Return whether a connection attempt may be made at a monotonic time."""
+        if self._opened_at is None or self._probing:
+            return True
+        if now - self._opened_at >= self._reset_timeout:
+            self._probing = True
+            return True
+        return False
+
+    def retry_in(self, now: float) -> float:
+        """Return the seconds until the next attempt is allowed."""
+        if self._opened_at is None or self._probing:
+            return 0.0
+        return max(0.0, self._opened_at + self._reset_timeout - now)
+
+    def record_success(self) -> None:
+        """Close the breaker after a successful connection."""
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self, now: float) -> None:
+        """Count a failed connection attempt made at a monotonic time."""
+        self._failures += 1
+        if self._probing or self._failures >= self._failure_threshold:
+            self._opened_at = now
+            self._probing = False
+
+    def half_open(self) -> None:
+        """Allow a probe right away, for example after an advertisement."""
+        if self._opened_at is not None:
+            self._probing = True
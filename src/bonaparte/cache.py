@@ -0,0 +1,185 @@
+"""Persistent cache of what is known about devices, for fast cold starts."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import json
+import logging
+from pathlib import Path
+import time
+from typing import TYPE_CHECKING, Any
+
+from .state import PACKED_SIZE
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    import os
+
+    from .fireplace import Fireplace
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bumped whenever the meaning of the cached data changes, which discards
+# the cache files written before.
+CACHE_VERSION = 1
+
+
+@dataclass(slots=True)
+class DeviceProfile:
+    """Firmware versions, features and the last known state of a device.
+
+    ``state`` holds :attr:`FireplaceState.packed`, ``updated`` is the Unix
+    time the profile was taken.
+    """
+
+    ble_version: str = ""
+    mcu_version: str = ""
+    features: frozenset[str] = frozenset()
+    state: bytes | None = None
+    updated: float = field(default_factory=time.time)
+
+    def to_json(self) -> dict[str, Any]:
+        """Return the profile as JSON compatible data."""
+        return {
+            "ble_version": self.ble_version,
+            "mcu_version": self.mcu_version,
+            "features": sorted(self.features),
+            "state": None if self.state is None else self.state.hex(),
+            "updated": self.updated,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> DeviceProfile:
+        """Return a profile from the data written by :meth:`to_json`."""
+        state = None if data["state"] is None else bytes.fromhex(data["state"])
+        if state is not None and len(state) != PACKED_SIZE:
+            msg = f"Packed state must be {PACKED_SIZE} bytes, got {len(state)}"
+            raise ValueError(msg)
+        return cls(
+            ble_version=str(data["ble_version"]),
+            mcu_version=str(data["mcu_version"]),
+            features=frozenset(map(str, data["features"])),
+            state=state,
+            updated=float(data["updated"]),
+        )
+
+
+class ProfileCache:
+    """Device profiles by address, stored in a JSON file.
+
+    A cache file that cannot be read, or was written for another
+    :data:`CACHE_VERSION`, is ignored and replaced on the next :meth:`save`,
+    as are the entries that cannot be decoded.
+    """
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        """Initialize the cache from the file at ``path``, if it exists."""
+        self._dirty = False
+        self._path = Path(path)
+        self._profiles: dict[str, DeviceProfile] = {}
+        self._load()
+
+    @property
+    def path(self) -> Path:
+        """The path of the cache file."""
+        return self._path
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes that are not saved yet."""
+        return self._dirty
+
+    def __contains__(self, address: object) -> bool:
+        """Return whether a profile is cached for an address."""
+        return isinstance(address, str) and address.upper() in self._profiles
+
+    def __len__(self) -> int:
+        """Return the number of cached profiles."""
+        return len(self._profiles)
+
+    def get(self, address: str) -> DeviceProfile | None:
+        """Return the cached profile of the device with an address."""
+        return self._profiles.get(address.upper())
+
+    def put(self, address: str, profile: DeviceProfile) -> None:
+        """Cache the profile of the device with an address."""
+        self._profiles[address.upper()] = profile
+        self._dirty = True
+
+    def remove(self, address: str) -> None:
+        """Forget the profile of the device with an address."""
+        if self._profiles.pop(address.upper(), None) is not None:
+            self._dirty = True
+
+    def store(self, fireplace: Fireplace) -> None:
+        """Cache the current profile of a fireplace."""
+        self.put(fireplace.address, fireplace.profile())
+
+    def restore(self, fireplace: Fireplace) -> bool:
+        """Restore the cached profile of a fireplace.
+
+        Returns whether a profile was cached for it.
+        """
+        if (profile := self.get(fireplace.address)) is None:
+            return False
+        try:
+            fireplace.restore_profile(profile)
+        except ValueError:
+            _LOGGER.warning(
+                "[%s]: Discarding invalid cached profile", fireplace.name, exc_info=True
+            )
+            self.remove(fireplace.address)
+            return False
+        return True
+
+    def track(self, fireplace: Fireplace) -> Callable[[], None]:
+        """Restore the profile of a fireplace and keep it up to date.
+
+        The cached profile is updated in memory whenever the state of the
+        fireplace changes, call :meth:`save` to write it to the file.
+
+        Returns a function that stops tracking the fireplace.
+        """
+        self.restore(fireplace)
+        return fireplace.subscribe(lambda _changes: self.store(fireplace))
+
+    def save(self) -> None:
+        """Write the cached profiles to the file if they changed.
+
+        The file is replaced atomically, so it is never left half written.
+        """
+        if not self._dirty:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "devices": {
+                address: profile.to_json()
+                for address, profile in sorted(self._profiles.items())
+            },
+        }
+        temporary = self._path.with_name(f"{self._path.name}.tmp")
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        temporary.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        temporary.replace(self._path)
+        self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            _LOGGER.warning("Ignoring unreadable profile cache %s", self._path)
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            _LOGGER.debug("Ignoring profile cache %s of another version", self._path)
+            return
+        devices = data.get("devices")
+        if not isinstance(devices, dict):
+            _LOGGER.warning("Ignoring unreadable profile cache %s", self._path)
+            return
+        for address, entry in devices.items():
+            try:
+                self._profiles[address.upper()] = DeviceProfile.from_json(entry)
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.debug("Ignoring invalid cached profile of %s", address)
@@ -0,0 +1,358 @@
+"""Offline decoding of eFIRE traffic from Bluetooth HCI captures.
+
+Supported are btsnoop logs, as written by Android and by the BlueZ btmon
+monitor, and pcap files with the Bluetooth H4 link types, as written by
+Wireshark. Files are memory mapped and decoded one record at a time, so
+captures much larger than the available memory can be processed.
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+import logging
+import math
+import mmap
+from pathlib import Path
+import struct
+from typing import TYPE_CHECKING, Any
+
+from .const import (
+    QUERY_COMMANDS,
+    RESPONSE_HEADER,
+    EfireCommand,
+    LedState,
+    PowerState,
+    ReturnCode,
+)
+from .exceptions import CaptureFormatError
+from .parser import parse_ifc_cmd1_state, parse_ifc_cmd2_state, parse_led_color
+from .state import STATE_FIELDS, FireplaceState
+from .utils import FrameReassembler
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from os import PathLike
+
+_LOGGER = logging.getLogger(__name__)
+
+BTSNOOP_MAGIC = b"btsnoop\0"
+# microseconds between the btsnoop epoch (year 0) and the Unix epoch
+BTSNOOP_EPOCH_OFFSET = 0x00DCDDB30F2F8000
+BTSNOOP_H1 = 1001
+BTSNOOP_H4 = 1002
+BTSNOOP_MONITOR = 2001
+# opcodes of the BlueZ monitor, in the low 16 bits of the record flags
+MONITOR_ACL_TX = 0x04
+MONITOR_ACL_RX = 0x05
+
+PCAP_MAGIC_MICROSECONDS = 0xA1B2C3D4
+PCAP_MAGIC_NANOSECONDS = 0xA1B23C4D
+PCAP_H4 = 187
+PCAP_H4_WITH_PHDR = 201
+
+H4_ACL_DATA = 0x02
+ACL_CONTINUATION = 0x1
+ATT_CID = 0x0004
+ATT_WRITE_OPCODES = frozenset({0x12, 0x52})  # write request and command
+ATT_NOTIFY_OPCODES = frozenset({0x1B, 0x1D})  # notification and indication
+
+type Column = array[Any] | list[Any]
+type AclRecord = tuple[float, bytes]
+
+
+@dataclass(frozen=True, slots=True)
+class CapturedFrame:
+    """An eFIRE message found in a capture."""
+
+    timestamp: float
+    connection: int
+    message: bytes
+
+    @property
+    def is_response(self) -> bool:
+        """Whether the message was sent by the controller."""
+        return self.message[1] == RESPONSE_HEADER
+
+    @property
+    def command(self) -> int:
+        """The command byte of the message."""
+        return self.message[3]
+
+    @property
+    def data(self) -> bytes:
+        """The parameter or response data of the message."""
+        return self.message[4:-2]
+
+
+@dataclass(frozen=True, slots=True)
+class TimelineEvent:
+    """The outcome of a command and the resulting state of the fireplace.
+
+    ``timestamp`` is the time the outcome became known, that is when the
+    response was received or, for unanswered requests, when the request was
+    repeated or the capture ended. ``parameter`` and ``sent`` are ``None`` for
+    responses to requests that are not part of the capture.
+    """
+
+    timestamp: float
+    connection: int
+    command: int
+    parameter: bytes | None
+    response: bytes | None
+    sent: float | None
+    state: FireplaceState
+
+    @property
+    def latency(self) -> float | None:
+        """Time between request and response, if both were captured."""
+        if self.sent is None or self.response is None:
+            return None
+        return self.timestamp - self.sent
+
+    @property
+    def ok(self) -> bool:
+        """Whether the command was answered without a failure."""
+        if self.response is None:
+            return False
+        return self.command in QUERY_COMMANDS or self.response[:1] != bytes(
+            [ReturnCode.FAILURE]
+        )
+
+
+def read_frames(path: str | PathLike[str]) -> Iterator[CapturedFrame]:
+    """Yield the eFIRE messages in a btsnoop or pcap capture in order."""
+    reassemblers: dict[tuple[int, bool], FrameReassembler] = {}
+    for timestamp, connection, notified, value in _att_values(_acl_records(path)):
+        # requests and responses are reassembled separately per connection
+        key = (connection, notified)
+        if (reassembler := reassemblers.get(key)) is None:
+            reassembler = reassemblers[key] = FrameReassembler()
+        for message in reassembler.feed(value):
+            yield CapturedFrame(timestamp, connection, bytes(message))
+
+
+def decode_capture(path: str | PathLike[str]) -> Iterator[TimelineEvent]:
+    """Yield the state timeline of all fireplaces in a capture."""
+    return timeline(read_frames(path))
+
+
+def timeline(frames: Iterable[CapturedFrame]) -> Iterator[TimelineEvent]:
+    """Match requests to responses and track the state of each connection."""
+    pending: dict[tuple[int, int], tuple[float, bytes]] = {}
+    states: dict[int, FireplaceState] = {}
+    timestamp = 0.0
+
+    def event(
+        connection: int,
+        command: int,
+        response: bytes | None,
+        request: tuple[float, bytes] | None,
+    ) -> TimelineEvent:
+        if (state := states.get(connection)) is None:
+            state = states[connection] = FireplaceState()
+        parameter = None if request is None else request[1]
+        if response is not None:
+            _apply(state, command, parameter, response)
+        return TimelineEvent(
+            timestamp,
+            connection,
+            command,
+            parameter,
+            response,
+            None if request is None else request[0],
+            state.copy(),
+        )
+
+    for frame in frames:
+        timestamp = frame.timestamp
+        key = (frame.connection, frame.command)
+        if frame.is_response:
+            yield event(
+                frame.connection, frame.command, frame.data, pending.pop(key, None)
+            )
+        else:
+            if (unanswered := pending.get(key)) is not None:
+                yield event(frame.connection, frame.command, None, unanswered)
+            pending[key] = (timestamp, frame.data)
+    for (connection, command), unanswered in pending.items():
+        yield event(connection, command, None, unanswered)
+
+
+def to_columns(events: Iterable[TimelineEvent]) -> dict[str, Column]:
+    """Collect a timeline into one array per attribute for analysis.
+
+    Times are stored as ``float`` with ``nan`` for missing values. Numeric
+    and boolean state fields are stored as integer arrays, all other state
+    fields as lists.
+    """
+    columns: dict[str, Column] = {
+        "timestamp": array("d"),
+        "sent": array("d"),
+        "latency": array("d"),
+        "connection": array("H"),
+        "command": array("B"),
+        "ok": array("b"),
+    }
+    for name, default in FireplaceState().items():
+        columns[name] = array("q") if type(default) in {bool, int} else []
+    for event in events:
+        columns["timestamp"].append(event.timestamp)
+        columns["sent"].append(math.nan if event.sent is None else event.sent)
+        latency = event.latency
+        columns["latency"].append(math.nan if latency is None else latency)
+        columns["connection"].append(event.connection)
+        columns["command"].append(event.command)
+        columns["ok"].append(event.ok)
+        for name in STATE_FIELDS:
+            columns[name].append(getattr(event.state, name))
+    return columns
+
+
+def _apply(
+    state: FireplaceState, command: int, parameter: bytes | None, response: bytes
+) -> None:
+    """Update the state with the outcome of a command."""
+    try:
+        if command in QUERY_COMMANDS:
+            state.apply_query(command, response)
+        elif parameter and response[:1] == bytes([ReturnCode.SUCCESS]):
+            _apply_write(state, command, parameter)
+    except (IndexError, ValueError) as ex:
+        _LOGGER.debug("Unable to decode command %02x: %s", command, ex)
+
+
+def _apply_write(state: FireplaceState, command: int, parameter: bytes) -> None:
+    # the IFC set commands use the same layout as the query responses
+    match command:
+        case EfireCommand.SET_IFC_CMD1:
+            (
+                state.ifc_power,
+                state.thermostat,
+                state.night_light_brightness,
+                state.pilot,
+            ) = parse_ifc_cmd1_state(parameter)
+        case EfireCommand.SET_IFC_CMD2:
+            (
+                state.flame_height,
+                state.blower_speed,
+                state.aux,
+                state.split_flow,
+            ) = parse_ifc_cmd2_state(parameter)
+        case EfireCommand.SET_POWER:
+            state.bt_power = parameter[0] == PowerState.ON
+        case EfireCommand.SET_LED_POWER:
+            state.led = parameter == LedState.ON.long
+        case EfireCommand.SET_LED_COLOR:
+            state.led_color = parse_led_color(parameter)
+
+
+def _acl_records(path: str | PathLike[str]) -> Iterator[AclRecord]:
+    """Yield the timestamp and HCI ACL data of every record in a capture."""
+    with Path(path).open("rb") as file:
+        try:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as ex:
+            msg = f"Unable to map capture file {path}: {ex}"
+            raise CaptureFormatError(msg) from ex
+        with buffer:
+            if buffer[:8] == BTSNOOP_MAGIC:
+                yield from _btsnoop_records(buffer)
+            else:
+                yield from _pcap_records(buffer)
+
+
+def _btsnoop_records(buffer: mmap.mmap) -> Iterator[AclRecord]:
+    _version, datalink = struct.unpack_from(">II", buffer, 8)
+    if datalink not in {BTSNOOP_H1, BTSNOOP_H4, BTSNOOP_MONITOR}:
+        msg = f"Unsupported btsnoop datalink type {datalink}"
+        raise CaptureFormatError(msg)
+    offset = 16
+    size = len(buffer)
+    while offset + 24 <= size:
+        _original, length, flags, _drops, timestamp = struct.unpack_from(
+            ">IIIIq", buffer, offset
+        )
+        offset += 24
+        packet = buffer[offset : offset + length]
+        offset += length
+        seconds = (timestamp - BTSNOOP_EPOCH_OFFSET) / 1_000_000
+        if datalink == BTSNOOP_H4:
+            if packet[:1] == bytes([H4_ACL_DATA]):
+                yield seconds, packet[1:]
+        elif datalink == BTSNOOP_MONITOR:
+            # btmon stores the controller index in the high bits of the flags
+            if flags & 0xFFFF in {MONITOR_ACL_TX, MONITOR_ACL_RX}:
+                yield seconds, packet
+        elif not flags & 0x2:
+            # without H4 encapsulation, the flags tell data from commands
+            yield seconds, packet
+
+
+def _pcap_records(buffer: mmap.mmap) -> Iterator[AclRecord]:
+    if len(buffer) < 24:
+        msg = "Capture file is too short"
+        raise CaptureFormatError(msg)
+    for order in "<>":
+        (magic,) = struct.unpack_from(f"{order}I", buffer)
+        if magic in {PCAP_MAGIC_MICROSECONDS, PCAP_MAGIC_NANOSECONDS}:
+            break
+    else:
+        msg = "Capture file is neither a btsnoop nor a pcap file"
+        raise CaptureFormatError(msg)
+    resolution = 1e9 if magic == PCAP_MAGIC_NANOSECONDS else 1e6
+    (linktype,) = struct.unpack_from(f"{order}I", buffer, 20)
+    if linktype == PCAP_H4_WITH_PHDR:
+        # skip the direction pseudo header
+        skip = 4
+    elif linktype == PCAP_H4:
+        skip = 0
+    else:
+        msg = f"Unsupported pcap link type {linktype}"
+        raise CaptureFormatError(msg)
+    record = struct.Struct(f"{order}IIII")
+    offset = 24
+    size = len(buffer)
+    while offset + record.size <= size:
+        seconds, fraction, length, _original = record.unpack_from(buffer, offset)
+        offset += record.size
+        packet = buffer[offset + skip : offset + length]
+        offset += length
+        if packet[:1] == bytes([H4_ACL_DATA]):
+            yield seconds + fraction / resolution, packet[1:]
+
+
+def _att_values(
+    records: Iterable[AclRecord],
+) -> Iterator[tuple[float, int, bool, bytes]]:
+    """Yield the values of ATT writes and notifications in ACL data.
+
+    Every value is yielded with whether it was notified by the device.
+    """
+    partial: dict[int, bytearray] = {}
+    for timestamp, acl in records:
+        if len(acl) < 4:
+            continue
+        handle, length = struct.unpack_from("<HH", acl)
+        connection = handle & 0x0FFF
+        data = acl[4 : 4 + length]
+        if handle >> 12 & 0x3 == ACL_CONTINUATION:
+            if (pdu := partial.get(connection)) is None:
+                continue
+            pdu += data
+        else:
+            pdu = partial[connection] = bytearray(data)
+        if len(pdu) < 4:
+            continue
+        pdu_length, cid = struct.unpack_from("<HH", pdu)
+        if len(pdu) < pdu_length + 4:
+            # wait for the continuation fragments
+            continue
+        del partial[connection]
+        if cid != ATT_CID or pdu_length <= 3:
+            continue
+        opcode = pdu[4]
+        if opcode in ATT_WRITE_OPCODES or opcode in ATT_NOTIFY_OPCODES:
+            # skip the opcode and the attribute handle
+            value = bytes(pdu[7 : 4 + pdu_length])
+            yield timestamp, connection, opcode in ATT_NOTIFY_OPCODES, value
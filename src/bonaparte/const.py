@@ -13,6 +13,9 @@ RESPONSE_HEADER = 0xBB
 FOOTER = 0x55
 
 MIN_MESSAGE_LENGTH = 6
+# The longest messages exchanged with the controller are far shorter than the
+# 20 bytes of a single ATT payload at the default MTU
+MAX_MESSAGE_LENGTH = 20
 MAX_FLAME_HEIGHT = 6
 MAX_NIGHT_LIGHT_BRIGHTNESS = 6
 MAX_BLOWER_SPEED = 6
@@ -68,6 +71,12 @@ class EfireCommand(IntEnum):
     SET_PASSWORD = 0xF5
 
 
+# Read-only commands whose responses only depend on the device state
+QUERY_COMMANDS = frozenset(
+    command for command in EfireCommand if command.name.startswith("GET_")
+)
+
+
 class ReturnCode(IntEnum):
     """Enum encapsulating command return codes."""
 
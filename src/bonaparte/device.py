@@ -3,6 +3,9 @@
 from __future__ import annotations
 
 import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 import logging
 from typing import TYPE_CHECKING, Any, Concatenate
 
@@ -15,35 +18,57 @@ from bleak_retry_connector import (
     retry_bluetooth_connection_error,
 )
 
-from .const import (
-    FOOTER,
-    HEADER,
-    MIN_MESSAGE_LENGTH,
-    READ_CHAR_UUID,
-    REQUEST_HEADER,
-    RESPONSE_HEADER,
-    WRITE_CHAR_UUID,
-)
+from .breaker import CircuitBreaker
+from .const import QUERY_COMMANDS, READ_CHAR_UUID, WRITE_CHAR_UUID
 from .exceptions import (
     CharacteristicMissingError,
+    CommandTimeoutError,
+    DeviceUnreachableError,
     DisconnectedException,
+    EfireException,
     EfireMessageValueError,
 )
-from .utils import build_message, checksum_message
+from .keepalive import DISCONNECT_DELAY, FixedKeepAlive, KeepAlivePolicy
+from .scheduler import CommandScheduler, Priority
+from .tracing import (
+    STAGE_ATTEMPT,
+    STAGE_CONNECTED,
+    STAGE_ESTABLISHED,
+    STAGE_NOTIFYING,
+    STAGE_PREPARED,
+    STAGE_QUEUED,
+    STAGE_RESPONDED,
+    STAGE_WRITTEN,
+)
+from .utils import FIXED_FRAMES, Frame, FrameReassembler, validate_message
 
 if TYPE_CHECKING:
     from asyncio import AbstractEventLoop, Task
-    from collections.abc import Awaitable, Callable
+    from collections.abc import AsyncIterator, Awaitable, Callable
 
     from bleak.backends.characteristic import BleakGATTCharacteristic
     from bleak.backends.device import BLEDevice
     from bleak.backends.scanner import AdvertisementData
 
+    from .preconnect import PreconnectPolicy
+    from .scheduler import QueueMetrics
+    from .tracing import CommandTrace, CommandTracer
+
 _LOGGER = logging.getLogger(__name__)
 
 
-DISCONNECT_DELAY = 120
+# Set while a new connection is prepared, so the commands sent for it are not
+# taken for use of the device
+_CONNECTION_SETUP: ContextVar[bool] = ContextVar("connection_setup", default=False)
+
+# Set while an operation runs on a connection established ahead of its
+# commands, so the first of them is traced with the stages of connecting
+_CONNECTION_TRACE: ContextVar[list[CommandTrace] | None] = ContextVar(
+    "connection_trace", default=None
+)
+
 DEFAULT_ATTEMPTS = 3
+DEFAULT_RESPONSE_TIMEOUT = 10.0
 BLEAK_BACKOFF_TIME = 0.25
 
 
@@ -74,27 +99,76 @@ class EfireDevice:
     _is_connected: bool
     _address: str
     _notifications_started: bool
-    _notify_future: asyncio.Future[bytes] | None
+    _scheduler: CommandScheduler
     _read_char: BleakGATTCharacteristic | None
+    _response_futures: dict[int, asyncio.Future[Frame]]
     _write_char: BleakGATTCharacteristic | None
     _write_lock: asyncio.Lock
     _advertisement_data: AdvertisementData | None
 
     def __init__(
-        self, ble_device: BLEDevice, advertisement_data: AdvertisementData | None = None
+        self,
+        ble_device: BLEDevice,
+        advertisement_data: AdvertisementData | None = None,
+        *,
+        pipeline_depth: int = 1,
+        keep_alive: KeepAlivePolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        response_timeout: float | None = DEFAULT_RESPONSE_TIMEOUT,
+        command_timeout: float | None = None,
+        preconnect: PreconnectPolicy | None = None,
     ) -> None:
-        """Initialize the eFIRE Device."""
+        """Initialize the eFIRE Device.
+
+        ``pipeline_depth`` limits how many commands with distinct command bytes
+        may await their response at the same time. Commands waiting for the
+        pipeline are served by priority, set commands before background
+        queries. ``keep_alive`` decides when an idle connection is closed and
+        defaults to a :class:`~bonaparte.keepalive.FixedKeepAlive`.
+        ``circuit_breaker`` rejects commands while the device keeps failing to
+        connect.
+
+        A request that is not answered within ``response_timeout`` seconds
+        fails with a :class:`~bonaparte.exceptions.CommandTimeoutError` and
+        closes the connection, so the late response cannot be mistaken for the
+        response to a later request. ``command_timeout`` is the default
+        deadline of a whole call of :meth:`execute_command`, including waiting
+        for and establishing the connection.
+
+        With a ``preconnect`` policy, the device is connected in the background
+        when it is seen advertising and the policy expects it to be used soon.
+        """
+        if pipeline_depth < 1:
+            msg = "Pipeline depth must be at least 1"
+            raise ValueError(msg)
         self._address = ble_device.address
         self._advertisement_data = advertisement_data
         self._ble_device = ble_device
+        self._breaker = circuit_breaker or CircuitBreaker()
+        self._command_timeout = command_timeout
         self._connect_lock = asyncio.Lock()
         self._disconnect_timer: asyncio.TimerHandle | None = None
         self._disconnect_callbacks: list[Callable[[Any], None]] = []
+        self._command_locks: dict[int, asyncio.Lock] = {}
         self._expected_disconnect = False
+        self._inflight_queries: dict[int, Task[bytes]] = {}
         self._is_connected = False
+        self._keep_alive = keep_alive or FixedKeepAlive(DISCONNECT_DELAY)
+        self._preconnect = preconnect
+        self._preconnect_task: Task[None] | None = None
+        self._last_activity = 0.0
+        self._late_responses: dict[int, deque[float]] = {}
         self._loop: AbstractEventLoop | None = None
         self._notifications_started = False
+        self._reassembler = FrameReassembler(self._invalid_message_handler)
+        self._response_futures = {}
+        self._response_timeout = response_timeout
+        self._scheduler = CommandScheduler(pipeline_depth)
+        self._tracer: CommandTracer | None = None
         self._write_lock = asyncio.Lock()
+        self._connector: Callable[[], Awaitable[BleakClientWithServiceCache]] = (
+            self._establish_connection
+        )
 
     @property
     def name(self) -> str:
@@ -106,6 +180,11 @@ class EfireDevice:
         """The device's Bluetooth MAC address."""
         return self._address
 
+    @property
+    def is_connected(self) -> bool:
+        """Whether a connection to the device is currently established."""
+        return self._client is not None and self._client.is_connected
+
     @property
     def rssi(self) -> int | None:
         """Get the RSSI of the device."""
@@ -113,15 +192,107 @@ class EfireDevice:
             return self._advertisement_data.rssi
         return None
 
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """The circuit breaker guarding connection attempts."""
+        return self._breaker
+
+    @property
+    def queue_metrics(self) -> QueueMetrics:
+        """Queue depth and wait time statistics of the commands sent."""
+        return self._scheduler.metrics
+
+    @property
+    def tracer(self) -> CommandTracer | None:
+        """The tracer recording the stages of every command, if enabled."""
+        return self._tracer
+
+    @tracer.setter
+    def tracer(self, tracer: CommandTracer | None) -> None:
+        self._tracer = tracer
+
     def set_ble_device_and_advertisement_data(
         self, ble_device: BLEDevice, advertisement_data: AdvertisementData
     ) -> None:
-        """Set the BLE Device and advertisement data."""
+        """Set the BLE Device and advertisement data.
+
+        The advertisement shows the device is in range again, so an open
+        circuit breaker lets the next connection attempt through.
+        """
         self._ble_device = ble_device
         self._advertisement_data = advertisement_data
+        self._breaker.half_open()
+        self._maybe_preconnect()
+
+    def _maybe_preconnect(self) -> None:
+        """Connect in the background if the device is expected to be used."""
+        if (
+            self._preconnect is None
+            or self.is_connected
+            or self._connect_lock.locked()
+            or (self._preconnect_task is not None and not self._preconnect_task.done())
+        ):
+            return
+        loop = asyncio.get_running_loop()
+        if not self._preconnect.should_connect(loop.time()):
+            return
+        _LOGGER.debug("[%s]: Connecting ahead of use; RSSI: %s", self.name, self.rssi)
+        self._preconnect_task = loop.create_task(self._run_preconnect())
+
+    async def _run_preconnect(self) -> None:
+        try:
+            await self.prepare()
+        except (BleakError, TimeoutError, EfireException, EfireMessageValueError):
+            _LOGGER.debug(
+                "[%s]: Connecting ahead of use failed", self.name, exc_info=True
+            )
+
+    async def prepare(self) -> None:
+        """Connect now, so that the next command finds an established connection.
+
+        The connection is kept open like after any command.
+        """
+        await self._ensure_connected()
+
+    @asynccontextmanager
+    async def _connected_ahead(self) -> AsyncIterator[None]:
+        """Connect before an operation sends its commands.
+
+        While tracing, the stages of establishing the connection are recorded
+        in the trace of the first command sent within the context.
+        """
+        if self._tracer is None:
+            await self._ensure_connected()
+            yield
+            return
+        # the command is not known yet, its trace takes over the stages
+        trace = self._tracer.start(-1)
+        await self._ensure_connected(trace)
+        token = _CONNECTION_TRACE.set([trace])
+        try:
+            yield
+        finally:
+            _CONNECTION_TRACE.reset(token)
+
+    async def _establish_connection(self) -> BleakClientWithServiceCache:
+        """Establish a new connection to the device."""
+        return await establish_connection(
+            BleakClientWithServiceCache,
+            self._ble_device,
+            self.name,
+            self._disconnected,
+            use_services_cache=True,
+            ble_device_callback=lambda: self._ble_device,
+        )
+
+    async def _ensure_connected(
+        self, trace: CommandTrace | None = None, *, used: bool = False
+    ) -> None:
+        """Connect to the device and ensure we stay connected.
 
-    async def _ensure_connected(self) -> None:
-        """Connect to the device and ensure we stay connected."""
+        ``used`` tells the keep alive policy the device is used, as opposed to
+        connected for background queries or ahead of use.
+        """
         if self._connect_lock.locked():
             _LOGGER.debug(
                 "[%s]: Connection already in progress, waiting for it to complete;"
@@ -131,29 +302,44 @@ class EfireDevice:
             )
 
         if self._client and self._client.is_connected:
-            self._reset_disconnect_timer()
+            self._reset_disconnect_timer(used=used)
             return
 
         async with self._connect_lock:
             # Check again while holding the lock
             if self._client and self._client.is_connected:
-                self._reset_disconnect_timer()
+                self._reset_disconnect_timer(used=used)
                 return
+            now = asyncio.get_running_loop().time()
+            if not self._breaker.allow(now):
+                msg = (
+                    f"{self.name} failed to connect {self._breaker.failures} times,"
+                    f" next attempt in {self._breaker.retry_in(now):.0f} s"
+                )
+                raise DeviceUnreachableError(msg)
             _LOGGER.debug("[%s]: Connecting; RSSI: %s", self.name, self.rssi)
-            client = await establish_connection(
-                BleakClientWithServiceCache,
-                self._ble_device,
-                self.name,
-                self._disconnected,
-                use_services_cache=True,
-                ble_device_callback=lambda: self._ble_device,
-            )
+            try:
+                client = await self._connector()
+            except BLEAK_EXCEPTIONS:
+                self._breaker.record_failure(asyncio.get_running_loop().time())
+                if self._breaker.is_open:
+                    _LOGGER.debug(
+                        "[%s]: Failed to connect %s times, rejecting commands"
+                        " for now; RSSI: %s",
+                        self.name,
+                        self._breaker.failures,
+                        self.rssi,
+                    )
+                raise
+            self._breaker.record_success()
+            if trace is not None:
+                trace.mark(STAGE_ESTABLISHED)
             _LOGGER.debug("[%s]: Connected; RSSI: %s", self.name, self.rssi)
             self._write_char = client.services.get_characteristic(WRITE_CHAR_UUID)
             self._read_char = client.services.get_characteristic(READ_CHAR_UUID)
 
             self._client = client
-            self._reset_disconnect_timer()
+            self._reset_disconnect_timer(used=used)
 
             _LOGGER.debug(
                 "[%s]: Subscribe to notifications; RSSI: %s", self.name, self.rssi
@@ -162,46 +348,82 @@ class EfireDevice:
             if self._read_char is None:
                 msg = "Read Characteristic missing, aborting mission"
                 raise CharacteristicMissingError(msg)
+            self._reassembler.reset()
+            self._late_responses.clear()
             await client.start_notify(self._read_char, self._notification_handler)
-
-    def _reset_disconnect_timer(self) -> None:
-        """Reset disconnect timer."""
-        if self._disconnect_timer:
-            self._disconnect_timer.cancel()
+            if trace is not None:
+                trace.mark(STAGE_NOTIFYING)
+            token = _CONNECTION_SETUP.set(True)
+            try:
+                await self._on_connected()
+            finally:
+                _CONNECTION_SETUP.reset(token)
+            if trace is not None:
+                trace.mark(STAGE_PREPARED)
+
+    async def _on_connected(self) -> None:
+        """Prepare a new connection before it is used by other commands.
+
+        Called with the connect lock held, right after notifications have been
+        started. A request that fails while preparing the connection closes it,
+        and the failure is raised to the caller that is connecting.
+        """
+
+    def _reset_disconnect_timer(self, *, used: bool = False) -> None:
+        """Move the idle disconnect deadline after activity."""
         self._expected_disconnect = False
         if not self._loop:
             self._loop = asyncio.get_running_loop()
-        self._disconnect_timer = self._loop.call_later(
-            DISCONNECT_DELAY, self._timed_disconnect
-        )
+        self._last_activity = self._loop.time()
+        if used:
+            self._keep_alive.record_activity(self._last_activity)
+
+        # The armed timer is only moved if the deadline comes earlier now.
+        # Later deadlines are picked up lazily when the timer fires.
+        if (timeout := self._keep_alive.idle_timeout()) is None:
+            return
+        deadline = self._last_activity + timeout
+        if self._disconnect_timer is not None:
+            if self._disconnect_timer.when() <= deadline:
+                return
+            self._disconnect_timer.cancel()
+        self._disconnect_timer = self._loop.call_at(deadline, self._check_idle)
+
+    def _check_idle(self) -> None:
+        """Disconnect if the device has been idle past its deadline."""
+        assert self._loop is not None
+        self._disconnect_timer = None
+        if (timeout := self._keep_alive.idle_timeout()) is None:
+            return
+        deadline = self._last_activity + timeout
+        if self._loop.time() < deadline:
+            self._disconnect_timer = self._loop.call_at(deadline, self._check_idle)
+            return
+        self._timed_disconnect()
 
     def _disconnected(self, _client: BleakClientWithServiceCache) -> None:
         """Disconnected callback."""
-        pending_response = (
-            self._notify_future is not None and not self._notify_future.done()
-        )
+        pending_responses = [
+            future for future in self._response_futures.values() if not future.done()
+        ]
 
-        if self._expected_disconnect and not pending_response:
+        if self._expected_disconnect:
+            # the disconnect was started here, and runs the callbacks itself
             _LOGGER.debug(
                 "[%s]: Disconnected from device; RSSI: %s", self.name, self.rssi
             )
-            return
-
-        _LOGGER.warning(
-            "[%s]: Device unexpectedly disconnected; RSSI: %s",
-            self.name,
-            self.rssi,
-        )
+        else:
+            _LOGGER.warning(
+                "[%s]: Device unexpectedly disconnected; RSSI: %s",
+                self.name,
+                self.rssi,
+            )
+            for callback in self._disconnect_callbacks:
+                callback(self)
 
-        if pending_response:
-            # self._notify_future cannot be None if pending_response is true,
-            # but mypy doesn't know that, hence:
-            assert self._notify_future is not None
+        for future in pending_responses:
             msg = "Disconnected while response from device was pending"
-            self._notify_future.set_exception(DisconnectedException(msg))
-
-        for callback in self._disconnect_callbacks:
-            callback(self)
+            future.set_exception(DisconnectedException(msg))
 
     def _register_disconnect_callback[T: EfireDevice](
         self, callback: Callable[[T], None]
@@ -222,85 +444,115 @@ class EfireDevice:
         _LOGGER.debug(
             "[%s]: Disconnecting after timeout of %s",
             self.name,
-            DISCONNECT_DELAY,
+            self._keep_alive.idle_timeout(),
         )
         await self.disconnect()
 
     async def disconnect(self) -> None:
         """Disconnect from device."""
         async with self._connect_lock:
-            read_char = self._read_char
-            client = self._client
-            self._expected_disconnect = True
-            self._client = None
-            self._read_char = None
-            self._write_char = None
-            if client and client.is_connected:
-                if read_char:
-                    await client.stop_notify(read_char)
-                await client.disconnect()
+            await self._close_connection()
 
-            for callback in self._disconnect_callbacks:
-                callback(self)
+    async def _drop_connection(self) -> None:
+        """Disconnect after a failed request, to start over on a new connection.
+
+        The requests preparing a new connection run while the connect lock is
+        held for them, so their connection is closed without taking it.
+        """
+        if _CONNECTION_SETUP.get():
+            await self._close_connection()
+        else:
+            await self.disconnect()
+
+    async def _close_connection(self) -> None:
+        """Close the connection, with the connect lock held by the caller."""
+        if self._disconnect_timer is not None:
+            self._disconnect_timer.cancel()
+            self._disconnect_timer = None
+        read_char = self._read_char
+        client = self._client
+        self._expected_disconnect = True
+        self._client = None
+        self._read_char = None
+        self._write_char = None
+        if client and client.is_connected:
+            if read_char:
+                await client.stop_notify(read_char)
+            await client.disconnect()
+
+        for callback in self._disconnect_callbacks:
+            callback(self)
 
     def _validate_message(self, message: bytes | bytearray) -> None:
-        # the minimum message consists of 6 bytes:
-        # header, message_type, length, command, checksum, footer
-        # the payload is optional and not used in query commands
-        if len(message) < MIN_MESSAGE_LENGTH:
-            msg = (
-                f"Message too short. Got {len(message)} bytes, expected at least 6"
-                " bytes"
-            )
-            raise EfireMessageValueError(msg)
-        if message[0] != HEADER:
-            msg = f"Unknown message header {message[0]}. Expected {HEADER}."
-            raise EfireMessageValueError(msg)
-        if message[1] not in [REQUEST_HEADER, RESPONSE_HEADER]:
-            msg = (
-                f"Unknown message type {message[1]:02x}. Expected"
-                f" {REQUEST_HEADER:02x} or {RESPONSE_HEADER:02x}."
-            )
-            raise EfireMessageValueError(msg)
-        if message[2] != len(message) - 3:
-            msg = f"Incorrect message length {len(message)}. Expected {message[2] + 3}."
-            raise EfireMessageValueError(msg)
-        if message[-2] != checksum_message(message):
-            msg = (
-                f"Invalid checksum {message[-2]}. "
-                f"Calculated checksum {checksum_message(message)}."
-            )
-            raise EfireMessageValueError(msg)
-        if message[-1] != FOOTER:
-            msg = f"Invalid fooer {message[-1]}. Message should end with {FOOTER}."
-            raise EfireMessageValueError(msg)
+        validate_message(message)
 
     def _notification_handler(
         self, _char: BleakGATTCharacteristic, message: bytearray
     ) -> None:
-        _LOGGER.debug(
-            "[%s]: Receiving response via notify: %s (expected=%s)",
-            self.name,
-            message.hex(" "),
-            bool(self._notify_future),
-        )
-
-        if not self._notify_future:
-            # We have no consumer. We're done.
-            return
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "[%s]: Receiving response via notify: %s (pending=%s)",
+                self.name,
+                message.hex(" "),
+                [f"{command:02x}" for command in self._response_futures],
+            )
 
-        try:
-            self._validate_message(message)
-        except EfireMessageValueError as ex:
-            self._notify_future.set_exception(ex)
-            self._notify_future = None
-            return
-        self._notify_future.set_result(bytes(message))
-        self._notify_future = None
+        for response in self._reassembler.feed(message):
+            # responses echo the command byte of their request
+            command = response.command
+            if self._is_late_response(command):
+                _LOGGER.debug(
+                    "[%s]: Discarding late response to command %02x",
+                    self.name,
+                    command,
+                )
+                continue
+            future = self._response_futures.get(command)
+            if future is None or future.done():
+                # We have no consumer. We're done.
+                continue
+            future.set_result(response)
+
+    def _expect_late_response(self, command: int) -> None:
+        """Discard the next response to a command if it arrives soon.
+
+        A response that has not arrived within the response timeout is taken
+        to be lost, so it cannot hold back the responses to later requests.
+        """
+        window = self._response_timeout or DEFAULT_RESPONSE_TIMEOUT
+        expiry = asyncio.get_running_loop().time() + window
+        self._late_responses.setdefault(command, deque()).append(expiry)
+
+    def _is_late_response(self, command: int) -> bool:
+        """Return whether a response belongs to an abandoned request."""
+        if not (expiries := self._late_responses.get(command)):
+            return False
+        now = asyncio.get_running_loop().time()
+        while expiries and expiries[0] < now:
+            expiries.popleft()
+        if not expiries:
+            return False
+        expiries.popleft()
+        return True
+
+    def _invalid_message_handler(
+        self, message: bytes, ex: EfireMessageValueError
+    ) -> None:
+        _LOGGER.debug("[%s]: Discarding invalid message: %s", self.name, ex)
+        future = self._response_futures.get(message[3]) if len(message) > 3 else None
+        if future is None and len(self._response_futures) == 1:
+            # a garbled message can only be meant for the single pending request
+            future = next(iter(self._response_futures.values()))
+        if future is not None and not future.done():
+            future.set_exception(ex)
 
     @retry_bluetooth_connection_error(DEFAULT_ATTEMPTS)
-    async def _execute_locked(self, message: bytes | bytearray) -> bytes:
+    async def _execute_locked(
+        self, message: Frame, trace: CommandTrace | None = None
+    ) -> Frame:
         """Send command to device and read response."""
+        if trace is not None:
+            trace.mark(STAGE_ATTEMPT)
         if not self._write_char:
             msg = "Write characteristic missing"
             raise CharacteristicMissingError(msg)
@@ -309,12 +561,41 @@ class EfireDevice:
             msg = "Client is not initialized"
             raise BleakError(msg)
 
+        command = message.command
+        future: asyncio.Future[Frame] = asyncio.get_running_loop().create_future()
+        self._response_futures[command] = future
+        sent = False
         try:
-            future: asyncio.Future[bytes] = asyncio.Future()
-            self._notify_future = future
-
-            await self._client.write_gatt_char(self._write_char, message, response=True)
-            result = await future
+            async with self._write_lock:
+                sent = True
+                await self._client.write_gatt_char(
+                    self._write_char, message.view, response=True
+                )
+            if trace is not None:
+                trace.mark(STAGE_WRITTEN)
+            try:
+                async with asyncio.timeout(self._response_timeout):
+                    result = await future
+            except TimeoutError as ex:
+                msg = (
+                    f"No response to command {command:02x} within"
+                    f" {self._response_timeout} s"
+                )
+                raise CommandTimeoutError(msg) from ex
+            if trace is not None:
+                trace.mark(STAGE_RESPONDED)
+        except CommandTimeoutError as ex:
+            # The response may be lost or still on its way. Start over on a new
+            # connection, where it cannot be taken for a later response.
+            self._reassembler.reset()
+            _LOGGER.debug(
+                "[%s]: RSSI: %s; Disconnecting due to timeout: %s",
+                self.name,
+                self.rssi,
+                ex,
+            )
+            await self._drop_connection()
+            raise
         except BleakDBusError as ex:
             # Disconnect so we can reset state and try again
             await asyncio.sleep(BLEAK_BACKOFF_TIME)
@@ -325,7 +606,7 @@ class EfireDevice:
                 BLEAK_BACKOFF_TIME,
                 ex,
             )
-            await self.disconnect()
+            await self._drop_connection()
             raise
         except BleakError as ex:
             # Disconnect so we can reset state and try again
@@ -335,7 +616,7 @@ class EfireDevice:
                 self.rssi,
                 ex,
             )
-            await self.disconnect()
+            await self._drop_connection()
             raise
         except DisconnectedException as ex:
             _LOGGER.debug(
@@ -345,30 +626,51 @@ class EfireDevice:
                 ex,
             )
             raise
+        finally:
+            if self._response_futures.get(command) is future:
+                del self._response_futures[command]
+            if (
+                sent
+                and self._client is not None
+                and (future.cancelled() or future.cancel())
+            ):
+                # the response may still arrive, and must not be taken for the
+                # response to the next request with the same command byte
+                self._expect_late_response(command)
         return result
 
     async def _execute(
         self,
-        message: bytes | bytearray,
-    ) -> bytes:
+        message: Frame,
+        trace: CommandTrace | None = None,
+        priority: Priority = Priority.USER,
+    ) -> Frame:
         """Send command to device and read response."""
-        await self._ensure_connected()
-
-        _LOGGER.debug(
-            "[%s]: Sending message %s",
-            self.name,
-            message.hex(" "),
-        )
-        if self._write_lock.locked():
+        # the commands preparing a connection are part of connecting
+        used = priority is Priority.USER and not _CONNECTION_SETUP.get()
+        await self._ensure_connected(trace, used=used)
+        if trace is not None:
+            trace.mark(STAGE_CONNECTED)
+
+        # the frame is only formatted if debug logging is enabled
+        _LOGGER.debug("[%s]: Sending message %s", self.name, message)
+        # responses can only be told apart by their command byte, so only
+        # requests for distinct commands may be pending at the same time
+        command = message.command
+        if (command_lock := self._command_locks.get(command)) is None:
+            command_lock = self._command_locks[command] = asyncio.Lock()
+        if command_lock.locked() or self._scheduler.locked():
             _LOGGER.debug(
                 "[%s]: Operation already in progress, waiting for it to complete;"
                 " RSSI: %s",
                 self.name,
                 self.rssi,
             )
-        async with self._write_lock:
+        async with command_lock, self._scheduler.slot(priority):
+            if trace is not None:
+                trace.mark(STAGE_QUEUED)
             try:
-                return await self._execute_locked(message)
+                return await self._execute_locked(message, trace)
             except BleakNotFoundError:
                 _LOGGER.exception(
                     "[%s]: device not found, no longer in range, or poor RSSI: %s",
@@ -389,23 +691,106 @@ class EfireDevice:
                 _LOGGER.debug("[%s]: communication failed", self.name, exc_info=True)
                 raise
 
+    async def _execute_traced(
+        self, message: Frame, tracer: CommandTracer, priority: Priority
+    ) -> Frame:
+        """Send a message while recording the time spent in each stage."""
+        trace = tracer.start(message.command)
+        if connection := _CONNECTION_TRACE.get():
+            # the first command after connecting ahead of it
+            trace.prepend(connection.pop())
+        try:
+            response = await self._execute(message, trace, priority)
+        except BaseException as ex:
+            tracer.finish(trace, ex)
+            raise
+        tracer.finish(trace)
+        return response
+
     async def execute_command(
-        self, command: int, parameter: int | bytes | bytearray | None = None
+        self,
+        command: int,
+        parameter: int | bytes | bytearray | None = None,
+        *,
+        timeout: float | None = None,
     ) -> bytes:
-        """Execute a command on the device."""
-        payload = bytearray([command])
-
-        if parameter:
+        """Execute a command on the device.
+
+        Queries are sent with background priority and shared with an identical
+        query that is already queued or in flight. All other commands go ahead
+        of queued queries.
+
+        The call fails with a :class:`~bonaparte.exceptions.CommandTimeoutError`
+        if it does not complete within ``timeout`` seconds, which defaults to
+        the ``command_timeout`` of the device. A shared query keeps running for
+        the other callers when one of them times out.
+        """
+        if self._preconnect is not None and not _CONNECTION_SETUP.get():
+            self._preconnect.record_activity(asyncio.get_running_loop().time())
+        if timeout is None:
+            timeout = self._command_timeout
+        deadline = asyncio.timeout(timeout)
+        try:
+            async with deadline:
+                if parameter is None and command in QUERY_COMMANDS:
+                    return await self._execute_query(command)
+                return await self._execute_command(command, parameter)
+        except TimeoutError as ex:
+            if not deadline.expired():
+                raise
+            msg = f"Command {command:02x} did not complete within {timeout} s"
+            raise CommandTimeoutError(msg) from ex
+
+    async def _execute_query(self, command: int) -> bytes:
+        """Execute a query, sharing the result with concurrent identical queries."""
+        if (task := self._inflight_queries.get(command)) is None:
+            task = asyncio.create_task(
+                self._execute_command(command, priority=Priority.BACKGROUND)
+            )
+            self._inflight_queries[command] = task
+            task.add_done_callback(
+                lambda done: self._query_done(command, done),
+            )
+        else:
+            self._scheduler.metrics.coalesced += 1
+            _LOGGER.debug(
+                "[%s]: Query %02x already queued or in flight, awaiting its result",
+                self.name,
+                command,
+            )
+        # shield the shared query so one cancelled caller does not cancel it for
+        # every other caller waiting on the same result
+        return await asyncio.shield(task)
+
+    def _query_done(self, command: int, task: Task[bytes]) -> None:
+        """Forget a finished query so the next caller starts a fresh one."""
+        if self._inflight_queries.get(command) is task:
+            del self._inflight_queries[command]
+        if not task.cancelled():
+            # retrieve the exception in case every caller has been cancelled
+            task.exception()
+
+    async def _execute_command(
+        self,
+        command: int,
+        parameter: int | bytes | bytearray | None = None,
+        priority: Priority = Priority.USER,
+    ) -> bytes:
+        """Build and send a command and return the response payload."""
+        if parameter is None:
+            parameter = b""
+        elif isinstance(parameter, int):
             # for convenience we allow using just a single hex value (aka int) as well
-            if isinstance(parameter, int):
-                payload = payload + bytes([parameter])
-            else:
-                payload = payload + parameter
-
-        message = build_message(payload)
-        self._validate_message(message)
-        response = await self._execute(message)
-        self._validate_message(response)
-
-        # return just the response payload sans overhead
-        return response[4:-2]
+            parameter = bytes([parameter])
+
+        if (message := FIXED_FRAMES.get(bytes([command, *parameter]))) is None:
+            message = Frame.encode(command, parameter)
+
+        if self._tracer is None:
+            response = await self._execute(message, priority=priority)
+        else:
+            response = await self._execute_traced(message, self._tracer, priority)
+
+        # the response was validated when it was received, return just its
+        # payload sans overhead
+        return bytes(response.payload)
@@ -29,3 +29,19 @@ class EfireMessageValueError(ValueError):
 
 class CharacteristicMissingError(EfireException):
     """For when a required BLE GATT characteristic is missing."""
+
+
+class CaptureFormatError(ValueError):
+    """For when a capture file cannot be decoded."""
+
+
+class ReplayMismatchError(EfireException):
+    """For when a replayed session does not match the recording."""
+
+
+class DeviceUnreachableError(EfireException):
+    """For when a device is not contacted because it keeps failing to connect."""
+
+
+class CommandTimeoutError(EfireException, TimeoutError):
+    """For when a command does not complete before its deadline."""
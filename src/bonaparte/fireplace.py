@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import asyncio
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar, copy_context
 from dataclasses import dataclass, fields as dc_fields
 import logging
-from typing import TYPE_CHECKING, Concatenate
+import time
+from typing import TYPE_CHECKING, Any, Concatenate
 
+from bleak.exc import BleakError
+
+from .cache import DeviceProfile
 from .const import (
     MAX_BLOWER_SPEED,
     MAX_FLAME_HEIGHT,
@@ -19,8 +26,14 @@ from .const import (
     PowerState,
     ReturnCode,
 )
-from .device import EfireDevice
-from .exceptions import AuthError, CommandFailedException, FeatureNotSupported
+from .device import DEFAULT_RESPONSE_TIMEOUT, EfireDevice
+from .exceptions import (
+    AuthError,
+    CommandFailedException,
+    EfireException,
+    EfireMessageValueError,
+    FeatureNotSupported,
+)
 from .parser import (
     parse_ble_version,
     parse_ifc_cmd1_state,
@@ -30,12 +43,25 @@ from .parser import (
     parse_mcu_version,
     parse_timer,
 )
+from .scheduler import Priority
+from .state import QUERY_FIELDS, STATE_FIELDS, FireplaceState
 
 if TYPE_CHECKING:
-    from collections.abc import Awaitable, Callable
+    from collections.abc import (
+        Awaitable,
+        Callable,
+        Coroutine,
+        Iterable,
+        Iterator,
+        Mapping,
+    )
 
     from bleak.backends.device import BLEDevice
 
+    from .breaker import CircuitBreaker
+    from .keepalive import KeepAlivePolicy
+    from .preconnect import PreconnectPolicy
+
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -49,22 +75,31 @@ def needs_auth[T, **P](
     async def _authenticated_operation(
         self: Fireplace, *args: P.args, **kwargs: P.kwargs
     ) -> T:
-        if not self._is_authenticated:  # pylint: disable=protected-access
-            _LOGGER.debug(
-                "[%s]: Command %s requires authentication. Attempting authentication.",
-                self.name,
-                func.__name__,
-            )
-            auth_result = await self.authenticate(
-                self._password  # pylint: disable=protected-access
-            )
-            if not auth_result:
-                msg = (
-                    "Command requires authentication but authentication was"
-                    " not successful"
+        password = self._password  # pylint: disable=protected-access
+        # new connections are authenticated while they are established
+        connecting = (
+            self._connected_ahead()  # pylint: disable=protected-access
+            if not self._is_authenticated  # pylint: disable=protected-access
+            and password is not None
+            and not self.is_connected
+            else nullcontext()
+        )
+        async with connecting:
+            if not self._is_authenticated:  # pylint: disable=protected-access
+                _LOGGER.debug(
+                    "[%s]: Command %s requires authentication."
+                    " Attempting authentication.",
+                    self.name,
+                    func.__name__,
                 )
-                raise AuthError(msg)
-        return await func(self, *args, **kwargs)
+                if not (password is not None and await self.authenticate(password)):
+                    msg = (
+                        "Command requires authentication but authentication was"
+                        " not successful"
+                    )
+                    raise AuthError(msg)
+            with self._state_update():  # pylint: disable=protected-access
+                return await func(self, *args, **kwargs)
 
     return _authenticated_operation
 
@@ -81,48 +116,27 @@ class FireplaceFeatures:
     timer: bool = False
 
 
-@dataclass
-class FireplaceState:
-    """State of each component in the fireplace."""
+type StateCallback = Callable[[dict[str, Any]], None]
 
-    aux: bool = False
-    ble_version: str = ""
-    blower_speed: int = 0
-    bt_power: bool = False
-    flame_height: int = 0
-    ifc_power: bool = False
-    led_color: tuple[int, int, int] = (0, 0, 0)
-    led_mode: LedMode = LedMode.HOLD
-    led: bool = False
-    mcu_version: str = ""
-    night_light_brightness: int = 0
-    pilot: bool = False
-    remote_in_use: bool = False
-    split_flow: bool = False
-    thermostat: bool = False
-    time_left: tuple[int, int, int] = (0, 0, 0)
-    timer: bool = False
+# Key of the fields awaiting confirmation in the changes reported to subscribers
+PENDING = "pending"
 
-    def __init__(self, *, compatibility_mode: bool = True) -> None:
-        """Initialize the fireplace state."""
-        self._compatibility_mode = compatibility_mode
-
-    @property
-    def power(self) -> bool:
-        """Return whether the fireplace is considered turned on."""
-        if self._compatibility_mode:
-            return self.bt_power
-
-        return self.ifc_power and self.flame_height > 0
+# The fireplaces with a state update in progress in the current context. The
+# tasks of an update, like pipelined queries, inherit it and are reported with
+# the update, while concurrent updates are reported on their own.
+_UPDATING: ContextVar[frozenset[Fireplace]] = ContextVar(
+    "updating", default=frozenset()
+)
 
 
 class Fireplace(EfireDevice):
     """A class representing the fireplace with state and actions."""
 
+    _confirmed: dict[int, float]
     _features: FireplaceFeatures
     _is_authenticated: bool
     _state: FireplaceState
-    _password: str
+    _password: str | None
 
     def __init__(
         self,
@@ -130,19 +144,70 @@ class Fireplace(EfireDevice):
         features: FireplaceFeatures | None = None,
         *,
         compatibility_mode: bool = True,
+        state_ttls: Mapping[EfireCommand, float] | None = None,
+        pipeline_depth: int = 1,
+        password: str | None = None,
+        keep_alive: KeepAlivePolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        response_timeout: float | None = DEFAULT_RESPONSE_TIMEOUT,
+        command_timeout: float | None = None,
+        preconnect: PreconnectPolicy | None = None,
+        write_debounce: float = 0.0,
+        timer_resync: float = 300.0,
+        optimistic: bool = False,
     ) -> None:
-        """Initialize a fireplace."""
-        super().__init__(ble_device)
+        """Initialize a fireplace.
+
+        ``state_ttls`` maps state query commands to the number of seconds a
+        confirmed value is considered fresh by :meth:`update_state`.
+
+        With a ``write_debounce`` window in seconds, the IFC settings changed
+        within the window are sent as a single write.
+
+        A running timer is counted down locally and only read again by
+        :meth:`update_state` every ``timer_resync`` seconds, or once the local
+        countdown has run out.
+
+        In ``optimistic`` mode, the fields changed by a write stay pending until
+        a background read of the same state confirms or corrects them.
+
+        If a ``password`` is known, every new connection is authenticated
+        before it is used.
+        """
+        super().__init__(
+            ble_device,
+            pipeline_depth=pipeline_depth,
+            keep_alive=keep_alive,
+            circuit_breaker=circuit_breaker,
+            response_timeout=response_timeout,
+            command_timeout=command_timeout,
+            preconnect=preconnect,
+        )
 
         self._compatibility_mode = compatibility_mode
         self._features = features or FireplaceFeatures()
+        self._confirmed = {}
+        self._state_ttls = dict(state_ttls or {})
+        self._timer_resync = timer_resync
 
         self._is_authenticated = False
+        self._optimistic = optimistic
+        self._password = password
+        self._pending: dict[EfireCommand, frozenset[str]] = {}
+        self._read_backs: dict[EfireCommand, asyncio.Task[None]] = {}
+        self._write_generations: dict[EfireCommand, int] = {}
+        self._written_states: dict[EfireCommand, FireplaceState] = {}
+        self._pending_writes: dict[EfireCommand, asyncio.Task[bool]] = {}
+        self._write_debounce = write_debounce
         self._state = FireplaceState(compatibility_mode=self._compatibility_mode)
+        self._published = self._state.copy()
+        self._published_pending: frozenset[str] = frozenset()
+        self._subscribers: list[tuple[StateCallback, frozenset[str] | None]] = []
         self._disconnect_callbacks: list[Callable[[Fireplace], None]] = []
 
         def disconnected_callback(self: Fireplace) -> None:
             self._is_authenticated = False
+            self._confirmed.clear()
 
         self._register_disconnect_callback(disconnected_callback)
 
@@ -171,11 +236,121 @@ class Fireplace(EfireDevice):
         """Whether the split flow valve control is enabled."""
         return self._features.split_flow
 
+    @property
+    def write_debounce(self) -> float:
+        """Window in seconds within which IFC settings are written together."""
+        return self._write_debounce
+
+    @write_debounce.setter
+    def write_debounce(self, window: float) -> None:
+        self._write_debounce = window
+
     @property
     def state(self) -> FireplaceState:
         """The state of this fireplace."""
         return self._state
 
+    @property
+    def pending_fields(self) -> frozenset[str]:
+        """Fields written in optimistic mode that are not yet confirmed."""
+        return frozenset().union(*self._pending.values())
+
+    def subscribe(
+        self, callback: StateCallback, fields: Iterable[str] | None = None
+    ) -> Callable[[], None]:
+        """Subscribe to changes of the fireplace state.
+
+        The callback is called once per update with a dictionary of the
+        changed state fields and their new values. If ``fields`` is given, only
+        changes to those fields are reported. Callbacks are scheduled on the
+        event loop rather than run while the update is being processed.
+
+        In optimistic mode, changes of :attr:`pending_fields` are reported with
+        the ``"pending"`` key, which can also be selected in ``fields``.
+
+        Returns a function that removes the subscription.
+        """
+        field_set = None if fields is None else frozenset(fields)
+        if field_set is not None and not field_set <= {*STATE_FIELDS, PENDING}:
+            msg = f"Invalid state fields: {field_set - {*STATE_FIELDS, PENDING}}"
+            raise ValueError(msg)
+        subscription = (callback, field_set)
+        if not self._subscribers:
+            # changes are not tracked while nobody is subscribed
+            self._published = self._state.copy()
+            self._published_pending = self.pending_fields
+        self._subscribers.append(subscription)
+
+        def unsubscribe() -> None:
+            self._subscribers.remove(subscription)
+
+        return unsubscribe
+
+    @contextmanager
+    def _state_update(self) -> Iterator[None]:
+        """Group the state changes of an operation into a single notification.
+
+        Updates nested in the operation, including those of the tasks it waits
+        for, are reported with it. Once the operation finishes, every change
+        since the last notification is reported, so a concurrent operation
+        that takes long does not hold back the others.
+        """
+        updating = _UPDATING.get()
+        if self in updating:
+            yield
+            return
+        token = _UPDATING.set(updating | {self})
+        try:
+            yield
+        finally:
+            _UPDATING.reset(token)
+            self._publish_changes()
+
+    def _create_task[T](self, coro: Coroutine[Any, Any, T]) -> asyncio.Task[T]:
+        """Start a background task whose state updates are reported on their own."""
+        context = copy_context()
+        context.run(_UPDATING.set, _UPDATING.get() - {self})
+        return asyncio.create_task(coro, context=context)
+
+    def _publish_changes(self) -> None:
+        """Schedule the callbacks of subscribers interested in changed fields."""
+        if not self._subscribers:
+            # the state is compared from the first subscription on
+            return
+        changes = self._state.changes(self._published)
+        if (pending := self.pending_fields) != self._published_pending:
+            changes[PENDING] = pending
+        if not changes:
+            return
+        self._published = self._state.copy()
+        self._published_pending = pending
+        loop: asyncio.AbstractEventLoop | None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # outside of the event loop, like when restoring a cached profile
+            # before starting it, the callbacks are run right away
+            loop = None
+        for callback, field_set in self._subscribers:
+            relevant = changes
+            if field_set is not None:
+                relevant = {
+                    name: value for name, value in changes.items() if name in field_set
+                }
+                if not relevant:
+                    continue
+            if loop is None:
+                self._run_subscriber(callback, relevant)
+            else:
+                loop.call_soon(self._run_subscriber, callback, relevant)
+
+    def _run_subscriber(self, callback: StateCallback, changes: dict[str, Any]) -> None:
+        try:
+            callback(changes)
+        # a failing subscriber must not keep the others from being notified
+        except Exception:  # pylint: disable=broad-exception-caught
+            _LOGGER.exception("[%s]: Error in state subscriber", self.name)
+
     @property
     def features(self) -> FireplaceFeatures:
         """Featureset of this fireplace."""
@@ -195,6 +370,115 @@ class Fireplace(EfireDevice):
         self._features = new_featureset
         return self._features
 
+    def profile(self) -> DeviceProfile:
+        """Return the firmware versions, features and state to cache."""
+        return DeviceProfile(
+            ble_version=self._state.ble_version,
+            mcu_version=self._state.mcu_version,
+            features=frozenset(
+                field.name
+                for field in dc_fields(self._features)
+                if getattr(self._features, field.name)
+            ),
+            state=self._state.packed,
+        )
+
+    def restore_profile(self, profile: DeviceProfile) -> None:
+        """Restore the firmware versions, features and state from a cache.
+
+        The restored state is served right away but is not considered fresh,
+        so :meth:`update_state` still reads it from the device.
+        """
+        self.set_features(set(profile.features))
+        with self._state_update():
+            self._state.ble_version = profile.ble_version
+            self._state.mcu_version = profile.mcu_version
+            if profile.state is not None:
+                self._state.packed = profile.state
+
+    def _mark_fresh(self, *commands: EfireCommand) -> None:
+        """Record that the state read by the query commands was just confirmed."""
+        now = time.monotonic()
+        for command in commands:
+            self._confirmed[command] = now
+            self._pending.pop(command, None)
+
+    def _written(self, command: EfireCommand, *, success: bool = True) -> None:
+        """Record a write of the state read by a query command.
+
+        In optimistic mode the written fields are confirmed by a read in the
+        background, even if the write failed, as the state may already have
+        been changed in anticipation of it.
+        """
+        if self._optimistic:
+            self._read_back_later(command)
+        elif success:
+            self._mark_fresh(command)
+
+    def _read_back_later(self, command: EfireCommand) -> None:
+        """Mark the fields read by a query command pending until read back."""
+        self._pending[command] = QUERY_FIELDS[command]
+        self._write_generations[command] = self._write_generations.get(command, 0) + 1
+        self._written_states[command] = self._state.copy()
+        task = self._read_backs.get(command)
+        if task is None or task.done():
+            self._read_backs[command] = self._create_task(self._read_back(command))
+
+    async def _read_back(self, command: EfireCommand) -> None:
+        """Read back the state written last and confirm or correct it.
+
+        The state is read again if another write completed in the meantime.
+        If the fields were changed locally since the last write, the result is
+        dropped, as the write of that change reads them back itself. If the
+        read fails, the fields are no longer pending but not confirmed either,
+        so the next :meth:`update_state` reads them.
+        """
+        while True:
+            generation = self._write_generations[command]
+            try:
+                # not shared with a query that may have been sent before the write
+                result = await self._execute_command(
+                    command, priority=Priority.BACKGROUND
+                )
+            except (
+                BleakError,
+                TimeoutError,
+                EfireException,
+                EfireMessageValueError,
+            ):
+                if generation != self._write_generations[command]:
+                    continue
+                _LOGGER.debug(
+                    "[%s]: Read back of %02x failed, leaving it to the next update",
+                    self.name,
+                    command,
+                    exc_info=True,
+                )
+                del self._written_states[command]
+                with self._state_update():
+                    self._pending.pop(command, None)
+                return
+            if generation == self._write_generations[command]:
+                break
+        written = self._written_states.pop(command)
+        if any(
+            getattr(self._state, name) != getattr(written, name)
+            for name in QUERY_FIELDS[command]
+        ):
+            return
+        with self._state_update():
+            self._state.apply_query(command, result)
+            self._mark_fresh(command)
+
+    def _is_fresh(self, command: EfireCommand, max_age: float | None) -> bool:
+        """Whether the state read by a query command was confirmed recently."""
+        if max_age is None:
+            max_age = self._state_ttls.get(command, 0.0)
+            if command == EfireCommand.GET_TIMER and self._state.counting_down:
+                max_age = max(max_age, self._timer_resync)
+        confirmed = self._confirmed.get(command)
+        return confirmed is not None and time.monotonic() - confirmed < max_age
+
     async def _simple_command(
         self, command: int, parameter: int | bytes | bytearray | None = None
     ) -> bool:
@@ -203,7 +487,56 @@ class Fireplace(EfireDevice):
 
         return result[0] == ReturnCode.SUCCESS
 
+    async def _debounced_write(
+        self, command: EfireCommand, write: Callable[[], Awaitable[bool]]
+    ) -> bool:
+        """Join the pending write of a command or start a new one.
+
+        The write is sent once the debounce window has passed and carries the
+        state at that time, so every caller within the window shares the
+        result of the write of their final values.
+        """
+        if not self._write_debounce:
+            return await write()
+        task = self._pending_writes.get(command)
+        if task is None or task.done():
+            task = self._create_task(self._write_after_debounce(command, write))
+            self._pending_writes[command] = task
+            task.add_done_callback(self._debounced_write_done)
+        else:
+            _LOGGER.debug(
+                "[%s]: Joining pending write of command %02x", self.name, command
+            )
+        # a cancelled caller must not cancel the write for the other callers
+        return await asyncio.shield(task)
+
+    async def _write_after_debounce(
+        self, command: EfireCommand, write: Callable[[], Awaitable[bool]]
+    ) -> bool:
+        await asyncio.sleep(self._write_debounce)
+        # changes from now on need a write of their own
+        del self._pending_writes[command]
+        return await write()
+
+    @staticmethod
+    def _debounced_write_done(task: asyncio.Task[bool]) -> None:
+        if not task.cancelled():
+            # retrieve the exception in case every caller has been cancelled
+            task.exception()
+
     async def _ifc_cmd1(self) -> bool:
+        """Write the current IFC CMD1 state, debounced if configured."""
+        return await self._debounced_write(
+            EfireCommand.SET_IFC_CMD1, self._send_ifc_cmd1
+        )
+
+    async def _ifc_cmd2(self) -> bool:
+        """Write the current IFC CMD2 state, debounced if configured."""
+        return await self._debounced_write(
+            EfireCommand.SET_IFC_CMD2, self._send_ifc_cmd2
+        )
+
+    async def _send_ifc_cmd1(self) -> bool:
         """Call the IFC CMD1 function with the current fireplace state."""
         # NOTE: The BT controller does not actually pass through the ifc_power
         # bit to the IFC
@@ -217,11 +550,12 @@ class Fireplace(EfireDevice):
             ]
         )
         result = await self._simple_command(EfireCommand.SET_IFC_CMD1, payload)
+        self._written(EfireCommand.GET_IFC_CMD1_STATE, success=result)
 
         _LOGGER.debug("[%s]: CMD1 command result: %s", self.name, result)
         return result
 
-    async def _ifc_cmd2(self) -> bool:
+    async def _send_ifc_cmd2(self) -> bool:
         """Call the IFC CMD2 function with the current fireplace state."""
         data = (
             (self._state.split_flow << 7)
@@ -231,10 +565,19 @@ class Fireplace(EfireDevice):
         )
         payload = bytearray([0x0, data])
         result = await self._simple_command(EfireCommand.SET_IFC_CMD2, payload)
+        self._written(EfireCommand.GET_IFC_CMD2_STATE, success=result)
 
         _LOGGER.debug("[%s]: CMD2 command result: %s", self.name, result)
         return result
 
+    async def _on_connected(self) -> None:
+        """Authenticate a new connection as part of establishing it."""
+        if self._password is None:
+            return
+        _LOGGER.debug("[%s]: Authenticating new connection", self.name)
+        if not await self.authenticate(self._password):
+            _LOGGER.warning("[%s]: Authentication of new connection failed", self.name)
+
     async def authenticate(self, password: str) -> bool:
         """Authenticate with the fireplace."""
         response = await self.execute_command(
@@ -280,6 +623,9 @@ class Fireplace(EfireDevice):
                 else:
                     self._state.blower_speed = 0
                     self._state.flame_height = 0
+                self._written(EfireCommand.GET_POWER_STATE)
+                if self._optimistic:
+                    self._read_back_later(EfireCommand.GET_IFC_CMD2_STATE)
             return result
 
         # Custom power behavior implementation
@@ -427,6 +773,9 @@ class Fireplace(EfireDevice):
             parameter = parameter + 0x5
 
         result = await self._simple_command(EfireCommand.SET_LED_MODE, parameter)
+        if result and on:
+            self._state.led_mode = light_mode
+            self._written(EfireCommand.GET_LED_MODE)
         return result == ReturnCode.SUCCESS
 
     @needs_auth
@@ -440,6 +789,11 @@ class Fireplace(EfireDevice):
         ret_sync = await self._simple_command(
             EfireCommand.SYNC_TIME, bytes([hours, minutes, False])
         )
+        if ret_timer:
+            self._state.time_left = (hours, minutes, 0)
+            self._state.timer = enabled
+            self._state.start_countdown()
+            self._mark_fresh(EfireCommand.GET_TIMER)
 
         return ret_timer and ret_sync
 
@@ -450,9 +804,13 @@ class Fireplace(EfireDevice):
             msg = f"Fireplace {self.name} does not have a LED controller"
             raise FeatureNotSupported(msg)
 
-        return await self._simple_command(
+        result = await self._simple_command(
             EfireCommand.SET_LED_COLOR, bytes([color[0], color[1], color[2]])
         )
+        if result:
+            self._state.led_color = color
+            self._written(EfireCommand.GET_LED_COLOR)
+        return result
 
     @needs_auth
     async def set_led_state(self, *, on: bool) -> bool:
@@ -461,10 +819,14 @@ class Fireplace(EfireDevice):
             msg = f"Fireplace {self.name} does not have a LED controller"
             raise FeatureNotSupported(msg)
 
-        return await self._simple_command(
+        result = await self._simple_command(
             EfireCommand.SET_LED_POWER,
             LedState.ON.long if on else LedState.OFF.long,
         )
+        if result:
+            self._state.led = on
+            self._written(EfireCommand.GET_LED_STATE)
+        return result
 
     @needs_auth
     async def led_on(self) -> bool:
@@ -513,6 +875,7 @@ class Fireplace(EfireDevice):
         result = await self.execute_command(EfireCommand.GET_LED_STATE)
 
         self._state.led = result == LedState.ON.long
+        self._mark_fresh(EfireCommand.GET_LED_STATE)
 
     # E1
     @needs_auth
@@ -521,6 +884,7 @@ class Fireplace(EfireDevice):
         result = await self.execute_command(EfireCommand.GET_LED_COLOR)
 
         self._state.led_color = parse_led_color(result)
+        self._mark_fresh(EfireCommand.GET_LED_COLOR)
 
     # E2
     @needs_auth
@@ -529,6 +893,7 @@ class Fireplace(EfireDevice):
         result = await self.execute_command(EfireCommand.GET_LED_MODE)
 
         self._state.led_mode = LedMode(bytes(result))
+        self._mark_fresh(EfireCommand.GET_LED_MODE)
 
     # E3
     @needs_auth
@@ -545,6 +910,7 @@ class Fireplace(EfireDevice):
             self._state.night_light_brightness,
             self._state.pilot,
         ) = parse_ifc_cmd1_state(result)
+        self._mark_fresh(EfireCommand.GET_IFC_CMD1_STATE)
 
     # E4
     @needs_auth
@@ -557,6 +923,7 @@ class Fireplace(EfireDevice):
             self._state.aux,
             self._state.split_flow,
         ) = parse_ifc_cmd2_state(result)
+        self._mark_fresh(EfireCommand.GET_IFC_CMD2_STATE)
 
     # E6
     @needs_auth
@@ -564,6 +931,8 @@ class Fireplace(EfireDevice):
         """Update the state of the timer."""
         result = await self.execute_command(EfireCommand.GET_TIMER)
         self._state.time_left, self._state.timer = parse_timer(result)
+        self._state.start_countdown()
+        self._mark_fresh(EfireCommand.GET_TIMER)
 
     # E7
     @needs_auth
@@ -572,6 +941,7 @@ class Fireplace(EfireDevice):
         result = await self.execute_command(EfireCommand.GET_POWER_STATE)
 
         self._state.bt_power = result[0] == PowerState.ON
+        self._mark_fresh(EfireCommand.GET_POWER_STATE)
 
     # EB
     @needs_auth
@@ -591,7 +961,7 @@ class Fireplace(EfireDevice):
         """Update the remote control override state."""
         result = await self.execute_command(EfireCommand.GET_REMOTE_USAGE)
 
-        self._state.remote_in_use = result == AuxControlState.USED
+        self._state.remote_in_use = result[0] == AuxControlState.USED
 
     # F2
     @needs_auth
@@ -609,20 +979,40 @@ class Fireplace(EfireDevice):
 
         return parse_mcu_version(result)
 
-    async def update_state(self) -> None:
-        """Update all state, depending on selected features."""
-        await self.update_ifc_cmd1_state()
-        await self.update_ifc_cmd2_state()
+    @needs_auth
+    async def update_state(self, max_age: float | None = None) -> None:
+        """Update all state, depending on selected features.
+
+        State confirmed by a read or write within the last ``max_age`` seconds
+        is not queried again. Without ``max_age`` the configured state TTLs
+        apply. The queries are pipelined up to the configured pipeline depth.
+        """
+        updates: list[tuple[EfireCommand, Callable[[], Awaitable[None]]]] = [
+            (EfireCommand.GET_IFC_CMD1_STATE, self.update_ifc_cmd1_state),
+            (EfireCommand.GET_IFC_CMD2_STATE, self.update_ifc_cmd2_state),
+        ]
         if self._compatibility_mode:
-            await self.update_power_state()
+            updates.append((EfireCommand.GET_POWER_STATE, self.update_power_state))
         if self._features.timer:
-            await self.update_timer_state()
+            updates.append((EfireCommand.GET_TIMER, self.update_timer_state))
         if self._features.led_lights:
-            await self.update_led_state()
-            await self.update_led_color()
-            await self.update_led_controller_mode()
+            updates.extend(
+                [
+                    (EfireCommand.GET_LED_STATE, self.update_led_state),
+                    (EfireCommand.GET_LED_COLOR, self.update_led_color),
+                    (EfireCommand.GET_LED_MODE, self.update_led_controller_mode),
+                ]
+            )
+        await asyncio.gather(
+            *(
+                update()
+                for command, update in updates
+                if not self._is_fresh(command, max_age)
+            )
+        )
 
     async def update_firmware_version(self) -> None:
         """Update firmware version strings."""
-        self._state.mcu_version = await self.query_mcu_version()
-        self._state.ble_version = await self.query_ble_version()
+        with self._state_update():
+            self._state.mcu_version = await self.query_mcu_version()
+            self._state.ble_version = await self.query_ble_version()
@@ -0,0 +1,204 @@
+"""Management of many fireplaces from a single process."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Iterable, Iterator
+
+    from .fireplace import Fireplace
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 3
+DEFAULT_CONNECT_INTERVAL = 0.5
+
+
+@dataclass
+class FleetResult[T]:
+    """Per-device outcome of an operation run across the fleet."""
+
+    results: dict[str, T] = field(default_factory=dict)
+    errors: dict[str, BaseException] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        """Whether the operation succeeded on every device."""
+        return not self.errors
+
+
+class FireplaceFleet:
+    """A set of fireplaces that are polled and controlled together.
+
+    Operations run concurrently on all fireplaces, but at most
+    ``max_connections`` of them are connected through the fleet at the same
+    time. A fireplace keeps its connection slot while it stays connected
+    after an operation, and the least recently used idle fireplace is
+    disconnected when another one needs the slot. Connections to
+    disconnected fireplaces are started at least ``connect_interval``
+    seconds apart.
+    """
+
+    def __init__(
+        self,
+        fireplaces: Iterable[Fireplace] = (),
+        *,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        connect_interval: float = DEFAULT_CONNECT_INTERVAL,
+    ) -> None:
+        """Initialize the fleet."""
+        if max_connections < 1:
+            msg = "Fleet needs at least one connection slot"
+            raise ValueError(msg)
+        self._active: dict[str, int] = {}
+        self._connect_interval = connect_interval
+        self._connect_lock = asyncio.Lock()
+        # fireplaces holding a connection slot, least recently used first
+        self._connections: dict[str, Fireplace] = {}
+        self._fireplaces: dict[str, Fireplace] = {}
+        self._max_connections = max_connections
+        self._next_connect = 0.0
+        self._slots = asyncio.Condition()
+        for fireplace in fireplaces:
+            self.add(fireplace)
+
+    def __len__(self) -> int:
+        """Return the number of fireplaces in the fleet."""
+        return len(self._fireplaces)
+
+    def __iter__(self) -> Iterator[Fireplace]:
+        """Iterate over the fireplaces in the fleet."""
+        return iter(self._fireplaces.values())
+
+    def __getitem__(self, address: str) -> Fireplace:
+        """Return the fireplace with the given address."""
+        return self._fireplaces[address]
+
+    def add(self, fireplace: Fireplace) -> None:
+        """Add a fireplace to the fleet."""
+        self._fireplaces[fireplace.address] = fireplace
+
+    def remove(self, address: str) -> Fireplace:
+        """Remove a fireplace from the fleet and return it.
+
+        The fireplace stays connected, but no longer holds a connection slot
+        once its running operations have finished.
+        """
+        fireplace = self._fireplaces.pop(address)
+        if not self._active.get(address):
+            # Nobody waits for the slot of an idle fireplace, as the waiters
+            # are woken up whenever a slot becomes idle.
+            self._connections.pop(address, None)
+        return fireplace
+
+    async def execute[T](
+        self, action: Callable[[Fireplace], Awaitable[T]]
+    ) -> FleetResult[T]:
+        """Run an action on every fireplace and collect the outcomes."""
+        fireplaces = list(self._fireplaces.values())
+        outcomes = await asyncio.gather(
+            *(self._run(fireplace, action) for fireplace in fireplaces),
+            return_exceptions=True,
+        )
+        result: FleetResult[T] = FleetResult()
+        for fireplace, outcome in zip(fireplaces, outcomes, strict=True):
+            if isinstance(outcome, BaseException):
+                _LOGGER.debug(
+                    "[%s]: Fleet operation failed: %r", fireplace.name, outcome
+                )
+                result.errors[fireplace.address] = outcome
+            else:
+                result.results[fireplace.address] = outcome
+        return result
+
+    async def refresh(self, max_age: float | None = None) -> FleetResult[None]:
+        """Update the state of every fireplace."""
+        return await self.execute(lambda fireplace: fireplace.update_state(max_age))
+
+    async def power_off(self) -> FleetResult[bool]:
+        """Power off every fireplace."""
+        return await self.execute(lambda fireplace: fireplace.power_off())
+
+    @property
+    def connections(self) -> int:
+        """Number of fireplaces holding a connection slot."""
+        return len(self._connections)
+
+    async def _run[T](
+        self, fireplace: Fireplace, action: Callable[[Fireplace], Awaitable[T]]
+    ) -> T:
+        idle = await self._acquire_slot(fireplace)
+        try:
+            if idle is not None:
+                _LOGGER.debug(
+                    "[%s]: Disconnecting to free a connection slot for %s",
+                    idle.name,
+                    fireplace.name,
+                )
+                await idle.disconnect()
+            if not fireplace.is_connected:
+                await self._wait_for_connect_turn()
+            return await action(fireplace)
+        finally:
+            await self._release_slot(fireplace)
+
+    async def _acquire_slot(self, fireplace: Fireplace) -> Fireplace | None:
+        """Wait until the fireplace holds a connection slot.
+
+        Returns the idle fireplace whose slot was taken over, which the caller
+        disconnects without holding up the other slots.
+        """
+        address = fireplace.address
+        idle = None
+        async with self._slots:
+            while address not in self._connections:
+                self._prune_connections()
+                if len(self._connections) < self._max_connections:
+                    break
+                idle = next(
+                    (
+                        holder
+                        for holder in self._connections.values()
+                        if not self._active.get(holder.address)
+                    ),
+                    None,
+                )
+                if idle is not None:
+                    del self._connections[idle.address]
+                    break
+                await self._slots.wait()
+            # the most recently used fireplace is disconnected last
+            self._connections[address] = self._connections.pop(address, fireplace)
+            self._active[address] = self._active.get(address, 0) + 1
+        return idle
+
+    async def _release_slot(self, fireplace: Fireplace) -> None:
+        """Keep the slot of a fireplace that is still connected for reuse."""
+        address = fireplace.address
+        async with self._slots:
+            self._active[address] -= 1
+            if not self._active[address]:
+                del self._active[address]
+                if address not in self._fireplaces:
+                    # removed from the fleet while the operation was running
+                    self._connections.pop(address, None)
+            self._prune_connections()
+            self._slots.notify_all()
+
+    def _prune_connections(self) -> None:
+        """Free the slots of idle fireplaces that have disconnected."""
+        for address, holder in list(self._connections.items()):
+            if not holder.is_connected and not self._active.get(address):
+                del self._connections[address]
+
+    async def _wait_for_connect_turn(self) -> None:
+        """Space out connection attempts to avoid overwhelming the adapter."""
+        loop = asyncio.get_running_loop()
+        async with self._connect_lock:
+            if (delay := self._next_connect - loop.time()) > 0:
+                await asyncio.sleep(delay)
+            self._next_connect = loop.time() + self._connect_interval
@@ -0,0 +1,95 @@
+"""Policies deciding how long an idle connection is kept open."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import deque
+import statistics
+
+DISCONNECT_DELAY = 120
+
+
+class KeepAlivePolicy(ABC):
+    """Base class for idle disconnect policies."""
+
+    def record_activity(self, now: float) -> None:
+        """Record that a user command was sent at the given monotonic time.
+
+        Background queries, like those of a poller, are not recorded.
+        """
+
+    @abstractmethod
+    def idle_timeout(self) -> float | None:
+        """Return the idle time in seconds after which to disconnect.
+
+        ``None`` keeps the connection open indefinitely.
+        """
+
+
+class FixedKeepAlive(KeepAlivePolicy):
+    """Disconnect after a fixed period of inactivity."""
+
+    def __init__(self, timeout: float = DISCONNECT_DELAY) -> None:
+        """Initialize the policy."""
+        self._timeout = timeout
+
+    def idle_timeout(self) -> float:
+        """Return the fixed idle timeout."""
+        return self._timeout
+
+
+class AlwaysConnected(KeepAlivePolicy):
+    """Never disconnect because of inactivity."""
+
+    def idle_timeout(self) -> None:
+        """Keep the connection open indefinitely."""
+        return
+
+
+class AdaptiveKeepAlive(KeepAlivePolicy):
+    """Derive the idle timeout from the observed gaps between commands.
+
+    Commands closer together than ``burst_window`` seconds count as a single
+    interaction. If recent interactions are usually at most ``max_timeout``
+    seconds apart (after applying ``factor`` as a margin), the connection is
+    kept open long enough to bridge the typical gap. Otherwise it is released
+    after ``min_timeout`` seconds so the adapter slot can be used by other
+    devices. Only the commands sent for the user are taken into account, so
+    background polling alone does not keep the connection open.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_timeout: float = 15,
+        max_timeout: float = 600,
+        factor: float = 1.5,
+        burst_window: float = 5,
+        history: int = 8,
+    ) -> None:
+        """Initialize the policy."""
+        self._burst_window = burst_window
+        self._factor = factor
+        self._gaps: deque[float] = deque(maxlen=history)
+        self._last_activity: float | None = None
+        self._max_timeout = max_timeout
+        self._min_timeout = min_timeout
+
+    def record_activity(self, now: float) -> None:
+        """Record the gap since the previous interaction."""
+        if (
+            self._last_activity is not None
+            and (gap := now - self._last_activity) > self._burst_window
+        ):
+            self._gaps.append(gap)
+        self._last_activity = now
+
+    def idle_timeout(self) -> float:
+        """Return a timeout that bridges the typical gap between interactions."""
+        if len(self._gaps) < 2:
+            return DISCONNECT_DELAY
+        if (
+            timeout := statistics.median(self._gaps) * self._factor
+        ) > self._max_timeout:
+            return self._min_timeout
+        return max(self._min_timeout, timeout)
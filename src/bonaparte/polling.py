@@ -0,0 +1,171 @@
+"""Polling of the fireplace state at an interval adapted to its activity."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from typing import TYPE_CHECKING, Any
+
+from bleak.exc import BleakError
+
+from .exceptions import EfireException, EfireMessageValueError
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from .fireplace import Fireplace
+
+_LOGGER = logging.getLogger(__name__)
+
+DEFAULT_FAST_INTERVAL = 5.0
+DEFAULT_ACTIVE_PERIOD = 60.0
+DEFAULT_REMOTE_INTERVAL = 15.0
+DEFAULT_INTERVAL = 60.0
+DEFAULT_MAX_INTERVAL = 900.0
+DEFAULT_BACKOFF = 2.0
+
+
+class AdaptivePoller:
+    """Poll the state of a fireplace more often while it is in use.
+
+    For ``active_period`` seconds after a state change, whether caused by a
+    write or detected by a poll, the state is polled every ``fast_interval``
+    seconds. While the physical remote is in use it is polled every
+    ``remote_interval`` seconds. A fireplace that is on is otherwise polled
+    every ``interval`` seconds, while for one that is idle and off the interval
+    grows by ``backoff`` after each poll, up to ``max_interval`` seconds.
+
+    A poll that fails to reach the fireplace, or gets an invalid response, is
+    retried at the next interval. Any other error stops the poller and is
+    raised by :meth:`stop`.
+    """
+
+    def __init__(
+        self,
+        fireplace: Fireplace,
+        *,
+        fast_interval: float = DEFAULT_FAST_INTERVAL,
+        active_period: float = DEFAULT_ACTIVE_PERIOD,
+        remote_interval: float = DEFAULT_REMOTE_INTERVAL,
+        interval: float = DEFAULT_INTERVAL,
+        max_interval: float = DEFAULT_MAX_INTERVAL,
+        backoff: float = DEFAULT_BACKOFF,
+        track_remote: bool = True,
+    ) -> None:
+        """Initialize the poller."""
+        if backoff < 1:
+            msg = "Backoff factor must be at least 1"
+            raise ValueError(msg)
+        self._active_period = active_period
+        self._backoff = backoff
+        self._fast_interval = fast_interval
+        self._fireplace = fireplace
+        self._idle_polls = 0
+        self._interval = interval
+        self._last_activity: float | None = None
+        self._max_interval = max_interval
+        self._polled = False
+        self._remote_interval = remote_interval
+        self._task: asyncio.Task[None] | None = None
+        self._track_remote = track_remote
+        self._unsubscribe: Callable[[], None] | None = None
+        self._wake = asyncio.Event()
+
+    @property
+    def is_running(self) -> bool:
+        """Whether the poller is running."""
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start polling in the background."""
+        if self.is_running:
+            return
+        self._unsubscribe = self._fireplace.subscribe(self._state_changed)
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop polling and wait for the poller to finish."""
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        if (task := self._task) is None:
+            return
+        self._task = None
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    def notify_activity(self) -> None:
+        """Switch to fast polling, for example after a write."""
+        self._last_activity = asyncio.get_running_loop().time()
+        self._idle_polls = 0
+        self._wake.set()
+
+    def next_interval(self) -> float:
+        """Return the time in seconds until the next poll."""
+        if self._is_active():
+            return self._fast_interval
+        state = self._fireplace.state
+        if state.remote_in_use:
+            return self._remote_interval
+        if state.power:
+            return self._interval
+        return min(self._max_interval, self._interval * self._backoff**self._idle_polls)
+
+    def _is_active(self) -> bool:
+        last_activity = self._last_activity
+        return (
+            last_activity is not None
+            and asyncio.get_running_loop().time() - last_activity < self._active_period
+        )
+
+    def _is_idle(self) -> bool:
+        state = self._fireplace.state
+        return not (self._is_active() or state.remote_in_use or state.power)
+
+    async def poll(self) -> None:
+        """Update the state of the fireplace once."""
+        await self._fireplace.update_state()
+        if self._track_remote:
+            await self._fireplace.update_remote_usage()
+
+    def _state_changed(self, changes: dict[str, Any]) -> None:
+        if not self._polled:
+            # the first poll replaces the defaults, which is no activity
+            return
+        _LOGGER.debug(
+            "[%s]: State changed, polling faster: %s", self._fireplace.name, changes
+        )
+        self.notify_activity()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except (BleakError, TimeoutError, EfireException, EfireMessageValueError):
+                _LOGGER.debug(
+                    "[%s]: Polling failed", self._fireplace.name, exc_info=True
+                )
+            # let subscribers see the changes detected by this poll
+            await asyncio.sleep(0)
+            self._polled = True
+            interval = self.next_interval()
+            self._idle_polls = self._idle_polls + 1 if self._is_idle() else 0
+            _LOGGER.debug(
+                "[%s]: Next poll in %.1f seconds", self._fireplace.name, interval
+            )
+            await self._sleep(interval)
+
+    async def _sleep(self, interval: float) -> None:
+        """Sleep until the next poll, shortened by any new activity."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + interval
+        while (remaining := deadline - loop.time()) > 0:
+            self._wake.clear()
+            try:
+                async with asyncio.timeout(remaining):
+                    await self._wake.wait()
+            except TimeoutError:
+                return
+            deadline = min(deadline, loop.time() + self._fast_interval)
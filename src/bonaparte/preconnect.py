@@ -0,0 +1,71 @@
+"""Policies deciding when to connect to a device ahead of its use."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime, time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+DEFAULT_ACTIVITY_WINDOW = 600
+
+
+class PreconnectPolicy(ABC):
+    """Base class for policies connecting when a device is seen advertising."""
+
+    def record_activity(self, now: float) -> None:
+        """Record that a command was sent at the given monotonic time."""
+
+    @abstractmethod
+    def should_connect(self, now: float) -> bool:
+        """Return whether to connect to a device seen at a monotonic time."""
+
+
+class RecentActivityPreconnect(PreconnectPolicy):
+    """Connect ahead of use if the device was used within ``window`` seconds."""
+
+    def __init__(self, window: float = DEFAULT_ACTIVITY_WINDOW) -> None:
+        """Initialize the policy."""
+        self._last_activity: float | None = None
+        self._window = window
+
+    def record_activity(self, now: float) -> None:
+        """Remember the time of the latest command."""
+        self._last_activity = now
+
+    def should_connect(self, now: float) -> bool:
+        """Connect if the latest command is recent enough."""
+        return (
+            self._last_activity is not None
+            and now - self._last_activity <= self._window
+        )
+
+
+class ScheduledPreconnect(PreconnectPolicy):
+    """Connect ahead of use during daily periods of local time.
+
+    ``periods`` are pairs of start and end times. A period that ends before it
+    starts spans midnight.
+    """
+
+    def __init__(
+        self,
+        periods: Iterable[tuple[time, time]],
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        """Initialize the policy."""
+        self._clock = clock
+        self._periods = tuple(periods)
+
+    def should_connect(self, now: float) -> bool:
+        """Connect if the local time is within one of the periods."""
+        current = self._clock().time()
+        for start, end in self._periods:
+            if start <= end:
+                if start <= current < end:
+                    return True
+            elif current >= start or current < end:
+                return True
+        return False
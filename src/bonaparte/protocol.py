@@ -0,0 +1,83 @@
+"""The eFIRE protocol without the Bluetooth layer.
+
+Everything needed to build, validate, split and decode eFIRE messages, for
+tools that only work with recorded or logged traffic. Importing this module
+does not import bleak or bleak-retry-connector.
+"""
+
+from __future__ import annotations
+
+from .const import (
+    FOOTER,
+    HEADER,
+    MAX_MESSAGE_LENGTH,
+    MIN_MESSAGE_LENGTH,
+    QUERY_COMMANDS,
+    REQUEST_HEADER,
+    RESPONSE_HEADER,
+    AuxControlState,
+    EfireCommand,
+    LedMode,
+    LedState,
+    PasswordAction,
+    PasswordCommandResult,
+    PasswordSetResult,
+    PowerState,
+    ReturnCode,
+)
+from .exceptions import EfireMessageValueError
+from .parser import (
+    parse_ble_version,
+    parse_ifc_cmd1_state,
+    parse_ifc_cmd2_state,
+    parse_led_color,
+    parse_led_controller_state,
+    parse_mcu_version,
+    parse_timer,
+)
+from .state import STATE_FIELDS, FireplaceState
+from .utils import (
+    FIXED_FRAMES,
+    Frame,
+    FrameReassembler,
+    build_message,
+    checksum,
+    checksum_message,
+    validate_message,
+)
+
+__all__ = [
+    "FIXED_FRAMES",
+    "FOOTER",
+    "HEADER",
+    "MAX_MESSAGE_LENGTH",
+    "MIN_MESSAGE_LENGTH",
+    "QUERY_COMMANDS",
+    "REQUEST_HEADER",
+    "RESPONSE_HEADER",
+    "STATE_FIELDS",
+    "AuxControlState",
+    "EfireCommand",
+    "EfireMessageValueError",
+    "FireplaceState",
+    "Frame",
+    "FrameReassembler",
+    "LedMode",
+    "LedState",
+    "PasswordAction",
+    "PasswordCommandResult",
+    "PasswordSetResult",
+    "PowerState",
+    "ReturnCode",
+    "build_message",
+    "checksum",
+    "checksum_message",
+    "parse_ble_version",
+    "parse_ifc_cmd1_state",
+    "parse_ifc_cmd2_state",
+    "parse_led_color",
+    "parse_led_controller_state",
+    "parse_mcu_version",
+    "parse_timer",
+    "validate_message",
+]
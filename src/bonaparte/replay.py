@@ -0,0 +1,416 @@
+"""Recording of device sessions and their deterministic replay.
+
+A :class:`SessionRecorder` wraps the BLE client of a device and writes every
+connection, write, notification and disconnect with its timing to a compact
+binary file. A :class:`ReplayTransport` then stands in for the BLE client and
+answers the same writes with the recorded notifications, either at recorded
+speed or as fast as possible, so real sessions can be replayed against new
+versions of the library without a fireplace.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from enum import IntEnum
+import logging
+from pathlib import Path
+import struct
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Self, cast
+
+from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
+
+from .const import HEADER, READ_CHAR_UUID
+from .exceptions import CaptureFormatError, ReplayMismatchError
+from .testing import efire_services
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+    from os import PathLike
+    from types import TracebackType
+
+    from bleak.backends.characteristic import BleakGATTCharacteristic
+    from bleak_retry_connector import BleakClientWithServiceCache
+
+    from .device import EfireDevice
+    from .testing import NotifyCallback
+
+_LOGGER = logging.getLogger(__name__)
+
+FILE_MAGIC = b"EFIRESES"
+FILE_VERSION = 1
+
+# Every event is stored as its kind, the time in seconds since the recording
+# started and the length of the data that follows
+EVENT = struct.Struct("<BdH")
+
+
+class EventKind(IntEnum):
+    """Kinds of events in a session file."""
+
+    CONNECT = 1
+    CONNECTED = 2
+    WRITE = 3
+    NOTIFY = 4
+    ERROR = 5
+    CLOSE = 6
+    DROP = 7
+
+
+@dataclass(slots=True)
+class RecordedExchange:
+    """A write and everything the device did in response to it.
+
+    Delays are in seconds after the write was issued.
+    """
+
+    request: bytes
+    notifications: list[tuple[float, bytes]] = field(default_factory=list)
+    error: str | None = None
+    dropped: float | None = None
+
+
+@dataclass(slots=True)
+class RecordedSession:
+    """A single connection to the device.
+
+    ``dropped`` is the delay after the connection was established at which
+    the device disconnected before any write.
+    """
+
+    connect_time: float = 0.0
+    error: str | None = None
+    exchanges: list[RecordedExchange] = field(default_factory=list)
+    dropped: float | None = None
+
+
+def read_events(
+    path: str | PathLike[str],
+) -> Iterator[tuple[EventKind, float, bytes]]:
+    """Yield the kind, time and data of every event in a session file."""
+    with Path(path).open("rb") as file:
+        header = file.read(len(FILE_MAGIC) + 1)
+        if header[:-1] != FILE_MAGIC or header[-1:] != bytes([FILE_VERSION]):
+            msg = f"{path} is not a session recording"
+            raise CaptureFormatError(msg)
+        while record := file.read(EVENT.size):
+            kind, timestamp, length = EVENT.unpack(record)
+            yield EventKind(kind), timestamp, file.read(length)
+
+
+def load_sessions(path: str | PathLike[str]) -> list[RecordedSession]:
+    """Group the events of a session file into sessions and exchanges."""
+    sessions: list[RecordedSession] = []
+    session = RecordedSession()
+    exchange: RecordedExchange | None = None
+    writes: dict[int, tuple[float, RecordedExchange]] = {}
+    notified: tuple[float, RecordedExchange] | None = None
+    started = connected = 0.0
+    for kind, timestamp, data in read_events(path):
+        match kind:
+            case EventKind.CONNECT:
+                session = RecordedSession()
+                sessions.append(session)
+                exchange = notified = None
+                writes.clear()
+                started = timestamp
+            case EventKind.CONNECTED:
+                connected = timestamp
+                session.connect_time = timestamp - started
+            case EventKind.WRITE:
+                exchange = RecordedExchange(data)
+                session.exchanges.append(exchange)
+                writes[data[3]] = (timestamp, exchange)
+            case EventKind.NOTIFY:
+                # responses belong to the latest request with their command,
+                # continuation fragments to the exchange of the previous one
+                if len(data) > 3 and data[0] == HEADER and data[3] in writes:
+                    notified = writes[data[3]]
+                elif notified is None and exchange is not None:
+                    notified = writes[exchange.request[3]]
+                if notified is not None:
+                    written, target = notified
+                    target.notifications.append((timestamp - written, data))
+            case EventKind.ERROR if exchange is None:
+                session.error = data.decode()
+            case EventKind.ERROR:
+                assert exchange is not None
+                exchange.error = data.decode()
+            case EventKind.DROP if exchange is None:
+                session.dropped = timestamp - connected
+            case EventKind.DROP:
+                assert exchange is not None
+                exchange.dropped = timestamp - writes[exchange.request[3]][0]
+    return sessions
+
+
+class SessionRecorder:
+    """Record the sessions of a device to a file.
+
+    The recorder wraps the connector of the device, so it has to be attached
+    before the first connection.
+    """
+
+    def __init__(self, path: str | PathLike[str]) -> None:
+        """Create the session file."""
+        self._client: _RecordingClient | None = None
+        self._exit_stack = ExitStack()
+        self._file: BinaryIO = self._exit_stack.enter_context(Path(path).open("wb"))
+        self._file.write(FILE_MAGIC + bytes([FILE_VERSION]))
+        self._start = time.monotonic()
+
+    def __enter__(self) -> Self:
+        """Return the recorder."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the session file."""
+        self.close()
+
+    def attach(self, device: EfireDevice) -> None:
+        """Record all connections the device makes from now on."""
+        connector = device._connector  # noqa: SLF001 # pylint: disable=protected-access
+
+        async def _connect() -> BleakClientWithServiceCache:
+            self.record(EventKind.CONNECT)
+            try:
+                client = await connector()
+            except BleakError as ex:
+                self.record(EventKind.ERROR, str(ex).encode())
+                raise
+            self.record(EventKind.CONNECTED)
+            self._client = _RecordingClient(client, self)
+            return cast("BleakClientWithServiceCache", self._client)
+
+        device._connector = _connect  # noqa: SLF001 # pylint: disable=protected-access
+        device._register_disconnect_callback(  # noqa: SLF001 # pylint: disable=protected-access
+            self._device_disconnected
+        )
+
+    def record(
+        self, kind: EventKind, data: bytes | bytearray | memoryview = b""
+    ) -> None:
+        """Append an event to the session file."""
+        timestamp = time.monotonic() - self._start
+        self._file.write(EVENT.pack(kind, timestamp, len(data)) + data)
+
+    def close(self) -> None:
+        """Flush and close the session file."""
+        self._exit_stack.close()
+
+    def _device_disconnected(self, _device: EfireDevice) -> None:
+        client = self._client
+        if client is not None and not client.closed:
+            self.record(EventKind.DROP)
+            self._file.flush()
+        self._client = None
+
+
+class _RecordingClient:
+    """Proxy of a BLE client that records the traffic passing through it."""
+
+    def __init__(
+        self, client: BleakClientWithServiceCache, recorder: SessionRecorder
+    ) -> None:
+        self._client = client
+        self._recorder = recorder
+        self.closed = False
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    async def start_notify(
+        self, char_specifier: BleakGATTCharacteristic, callback: NotifyCallback
+    ) -> None:
+        """Subscribe to notifications, recording them before they are handled."""
+
+        def _recording_callback(
+            characteristic: BleakGATTCharacteristic, data: bytearray
+        ) -> None:
+            self._recorder.record(EventKind.NOTIFY, data)
+            callback(characteristic, data)
+
+        await self._client.start_notify(char_specifier, _recording_callback)
+
+    async def write_gatt_char(
+        self,
+        char_specifier: BleakGATTCharacteristic,
+        data: bytes | bytearray | memoryview,
+        response: bool | None = None,
+    ) -> None:
+        """Record a write and pass it on to the client."""
+        self._recorder.record(EventKind.WRITE, data)
+        try:
+            await self._client.write_gatt_char(char_specifier, data, response)
+        except BleakError as ex:
+            self._recorder.record(EventKind.ERROR, str(ex).encode())
+            raise
+
+    async def disconnect(self) -> None:
+        """Record the closing of the connection and disconnect the client."""
+        self.closed = True
+        self._recorder.record(EventKind.CLOSE)
+        await self._client.disconnect()
+
+
+class ReplayTransport:
+    """Stand in for the BLE client and replay recorded sessions.
+
+    Every connection replays the next recorded session. Writes are matched to
+    the first unused exchange of the session with the same request and
+    answered with its recorded notifications, errors and disconnects. Delays
+    are multiplied by ``time_scale``, so ``0`` replays as fast as possible.
+    """
+
+    def __init__(
+        self,
+        sessions: list[RecordedSession],
+        *,
+        address: str = "00:00:00:00:00:00",
+        name: str = "Replayed eFIRE",
+        time_scale: float = 1.0,
+    ) -> None:
+        """Initialize the transport."""
+        self.ble_device = BLEDevice(address, name, details=None)
+        self.services = efire_services()
+        self.time_scale = time_scale
+        self._disconnected_callback: Callable[[BleakClientWithServiceCache], None]
+        self._is_connected = False
+        self._notify_callback: NotifyCallback | None = None
+        self._read_char = self.services.get_characteristic(READ_CHAR_UUID)
+        self._session: RecordedSession | None = None
+        self._sessions = list(reversed(sessions))
+        self._unused: list[RecordedExchange] = []
+
+    @classmethod
+    def load(cls, path: str | PathLike[str], **kwargs: Any) -> Self:
+        """Create a transport replaying the sessions of a file."""
+        return cls(load_sessions(path), **kwargs)
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether a replayed connection is currently established."""
+        return self._is_connected
+
+    @property
+    def remaining_sessions(self) -> int:
+        """Number of recorded sessions that have not been replayed."""
+        return len(self._sessions)
+
+    def attach(self, device: EfireDevice) -> None:
+        """Have the device connect to this transport instead of a real device."""
+
+        async def _connect() -> BleakClientWithServiceCache:
+            if not self._sessions:
+                msg = "No recorded session left to replay"
+                raise ReplayMismatchError(msg)
+            session = self._sessions.pop()
+            await self._sleep(session.connect_time)
+            if session.error is not None:
+                raise BleakError(session.error)
+            self._session = session
+            self._unused = list(session.exchanges)
+            self._is_connected = True
+            self._disconnected_callback = (
+                device._disconnected  # noqa: SLF001 # pylint: disable=protected-access
+            )
+            if session.dropped is not None:
+                self._schedule(session.dropped, self._drop, session)
+            return cast("BleakClientWithServiceCache", self)
+
+        device._connector = _connect  # noqa: SLF001 # pylint: disable=protected-access
+
+    async def start_notify(
+        self, char_specifier: BleakGATTCharacteristic, callback: NotifyCallback
+    ) -> None:
+        """Subscribe to notifications of the read characteristic."""
+        self._notify_callback = callback
+
+    async def stop_notify(self, char_specifier: BleakGATTCharacteristic) -> None:
+        """Unsubscribe from notifications of the read characteristic."""
+        self._notify_callback = None
+
+    async def disconnect(self) -> bool:
+        """End the replayed connection."""
+        if self._is_connected:
+            self._close()
+            self._disconnected_callback(cast("BleakClientWithServiceCache", self))
+        return True
+
+    async def write_gatt_char(
+        self,
+        char_specifier: BleakGATTCharacteristic,
+        data: bytes | bytearray | memoryview,
+        response: bool | None = None,
+    ) -> None:
+        """Replay the recorded outcome of a write."""
+        exchange = next(
+            (exchange for exchange in self._unused if exchange.request == data),
+            None,
+        )
+        if exchange is None:
+            msg = f"No recorded exchange for request {data.hex(' ')}"
+            raise ReplayMismatchError(msg)
+        self._unused.remove(exchange)
+        if exchange.error is not None:
+            raise BleakError(exchange.error)
+        session = self._session
+        if exchange.notifications:
+            self._notify(session, exchange.notifications, 0, 0.0)
+        if exchange.dropped is not None:
+            self._schedule(exchange.dropped, self._drop, session)
+        await asyncio.sleep(0)
+
+    def _notify(
+        self,
+        session: RecordedSession | None,
+        notifications: list[tuple[float, bytes]],
+        index: int,
+        elapsed: float,
+    ) -> None:
+        """Deliver the notifications of an exchange in their recorded order."""
+        delay, data = notifications[index]
+        if elapsed < delay:
+            self._schedule(
+                delay - elapsed, self._notify, session, notifications, index, delay
+            )
+            return
+        if self._session is not session or self._notify_callback is None:
+            return
+        assert self._read_char is not None
+        self._notify_callback(self._read_char, bytearray(data))
+        if index + 1 < len(notifications):
+            self._notify(session, notifications, index + 1, elapsed)
+
+    def _drop(self, session: RecordedSession | None) -> None:
+        """Drop the connection as the device did in the recording."""
+        if self._session is not session or not self._is_connected:
+            return
+        _LOGGER.debug("Replaying disconnect by the device")
+        self._close()
+        self._disconnected_callback(cast("BleakClientWithServiceCache", self))
+
+    def _close(self) -> None:
+        self._is_connected = False
+        self._notify_callback = None
+        self._session = None
+
+    def _schedule(
+        self, delay: float, callback: Callable[..., None], *args: Any
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        if self.time_scale:
+            loop.call_later(delay * self.time_scale, callback, *args)
+        else:
+            loop.call_soon(callback, *args)
+
+    async def _sleep(self, delay: float) -> None:
+        await asyncio.sleep(delay * self.time_scale)
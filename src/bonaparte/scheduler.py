@@ -0,0 +1,114 @@
+"""Priority scheduling of the commands sent to a device."""
+
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
+from typing import TYPE_CHECKING
+
+from .tracing import Histogram
+
+if TYPE_CHECKING:
+    from collections.abc import AsyncIterator
+
+
+class Priority(IntEnum):
+    """Priority of a command waiting for the device, lower values go first."""
+
+    USER = 0
+    BACKGROUND = 1
+
+
+def _wait_histograms() -> dict[Priority, Histogram]:
+    return {priority: Histogram() for priority in Priority}
+
+
+@dataclass(slots=True)
+class QueueMetrics:
+    """Statistics of the commands waiting for the device.
+
+    ``wait`` holds a histogram of the time every command spent waiting for
+    a slot, by priority. ``coalesced`` counts queries that were answered by
+    an identical query that was already queued or in flight.
+    """
+
+    depth: int = 0
+    max_depth: int = 0
+    coalesced: int = 0
+    wait: dict[Priority, Histogram] = field(default_factory=_wait_histograms)
+
+
+class CommandScheduler:
+    """Grant a limited number of slots to waiting commands by priority.
+
+    Commands of the same priority are served in the order they arrived. A
+    command never loses a slot it holds, so a user command waits for the
+    commands already sent but goes ahead of all queued background commands.
+    """
+
+    def __init__(self, slots: int = 1) -> None:
+        """Initialize the scheduler."""
+        self._free = slots
+        self._sequence = itertools.count()
+        self._waiters: list[tuple[Priority, int, asyncio.Future[None]]] = []
+        self.metrics = QueueMetrics()
+
+    @property
+    def depth(self) -> int:
+        """Number of commands waiting for a slot."""
+        return self.metrics.depth
+
+    def locked(self) -> bool:
+        """Return whether a command would have to wait for a slot."""
+        return self._free == 0
+
+    async def acquire(self, priority: Priority) -> None:
+        """Wait for a free slot."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self._free and not self._waiters:
+            self._free -= 1
+        else:
+            future: asyncio.Future[None] = loop.create_future()
+            waiter = (priority, next(self._sequence), future)
+            heapq.heappush(self._waiters, waiter)
+            self._count_waiters()
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # the slot was granted right before the cancellation
+                    self.release()
+                elif waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    heapq.heapify(self._waiters)
+                raise
+            finally:
+                self._count_waiters()
+        self.metrics.wait[priority].add(loop.time() - start)
+
+    def release(self) -> None:
+        """Hand the slot to the most important waiting command."""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._free += 1
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the context."""
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _count_waiters(self) -> None:
+        depth = self.metrics.depth = len(self._waiters)
+        self.metrics.max_depth = max(self.metrics.max_depth, depth)
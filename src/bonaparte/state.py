@@ -0,0 +1,433 @@
+"""Compact representation of the state of a fireplace."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import FrozenInstanceError, dataclass
+import time
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Self, overload
+
+from .const import (
+    AuxControlState,
+    EfireCommand,
+    LedMode,
+    LedState,
+    PowerState,
+    ReturnCode,
+)
+from .parser import (
+    parse_ble_version,
+    parse_ifc_cmd1_state,
+    parse_ifc_cmd2_state,
+    parse_led_color,
+    parse_led_controller_state,
+    parse_mcu_version,
+    parse_timer,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Mapping
+
+# Layout of the packed state. The IFC bytes are kept as the controller
+# reports them, see the IFC parsers for their bit layout.
+OFFSET_IFC_CMD1 = 0
+OFFSET_IFC_CMD2 = 1
+OFFSET_FLAGS = 2
+OFFSET_LED_COLOR = 3
+OFFSET_LED_MODE = 6
+OFFSET_TIME_LEFT = 7
+PACKED_SIZE = 10
+
+DEFAULT_PACKED = bytes(OFFSET_LED_MODE) + bytes([LedMode.HOLD.value]) + bytes(3)
+
+
+class _PackedField[T](ABC):
+    """Descriptor of a state field that is decoded from the packed bytes."""
+
+    __slots__ = ("name",)
+
+    name: str
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    @overload
+    def __get__(self, instance: None, owner: type) -> Self: ...
+
+    @overload
+    def __get__(self, instance: FireplaceState, owner: type) -> T: ...
+
+    def __get__(self, instance: FireplaceState | None, owner: type) -> Self | T:
+        if instance is None:
+            return self
+        return self.decode(instance._packed)  # noqa: SLF001
+
+    def __set__(self, instance: FireplaceState, value: T) -> None:
+        packed = bytearray(instance._packed)  # noqa: SLF001
+        self.encode(packed, value)
+        instance._packed = bytes(packed)  # noqa: SLF001
+
+    @abstractmethod
+    def decode(self, packed: bytes) -> T:
+        """Decode the field from the packed state."""
+
+    @abstractmethod
+    def encode(self, packed: bytearray, value: T) -> None:
+        """Store the field in the packed state."""
+
+
+class _Bits(_PackedField[int]):
+    """An unsigned integer stored in bits of a single byte."""
+
+    __slots__ = ("mask", "offset", "shift")
+
+    def __init__(self, offset: int, shift: int = 0, width: int = 8) -> None:
+        self.offset = offset
+        self.shift = shift
+        self.mask = (1 << width) - 1
+
+    def decode(self, packed: bytes) -> int:
+        return (packed[self.offset] >> self.shift) & self.mask
+
+    def encode(self, packed: bytearray, value: int) -> None:
+        if not 0 <= value <= self.mask:
+            msg = f"Value {value} out of range for {self.name}"
+            raise ValueError(msg)
+        cleared = packed[self.offset] & ~(self.mask << self.shift)
+        packed[self.offset] = cleared | value << self.shift
+
+
+class _Flag(_PackedField[bool]):
+    """A boolean stored in a single bit."""
+
+    __slots__ = ("bit", "offset")
+
+    def __init__(self, offset: int, bit: int) -> None:
+        self.offset = offset
+        self.bit = 1 << bit
+
+    def decode(self, packed: bytes) -> bool:
+        return bool(packed[self.offset] & self.bit)
+
+    def encode(self, packed: bytearray, value: bool) -> None:
+        if value:
+            packed[self.offset] |= self.bit
+        else:
+            packed[self.offset] &= ~self.bit
+
+
+class _Triplet(_PackedField[tuple[int, int, int]]):
+    """Three consecutive bytes, like a color or a duration."""
+
+    __slots__ = ("offset",)
+
+    def __init__(self, offset: int) -> None:
+        self.offset = offset
+
+    def decode(self, packed: bytes) -> tuple[int, int, int]:
+        offset = self.offset
+        return packed[offset], packed[offset + 1], packed[offset + 2]
+
+    def encode(self, packed: bytearray, value: tuple[int, int, int]) -> None:
+        packed[self.offset : self.offset + 3] = bytes(value)
+
+
+class _TimeLeft(_Triplet):
+    """The timer reading, counted down locally once a countdown is started."""
+
+    __slots__ = ()
+
+    @overload
+    def __get__(self, instance: None, owner: type) -> Self: ...
+
+    @overload
+    def __get__(
+        self, instance: FireplaceState, owner: type
+    ) -> tuple[int, int, int]: ...
+
+    def __get__(
+        self, instance: FireplaceState | None, owner: type
+    ) -> Self | tuple[int, int, int]:
+        if instance is None:
+            return self
+        reading = self.decode(instance._packed)  # noqa: SLF001
+        start = instance._countdown_start  # noqa: SLF001
+        if start is None or not instance.timer:
+            return reading
+        hours, minutes, seconds = reading
+        elapsed = int(time.monotonic() - start)
+        left = max(0, hours * 3600 + minutes * 60 + seconds - elapsed)
+        return left // 3600, left // 60 % 60, left % 60
+
+    def __set__(self, instance: FireplaceState, value: tuple[int, int, int]) -> None:
+        super().__set__(instance, value)
+        instance._countdown_start = None  # noqa: SLF001
+
+
+class _Mode(_PackedField[LedMode]):
+    """An LED mode stored as its value."""
+
+    __slots__ = ("offset",)
+
+    def __init__(self, offset: int) -> None:
+        self.offset = offset
+
+    def decode(self, packed: bytes) -> LedMode:
+        return LedMode(packed[self.offset])
+
+    def encode(self, packed: bytearray, value: LedMode) -> None:
+        packed[self.offset] = value.value
+
+
+@dataclass(init=False, repr=False, eq=False)
+class FireplaceState:
+    """State of each component in the fireplace.
+
+    All state except the firmware versions is kept in a few packed bytes and
+    decoded when a field is read. Comparing and copying a state only involves
+    the packed bytes, which makes keeping many snapshots cheap. A state changes
+    as it is updated, so it is not hashable, while the snapshots returned by
+    :meth:`copy` are. The fields are listed by :func:`dataclasses.fields` and
+    read by :func:`dataclasses.asdict`.
+
+    Once :meth:`start_countdown` is called for a timer reading, ``time_left``
+    is counted down locally from that reading while the timer is enabled.
+    """
+
+    __slots__ = (
+        "_compatibility_mode",
+        "_countdown_start",
+        "_packed",
+        "ble_version",
+        "mcu_version",
+    )
+
+    # the firmware versions are plain attributes without a class level default,
+    # so they come first
+    ble_version: str
+    mcu_version: str
+
+    aux: _Flag = _Flag(OFFSET_IFC_CMD2, 3)
+    blower_speed: _Bits = _Bits(OFFSET_IFC_CMD2, 4, 3)
+    bt_power: _Flag = _Flag(OFFSET_FLAGS, 0)
+    flame_height: _Bits = _Bits(OFFSET_IFC_CMD2, 0, 3)
+    ifc_power: _Flag = _Flag(OFFSET_IFC_CMD1, 0)
+    led_color: _Triplet = _Triplet(OFFSET_LED_COLOR)
+    led_mode: _Mode = _Mode(OFFSET_LED_MODE)
+    led: _Flag = _Flag(OFFSET_FLAGS, 1)
+    night_light_brightness: _Bits = _Bits(OFFSET_IFC_CMD1, 4, 3)
+    pilot: _Flag = _Flag(OFFSET_IFC_CMD1, 7)
+    remote_in_use: _Flag = _Flag(OFFSET_FLAGS, 2)
+    split_flow: _Flag = _Flag(OFFSET_IFC_CMD2, 7)
+    thermostat: _Flag = _Flag(OFFSET_IFC_CMD1, 2)
+    time_left: _TimeLeft = _TimeLeft(OFFSET_TIME_LEFT)
+    timer: _Flag = _Flag(OFFSET_FLAGS, 3)
+
+    def __init__(
+        self,
+        *,
+        compatibility_mode: bool = True,
+        packed: bytes = DEFAULT_PACKED,
+        ble_version: str = "",
+        mcu_version: str = "",
+    ) -> None:
+        """Initialize the fireplace state."""
+        self._compatibility_mode = compatibility_mode
+        self._countdown_start: float | None = None
+        self.packed = packed
+        self.ble_version = ble_version
+        self.mcu_version = mcu_version
+
+    @property
+    def packed(self) -> bytes:
+        """The packed bytes holding all state except the firmware versions."""
+        return self._packed
+
+    @packed.setter
+    def packed(self, packed: bytes) -> None:
+        if len(packed) != PACKED_SIZE:
+            msg = f"Packed state must be {PACKED_SIZE} bytes, got {len(packed)}"
+            raise ValueError(msg)
+        self._packed = bytes(packed)
+        self._countdown_start = None
+
+    @property
+    def power(self) -> bool:
+        """Return whether the fireplace is considered turned on."""
+        if self._compatibility_mode:
+            return self.bt_power
+
+        return self.ifc_power and self.flame_height > 0
+
+    @property
+    def counting_down(self) -> bool:
+        """Whether ``time_left`` is counted down locally and not yet zero."""
+        return (
+            self._countdown_start is not None
+            and self.timer
+            and self.time_left != (0, 0, 0)
+        )
+
+    def start_countdown(self, start: float | None = None) -> None:
+        """Count ``time_left`` down from a reading taken at ``start``.
+
+        ``start`` is a :func:`time.monotonic` timestamp and defaults to now.
+        Storing a new ``time_left`` stops the countdown.
+        """
+        self._countdown_start = time.monotonic() if start is None else start
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the state of two fireplaces."""
+        if not isinstance(other, FireplaceState):
+            return NotImplemented
+        return (
+            self._packed == other._packed
+            and self.ble_version == other.ble_version
+            and self.mcu_version == other.mcu_version
+        )
+
+    def __repr__(self) -> str:
+        """Represent the state with all its fields."""
+        # the repr of the LED enums is broken by their dataclass mixin
+        fields = ", ".join(
+            f"{name}={value}" if isinstance(value, LedMode) else f"{name}={value!r}"
+            for name, value in self.items()
+        )
+        return f"{type(self).__name__}({fields})"
+
+    def __copy__(self) -> FireplaceSnapshot:
+        """Return a snapshot of the state."""
+        return self.copy()
+
+    def copy(self) -> FireplaceSnapshot:
+        """Return an immutable snapshot of the state."""
+        return FireplaceSnapshot(self)
+
+    def apply_query(self, command: int, data: bytes) -> None:
+        """Store the fields read by a query command from its response payload.
+
+        Responses to other commands are ignored.
+        """
+        match command:
+            case EfireCommand.GET_IFC_CMD1_STATE:
+                if data[0] != ReturnCode.FAILURE:
+                    (
+                        self.ifc_power,
+                        self.thermostat,
+                        self.night_light_brightness,
+                        self.pilot,
+                    ) = parse_ifc_cmd1_state(data)
+            case EfireCommand.GET_IFC_CMD2_STATE:
+                (
+                    self.flame_height,
+                    self.blower_speed,
+                    self.aux,
+                    self.split_flow,
+                ) = parse_ifc_cmd2_state(data)
+            case EfireCommand.GET_TIMER:
+                self.time_left, self.timer = parse_timer(data)
+            case EfireCommand.GET_POWER_STATE:
+                self.bt_power = data[0] == PowerState.ON
+            case EfireCommand.GET_LED_STATE:
+                self.led = data == LedState.ON.long
+            case EfireCommand.GET_LED_COLOR:
+                self.led_color = parse_led_color(data)
+            case EfireCommand.GET_LED_MODE:
+                self.led_mode = LedMode(data)
+            case EfireCommand.GET_LED_CONTROLLER_STATE:
+                self.led, self.led_color, self.led_mode = parse_led_controller_state(
+                    data
+                )
+            case EfireCommand.GET_REMOTE_USAGE:
+                self.remote_in_use = data[0] == AuxControlState.USED
+            case EfireCommand.GET_BLE_VERSION:
+                self.ble_version = parse_ble_version(data)
+            case EfireCommand.GET_MCU_VERSION:
+                self.mcu_version = parse_mcu_version(data)
+
+    def items(self) -> Iterator[tuple[str, Any]]:
+        """Yield the name and value of every field."""
+        for name in STATE_FIELDS:
+            yield name, getattr(self, name)
+
+    def changes(self, previous: FireplaceState) -> dict[str, Any]:
+        """Return the fields that differ from a previous state."""
+        if self == previous:
+            return {}
+        return {
+            name: value
+            for name, value in self.items()
+            if getattr(previous, name) != value
+        }
+
+
+class FireplaceSnapshot(FireplaceState):
+    """An immutable copy of a fireplace state, as returned by its ``copy``.
+
+    Unlike the state, which changes as the fireplace is updated, a snapshot
+    is hashable, on the same packed bytes and versions it is compared by.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, state: FireplaceState) -> None:  # pylint: disable=super-init-not-called
+        """Take a snapshot of a state, including its running countdown."""
+        for name in FireplaceState.__slots__:
+            object.__setattr__(self, name, getattr(state, name))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        """Reject any change of the snapshot."""
+        msg = f"Cannot assign to field {name!r} of a snapshot"
+        raise FrozenInstanceError(msg)
+
+    def __delattr__(self, name: str) -> None:
+        """Reject any change of the snapshot."""
+        msg = f"Cannot delete field {name!r} of a snapshot"
+        raise FrozenInstanceError(msg)
+
+    def __hash__(self) -> int:
+        """Hash the packed bytes and versions the snapshot is compared by."""
+        return hash((self.packed, self.ble_version, self.mcu_version))
+
+    def __copy__(self) -> Self:
+        """Return the snapshot itself, as it cannot change."""
+        return self
+
+
+STATE_FIELDS = (
+    "aux",
+    "ble_version",
+    "blower_speed",
+    "bt_power",
+    "flame_height",
+    "ifc_power",
+    "led_color",
+    "led_mode",
+    "led",
+    "mcu_version",
+    "night_light_brightness",
+    "pilot",
+    "remote_in_use",
+    "split_flow",
+    "thermostat",
+    "time_left",
+    "timer",
+)
+
+# The fields read by each state query command
+QUERY_FIELDS: Mapping[EfireCommand, frozenset[str]] = MappingProxyType(
+    {
+        EfireCommand.GET_IFC_CMD1_STATE: frozenset(
+            {"ifc_power", "night_light_brightness", "pilot", "thermostat"}
+        ),
+        EfireCommand.GET_IFC_CMD2_STATE: frozenset(
+            {"aux", "blower_speed", "flame_height", "split_flow"}
+        ),
+        EfireCommand.GET_LED_COLOR: frozenset({"led_color"}),
+        EfireCommand.GET_LED_MODE: frozenset({"led_mode"}),
+        EfireCommand.GET_LED_STATE: frozenset({"led"}),
+        EfireCommand.GET_POWER_STATE: frozenset({"bt_power"}),
+        EfireCommand.GET_TIMER: frozenset({"time_left", "timer"}),
+    }
+)
@@ -0,0 +1,310 @@
+"""Simulated eFIRE controller for hardware-free testing and benchmarking."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, cast
+
+from bleak.backends.characteristic import BleakGATTCharacteristic
+from bleak.backends.device import BLEDevice
+from bleak.backends.service import BleakGATTService, BleakGATTServiceCollection
+
+from .const import (
+    READ_CHAR_UUID,
+    RESPONSE_HEADER,
+    SERVICE_UUID,
+    WRITE_CHAR_UUID,
+    AuxControlState,
+    EfireCommand,
+    LedMode,
+    LedState,
+    PasswordAction,
+    PasswordCommandResult,
+    PowerState,
+    ReturnCode,
+)
+from .exceptions import EfireMessageValueError
+from .utils import build_message, validate_message
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from bleak_retry_connector import BleakClientWithServiceCache
+
+    from .device import EfireDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+type NotifyCallback = Callable[[BleakGATTCharacteristic, bytearray], None]
+
+
+def efire_services() -> BleakGATTServiceCollection:
+    """Build the GATT services of an eFIRE controller."""
+    services = BleakGATTServiceCollection()
+    service = BleakGATTService(None, 0x0010, SERVICE_UUID)
+    services.add_service(service)
+    services.add_characteristic(
+        BleakGATTCharacteristic(
+            None, 0x0011, WRITE_CHAR_UUID, ["write"], lambda: 20, service
+        )
+    )
+    services.add_characteristic(
+        BleakGATTCharacteristic(
+            None, 0x0013, READ_CHAR_UUID, ["notify"], lambda: 20, service
+        )
+    )
+    return services
+
+
+class SimulatedFireplace:
+    """An in-process eFIRE controller standing in for a BLE client.
+
+    The simulator speaks the same framing as the real controller, keeps the
+    IFC CMD1/CMD2, power, LED and timer state and delivers its responses
+    through the notification callback after a configurable latency.
+    """
+
+    def __init__(
+        self,
+        address: str = "00:00:00:00:00:00",
+        name: str = "Simulated eFIRE",
+        *,
+        password: str = "0000",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        """Initialize the simulated controller."""
+        self.ble_device = BLEDevice(address, name, details=None)
+        self.latency = latency
+        self.jitter = jitter
+        self.password = password
+
+        self.authenticated = False
+        self.ble_version = bytes([0x00, 0x08, 0x00])
+        self.mcu_version = bytes([0x01, 0x01, 0x04])
+        self.cmd1 = 0x00
+        self.cmd2 = 0x00
+        self.power = False
+        self.led = False
+        self.led_color = (0xFF, 0xFF, 0xFF)
+        self.led_mode = LedMode.HOLD
+        self.remote_in_use = False
+        self.timer_enabled = False
+        self.write_count = 0
+        self.max_in_flight = 0
+
+        self._connect_count = 0
+        self._in_flight = 0
+        self._disconnected_callback: Callable[[BleakClientWithServiceCache], None]
+        self._is_connected = False
+        self._notify_callback: NotifyCallback | None = None
+        self._password_mgmt = False
+        self._random = random.Random(seed)
+        self._timer_deadline = 0.0
+
+        self.services = efire_services()
+        read_char = self.services.get_characteristic(READ_CHAR_UUID)
+        assert read_char is not None
+        self._read_char = read_char
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether a simulated connection is currently established."""
+        return self._is_connected
+
+    @property
+    def connect_count(self) -> int:
+        """Number of connections established to the simulator."""
+        return self._connect_count
+
+    @property
+    def in_flight(self) -> int:
+        """Number of requests whose response has not been delivered yet."""
+        return self._in_flight
+
+    @property
+    def time_left(self) -> tuple[int, int, int]:
+        """Remaining time on the timer as hours, minutes and seconds."""
+        remaining = max(0, round(self._timer_deadline - time.monotonic()))
+        return remaining // 3600, remaining // 60 % 60, remaining % 60
+
+    def attach(self, device: EfireDevice) -> None:
+        """Have the device connect to this simulator instead of a real device."""
+
+        async def _connect() -> BleakClientWithServiceCache:
+            await self._delay()
+            self._is_connected = True
+            self._connect_count += 1
+            self.authenticated = False
+            self._disconnected_callback = (
+                device._disconnected  # noqa: SLF001 # pylint: disable=protected-access
+            )
+            return cast("BleakClientWithServiceCache", self)
+
+        device._connector = _connect  # noqa: SLF001 # pylint: disable=protected-access
+
+    def simulate_disconnect(self) -> None:
+        """Drop the connection as if the device went out of range."""
+        if not self._is_connected:
+            return
+        self._is_connected = False
+        self._notify_callback = None
+        self._disconnected_callback(cast("BleakClientWithServiceCache", self))
+
+    async def start_notify(
+        self, char_specifier: BleakGATTCharacteristic, callback: NotifyCallback
+    ) -> None:
+        """Subscribe to notifications of the read characteristic."""
+        self._notify_callback = callback
+
+    async def stop_notify(self, char_specifier: BleakGATTCharacteristic) -> None:
+        """Unsubscribe from notifications of the read characteristic."""
+        self._notify_callback = None
+
+    async def disconnect(self) -> bool:
+        """Disconnect from the simulator."""
+        if self._is_connected:
+            self._is_connected = False
+            self._notify_callback = None
+            self._disconnected_callback(cast("BleakClientWithServiceCache", self))
+        return True
+
+    async def write_gatt_char(
+        self,
+        char_specifier: BleakGATTCharacteristic,
+        data: bytes | bytearray | memoryview,
+        response: bool | None = None,
+    ) -> None:
+        """Accept a request frame and schedule the response notification."""
+        self.write_count += 1
+        try:
+            validate_message(data)
+        except EfireMessageValueError:
+            # The controller silently drops messages it does not understand
+            _LOGGER.debug("Simulator ignoring invalid message %s", data.hex(" "))
+            return
+
+        command = data[3]
+        try:
+            result = self.handle_command(command, bytes(data[4:-2]))
+        except IndexError:
+            # parameter is missing or too short
+            result = bytes([ReturnCode.FAILURE])
+        reply = build_message(bytes([command, *result]), RESPONSE_HEADER)
+        if self._notify_callback is not None:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+            asyncio.get_running_loop().call_later(
+                self._next_latency(), self._notify, self._connect_count, reply
+            )
+        await asyncio.sleep(0)
+
+    def _notify(self, connection: int, reply: bytes) -> None:
+        """Deliver a response, unless its connection was closed meanwhile."""
+        self._in_flight -= 1
+        callback = self._notify_callback
+        if callback is not None and connection == self._connect_count:
+            callback(self._read_char, bytearray(reply))
+
+    def handle_command(self, command: int, parameter: bytes) -> bytes:
+        """Apply a command to the simulated state and return the response data."""
+        match command:
+            case EfireCommand.SEND_PASSWORD:
+                return self._handle_password(parameter.decode("ascii"))
+            case EfireCommand.PASSWORD_MGMT:
+                self._password_mgmt = parameter[0] == PasswordAction.SET
+                return bytes([ReturnCode.SUCCESS])
+            case EfireCommand.SET_IFC_CMD1:
+                self.cmd1 = parameter[1]
+            case EfireCommand.SET_IFC_CMD2:
+                self.cmd2 = parameter[1]
+            case EfireCommand.SET_POWER:
+                self._set_power(on=parameter[0] == PowerState.ON)
+            case EfireCommand.SET_LED_POWER:
+                self.led = parameter == LedState.ON.long
+            case EfireCommand.SET_LED_COLOR:
+                self.led_color = (parameter[0], parameter[1], parameter[2])
+            case EfireCommand.SET_LED_MODE:
+                # disabling a mode is signalled by adding 5 to its set value
+                self.led_mode = next(
+                    mode
+                    for mode in LedMode
+                    if parameter[0] in {mode.setvalue, mode.setvalue + 0x5}
+                )
+            case EfireCommand.SET_TIMER:
+                self.timer_enabled = bool(parameter[2])
+                self._timer_deadline = time.monotonic() + (
+                    parameter[0] * 3600 + parameter[1] * 60
+                )
+            case EfireCommand.SYNC_TIME:
+                pass
+            case EfireCommand.GET_IFC_CMD1_STATE:
+                return bytes([0x00, self.cmd1])
+            case EfireCommand.GET_IFC_CMD2_STATE:
+                return bytes([0x00, self.cmd2])
+            case EfireCommand.GET_POWER_STATE:
+                return bytes([PowerState.ON if self.power else PowerState.OFF])
+            case EfireCommand.GET_TIMER:
+                hours, minutes, seconds = self.time_left
+                return bytes([hours, minutes, self.timer_enabled, seconds])
+            case EfireCommand.GET_LED_STATE:
+                return LedState.ON.long if self.led else LedState.OFF.long
+            case EfireCommand.GET_LED_COLOR:
+                return bytes(self.led_color)
+            case EfireCommand.GET_LED_MODE:
+                return self.led_mode.long
+            case EfireCommand.GET_LED_CONTROLLER_STATE:
+                return bytes(
+                    [
+                        LedState.ON.short if self.led else LedState.OFF.short,
+                        *self.led_color,
+                        self.led_mode.short,
+                    ]
+                )
+            case EfireCommand.GET_REMOTE_USAGE | EfireCommand.GET_AUX_CTRL:
+                return bytes(
+                    [
+                        AuxControlState.USED
+                        if self.remote_in_use
+                        else AuxControlState.NOT_USED
+                    ]
+                )
+            case EfireCommand.GET_BLE_VERSION:
+                return self.ble_version
+            case EfireCommand.GET_MCU_VERSION:
+                return self.mcu_version
+            case _:
+                return bytes([ReturnCode.FAILURE])
+        return bytes([ReturnCode.SUCCESS])
+
+    def _handle_password(self, password: str) -> bytes:
+        if self._password_mgmt:
+            self._password_mgmt = False
+            self.password = password
+            return bytes([PasswordCommandResult.SET_SUCCESS])
+        self.authenticated = password == self.password
+        if self.authenticated:
+            return bytes([PasswordCommandResult.LOGIN_SUCCESS])
+        return bytes([PasswordCommandResult.INVALID_PASSWORD])
+
+    def _set_power(self, *, on: bool) -> None:
+        # The controller sets flame height and blower speed on power changes
+        self.power = on
+        if on:
+            self.cmd1 |= 0x01
+            self.cmd2 = (self.cmd2 & 0xF8) | 0x06
+        else:
+            self.cmd1 &= 0xFE
+            self.cmd2 &= 0x88
+
+    def _next_latency(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    async def _delay(self) -> None:
+        await asyncio.sleep(self._next_latency())
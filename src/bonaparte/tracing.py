@@ -0,0 +1,129 @@
+"""Opt-in latency tracing of the stages of each command."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+# Upper bounds in seconds of the histogram buckets, the last bucket is unbounded
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_CONNECTED = "connected"
+STAGE_ESTABLISHED = "established"
+STAGE_NOTIFYING = "notifying"
+STAGE_PREPARED = "prepared"
+STAGE_QUEUED = "queued"
+STAGE_ATTEMPT = "attempt"
+STAGE_WRITTEN = "written"
+STAGE_RESPONDED = "responded"
+STAGE_TOTAL = "total"
+
+
+@dataclass(slots=True)
+class CommandTrace:
+    """Timestamps of the stages a single command went through.
+
+    Every stage is recorded with the monotonic time at which it completed,
+    similar to the events of a tracing span.
+    """
+
+    command: int
+    start: float
+    stages: list[tuple[str, float]] = field(default_factory=list)
+    end: float | None = None
+    error: BaseException | None = None
+
+    def mark(self, stage: str) -> None:
+        """Record the completion of a stage."""
+        self.stages.append((stage, time.monotonic()))
+
+    def prepend(self, earlier: CommandTrace) -> None:
+        """Start with the stages of an earlier trace, like a connection made for it."""
+        self.start = earlier.start
+        self.stages[:0] = earlier.stages
+
+    @property
+    def attempts(self) -> int:
+        """Number of attempts made to send the command."""
+        return sum(stage == STAGE_ATTEMPT for stage, _ in self.stages)
+
+    @property
+    def duration(self) -> float | None:
+        """Total duration of the command, if it has finished."""
+        return None if self.end is None else self.end - self.start
+
+    def durations(self) -> dict[str, float]:
+        """Return the time spent in each stage.
+
+        The time of a stage is measured from the completion of the previous
+        stage. Stages that occur repeatedly, like retried attempts, add up.
+        """
+        durations: dict[str, float] = {}
+        previous = self.start
+        for stage, timestamp in self.stages:
+            durations[stage] = durations.get(stage, 0.0) + timestamp - previous
+            previous = timestamp
+        if self.end is not None:
+            durations[STAGE_TOTAL] = self.end - self.start
+        return durations
+
+
+class Histogram:
+    """Counts of durations in fixed buckets."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        """Initialize an empty histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float) -> None:
+        """Add a duration to the histogram."""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        """Mean of all durations added."""
+        return self.sum / self.count if self.count else 0.0
+
+
+class CommandTracer:
+    """Collect per-stage latency histograms of all traced commands.
+
+    ``span_hook`` is called with every finished trace, for example to export
+    it as a span to a tracing system.
+    """
+
+    def __init__(
+        self,
+        span_hook: Callable[[CommandTrace], None] | None = None,
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initialize the tracer."""
+        self._buckets = buckets
+        self._span_hook = span_hook
+        self.histograms: dict[tuple[int, str], Histogram] = {}
+
+    def start(self, command: int) -> CommandTrace:
+        """Start tracing a command."""
+        return CommandTrace(command, time.monotonic())
+
+    def finish(self, trace: CommandTrace, error: BaseException | None = None) -> None:
+        """Finish a trace and add its stage durations to the histograms."""
+        trace.end = time.monotonic()
+        trace.error = error
+        for stage, duration in trace.durations().items():
+            key = (trace.command, stage)
+            if (histogram := self.histograms.get(key)) is None:
+                histogram = self.histograms[key] = Histogram(self._buckets)
+            histogram.add(duration)
+        if self._span_hook is not None:
+            self._span_hook(trace)
@@ -3,11 +3,30 @@
 from __future__ import annotations
 
 from functools import reduce
+from operator import xor
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-from .const import FOOTER, HEADER, REQUEST_HEADER
+from .const import (
+    FOOTER,
+    HEADER,
+    MAX_MESSAGE_LENGTH,
+    MIN_MESSAGE_LENGTH,
+    QUERY_COMMANDS,
+    REQUEST_HEADER,
+    RESPONSE_HEADER,
+    EfireCommand,
+    LedMode,
+    LedState,
+    PowerState,
+)
+from .exceptions import EfireMessageValueError
 
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator, Mapping
 
-def checksum(payload: bytearray | bytes) -> int:
+
+def checksum(payload: bytearray | bytes | memoryview) -> int:
     """Calculate the checksum for a command payload."""
     if len(payload) < 1:
         raise ValueError(
@@ -15,18 +34,275 @@ def checksum(payload: bytearray | bytes) -> int:
         )
 
     # checksum is a single byte XOR of all bytes in the payload
-    return reduce(lambda x, y: x ^ y, payload)
+    return reduce(xor, payload)
 
 
-def checksum_message(message: bytearray | bytes) -> int:
+def checksum_message(message: bytearray | bytes | memoryview) -> int:
     """Calculate the checksum for a raw message."""
     # strip the two header bytes, checksum and footer to get the payload
     return checksum(message[2:-2])
 
 
-def build_message(payload: bytearray | bytes) -> bytes:
+def build_message(
+    payload: bytearray | bytes, message_type: int = REQUEST_HEADER
+) -> bytes:
     """Put together a raw message based on a command payload."""
     # add the length of the message to the beginning of the payload
     # it needs to be part of the payload for checksum calculation
     payload = bytes([len(payload) + 2]) + payload
-    return bytes([HEADER, REQUEST_HEADER, *payload, checksum(payload), FOOTER])
+    return bytes([HEADER, message_type, *payload, checksum(payload), FOOTER])
+
+
+def validate_message(message: bytes | bytearray | memoryview) -> None:
+    """Validate the framing of a raw message."""
+    # the minimum message consists of 6 bytes:
+    # header, message_type, length, command, checksum, footer
+    # the payload is optional and not used in query commands
+    if len(message) < MIN_MESSAGE_LENGTH:
+        msg = f"Message too short. Got {len(message)} bytes, expected at least 6 bytes"
+        raise EfireMessageValueError(msg)
+    if message[0] != HEADER:
+        msg = f"Unknown message header {message[0]}. Expected {HEADER}."
+        raise EfireMessageValueError(msg)
+    if message[1] not in [REQUEST_HEADER, RESPONSE_HEADER]:
+        msg = (
+            f"Unknown message type {message[1]:02x}. Expected"
+            f" {REQUEST_HEADER:02x} or {RESPONSE_HEADER:02x}."
+        )
+        raise EfireMessageValueError(msg)
+    if message[2] != len(message) - 3:
+        msg = f"Incorrect message length {len(message)}. Expected {message[2] + 3}."
+        raise EfireMessageValueError(msg)
+    if message[-2] != checksum_message(message):
+        msg = (
+            f"Invalid checksum {message[-2]}. "
+            f"Calculated checksum {checksum_message(message)}."
+        )
+        raise EfireMessageValueError(msg)
+    if message[-1] != FOOTER:
+        msg = f"Invalid fooer {message[-1]}. Message should end with {FOOTER}."
+        raise EfireMessageValueError(msg)
+
+
+class Frame:
+    """A validated message viewed in place.
+
+    The frame wraps the buffer the message was received or encoded in, so
+    its command, payload and checksum are available without copying.
+    """
+
+    __slots__ = ("_view",)
+
+    def __init__(self, view: memoryview) -> None:
+        """Wrap a read-only view of a message that has been validated."""
+        self._view = view
+
+    @classmethod
+    def from_bytes(cls, message: bytes | bytearray | memoryview) -> Frame:
+        """Validate a message and wrap it without copying."""
+        validate_message(message)
+        return cls(memoryview(message).toreadonly())
+
+    @classmethod
+    def encode(
+        cls,
+        command: int,
+        parameter: bytes | bytearray | memoryview = b"",
+        message_type: int = REQUEST_HEADER,
+        buffer: bytearray | None = None,
+    ) -> Frame:
+        """Encode a message into a buffer.
+
+        If a ``buffer`` is given, the message is written to its beginning and
+        the frame is only valid until the buffer is reused.
+        """
+        size = len(parameter) + MIN_MESSAGE_LENGTH
+        if buffer is None:
+            buffer = bytearray(size)
+        elif len(buffer) < size:
+            msg = f"Buffer too small. Got {len(buffer)} bytes, need {size} bytes"
+            raise EfireMessageValueError(msg)
+        end = size - 2
+        buffer[0] = HEADER
+        buffer[1] = message_type
+        buffer[2] = size - 3
+        buffer[3] = command
+        buffer[4:end] = parameter
+        view = memoryview(buffer)
+        buffer[end] = checksum(view[2:end])
+        buffer[end + 1] = FOOTER
+        return cls(view[:size].toreadonly())
+
+    @property
+    def view(self) -> memoryview:
+        """Read-only view of the complete message."""
+        return self._view
+
+    @property
+    def message_type(self) -> int:
+        """Whether the message is a request or a response."""
+        return self._view[1]
+
+    @property
+    def command(self) -> int:
+        """The command byte of the message."""
+        return self._view[3]
+
+    @property
+    def payload(self) -> memoryview:
+        """The parameter or response data of the message."""
+        return self._view[4:-2]
+
+    @property
+    def checksum(self) -> int:
+        """The checksum byte of the message."""
+        return self._view[-2]
+
+    def hex(self, sep: str = " ") -> str:
+        """Return the message as hexadecimal digits."""
+        return self._view.hex(sep)
+
+    def __len__(self) -> int:
+        """Return the length of the message."""
+        return len(self._view)
+
+    def __bytes__(self) -> bytes:
+        """Copy the message into a bytes object."""
+        return self._view.tobytes()
+
+    def __str__(self) -> str:
+        """Return the message as hexadecimal digits."""
+        return self._view.hex(" ")
+
+    def __repr__(self) -> str:
+        """Represent the frame with its content."""
+        return f"Frame({self._view.hex(' ')})"
+
+    def __eq__(self, other: object) -> bool:
+        """Compare the message to another frame or bytes-like object."""
+        if isinstance(other, Frame):
+            return self._view == other._view
+        if isinstance(other, bytes | bytearray | memoryview):
+            return self._view == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        """Hash the message like the bytes it consists of."""
+        return hash(self._view.tobytes())
+
+
+def _fixed_payloads() -> Iterator[bytes]:
+    """Yield the payloads of all commands with a finite set of parameters."""
+    for command in QUERY_COMMANDS:
+        yield bytes([command])
+    for power_state in PowerState:
+        yield bytes([EfireCommand.SET_POWER, power_state])
+    for led_state in LedState:
+        yield bytes([EfireCommand.SET_LED_POWER, *led_state.long])
+    for led_mode in LedMode:
+        # the value to disable modes is the value for enabling it + 5
+        yield bytes([EfireCommand.SET_LED_MODE, led_mode.setvalue])
+        yield bytes([EfireCommand.SET_LED_MODE, led_mode.setvalue + 0x5])
+    for value in range(0x100):
+        yield bytes([EfireCommand.SET_IFC_CMD1, 0x0, value])
+        yield bytes([EfireCommand.SET_IFC_CMD2, 0x0, value])
+
+
+def _build_fixed_frames() -> Mapping[bytes, Frame]:
+    """Build and validate the request frames for all fixed payloads."""
+    return MappingProxyType(
+        {
+            payload: Frame.from_bytes(build_message(payload))
+            for payload in _fixed_payloads()
+        }
+    )
+
+
+# Complete request frames keyed by their payload (command and parameter)
+FIXED_FRAMES = _build_fixed_frames()
+
+
+class FrameReassembler:
+    """Reassemble messages from a stream of notification data.
+
+    Notifications may carry a fragment of a message or several messages at
+    once. Data is collected in a reusable buffer that is scanned for the
+    message header, and the length byte determines where each message ends.
+    A header with a length no real message has is taken for stray data, so
+    the messages behind it are not held back waiting for data that never
+    arrives.
+    """
+
+    def __init__(
+        self,
+        on_invalid: Callable[[bytes, EfireMessageValueError], None] | None = None,
+    ) -> None:
+        """Initialize the reassembler.
+
+        ``on_invalid`` is called for every complete message that fails
+        validation before the stream is resynchronized past its header.
+        """
+        self._buffer = bytearray()
+        self._on_invalid = on_invalid
+
+    def __len__(self) -> int:
+        """Return the number of buffered bytes."""
+        return len(self._buffer)
+
+    def reset(self) -> None:
+        """Discard any buffered data."""
+        self._buffer.clear()
+
+    def feed(self, data: bytes | bytearray) -> list[Frame]:
+        """Add data to the stream and return all messages it completes.
+
+        A notification holding exactly one message is wrapped without being
+        copied, so it must not be modified afterwards.
+        """
+        buffer = self._buffer
+        if not buffer and len(data) > 2 and data[0] == HEADER:
+            # fast path for the common case of exactly one message
+            if len(data) == data[2] + 3:
+                if self._accept(data):
+                    return [Frame(memoryview(data).toreadonly())]
+                buffer += data[1:]
+                return self._drain([])
+        buffer += data
+        return self._drain([])
+
+    def _drain(self, messages: list[Frame]) -> list[Frame]:
+        buffer = self._buffer
+        while buffer:
+            start = buffer.find(HEADER)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                # discard data that cannot be part of a message
+                del buffer[:start]
+            if len(buffer) < 3:
+                break
+            end = buffer[2] + 3
+            if not MIN_MESSAGE_LENGTH <= end <= MAX_MESSAGE_LENGTH:
+                # resynchronize on the next header
+                del buffer[:1]
+                continue
+            if len(buffer) < end:
+                break
+            message = bytes(buffer[:end])
+            if self._accept(message):
+                messages.append(Frame(memoryview(message)))
+                del buffer[:end]
+            else:
+                # resynchronize on the next header
+                del buffer[:1]
+        return messages
+
+    def _accept(self, message: bytes | bytearray) -> bool:
+        try:
+            validate_message(message)
+        except EfireMessageValueError as ex:
+            if self._on_invalid is not None:
+                self._on_invalid(bytes(message), ex)
+            return False
+        return True
@@ -68,7 +68,10 @@ async def test_power_on_requires_auth(fireplace):
     # Set password first since needs_auth decorator checks it
     fireplace._password = "1234"  # noqa: SLF001
 
-    with patch.object(fireplace, "authenticate", new_callable=AsyncMock) as mock_auth:
+    with (
+        patch.object(fireplace, "_ensure_connected", new_callable=AsyncMock),
+        patch.object(fireplace, "authenticate", new_callable=AsyncMock) as mock_auth,
+    ):
         mock_auth.return_value = False
 
         with pytest.raises(AuthError):
@@ -547,14 +550,17 @@ async def test_update_remote_usage(fireplace):
     with patch.object(
         fireplace, "execute_command", new_callable=AsyncMock
     ) as mock_exec:
-        mock_exec.return_value = AuxControlState.USED
+        mock_exec.return_value = bytes([AuxControlState.USED])
+
+        await fireplace.update_remote_usage()
+
+        assert fireplace.state.remote_in_use is True
+
+        mock_exec.return_value = bytes([AuxControlState.NOT_USED])
 
         await fireplace.update_remote_usage()
 
-        # AuxControlState.USED == 0x00, which is falsy, so check the actual value
-        assert fireplace.state.remote_in_use == (
-            AuxControlState.USED == AuxControlState.USED
-        )
+        assert fireplace.state.remote_in_use is False
 
 
 @pytest.mark.asyncio
@@ -0,0 +1,91 @@
+"""Tests for the circuit breaker of connection attempts."""
+
+from bleak.backends.scanner import AdvertisementData
+from bleak_retry_connector import BleakNotFoundError
+import pytest
+
+from bonaparte.breaker import CircuitBreaker
+from bonaparte.const import EfireCommand, PowerState
+from bonaparte.device import EfireDevice
+from bonaparte.exceptions import DeviceUnreachableError
+from bonaparte.testing import SimulatedFireplace
+
+
+def test_opens_after_consecutive_failures() -> None:
+    """Test that the breaker opens after the threshold and probes later."""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure(0)
+    assert breaker.allow(1)
+    breaker.record_failure(1)
+
+    assert breaker.is_open
+    assert not breaker.allow(5)
+    assert breaker.retry_in(5) == 6
+
+    # a failed probe opens the breaker again right away
+    assert breaker.allow(11)
+    breaker.record_failure(12)
+    assert not breaker.allow(13)
+
+    assert breaker.allow(22)
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.failures == 0
+
+
+def test_half_open() -> None:
+    """Test that a closed breaker is not affected by allowing a probe."""
+    breaker = CircuitBreaker(failure_threshold=1)
+    breaker.half_open()
+    assert breaker.allow(0)
+
+    breaker.record_failure(0)
+    assert not breaker.allow(1)
+    breaker.half_open()
+    assert breaker.allow(1)
+    assert breaker.retry_in(1) == 0
+
+
+def test_invalid_threshold() -> None:
+    """Test that the failure threshold must be positive."""
+    with pytest.raises(ValueError, match="at least 1"):
+        CircuitBreaker(failure_threshold=0)
+
+
+@pytest.mark.asyncio
+async def test_unreachable_device_fails_fast() -> None:
+    """Test that commands fail immediately while the device is unreachable."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(
+        simulator.ble_device, circuit_breaker=CircuitBreaker(reset_timeout=60)
+    )
+    simulator.attach(device)
+    connect = device._connector  # noqa: SLF001
+    attempts = 0
+
+    async def unreachable():
+        nonlocal attempts
+        attempts += 1
+        msg = "Device not found"
+        raise BleakNotFoundError(msg)
+
+    device._connector = unreachable  # noqa: SLF001
+    for _ in range(3):
+        with pytest.raises(BleakNotFoundError):
+            await device.execute_command(EfireCommand.GET_POWER_STATE)
+    with pytest.raises(DeviceUnreachableError, match="failed to connect 3 times"):
+        await device.execute_command(EfireCommand.GET_POWER_STATE)
+    assert attempts == 3
+    assert device.circuit_breaker.is_open
+
+    # an advertisement shows the device is back in range
+    device._connector = connect  # noqa: SLF001
+    device.set_ble_device_and_advertisement_data(
+        simulator.ble_device,
+        AdvertisementData(None, {}, {}, [], None, -60, ()),
+    )
+    assert await device.execute_command(EfireCommand.GET_POWER_STATE) == bytes(
+        [PowerState.OFF]
+    )
+    assert not device.circuit_breaker.is_open
+    await device.disconnect()
@@ -0,0 +1,123 @@
+"""Tests for the persistent cache of device profiles."""
+
+import asyncio
+import json
+
+import pytest
+
+from bonaparte import Fireplace, FireplaceFeatures
+from bonaparte.cache import CACHE_VERSION, DeviceProfile, ProfileCache
+from bonaparte.testing import SimulatedFireplace
+
+ADDRESS = "AA:BB:CC:DD:EE:FF"
+
+
+def simulated(**kwargs):
+    """Return a fireplace attached to a simulated controller."""
+    simulator = SimulatedFireplace(address=ADDRESS)
+    simulator.cmd2 = 0x23
+    simulator.power = True
+    fireplace = Fireplace(simulator.ble_device, **kwargs)
+    simulator.attach(fireplace)
+    return fireplace, simulator
+
+
+@pytest.mark.asyncio
+async def test_cold_start(tmp_path) -> None:
+    """Test that a restarted fireplace serves its cached profile right away."""
+    fireplace, simulator = simulated(
+        features=FireplaceFeatures(blower=True, led_lights=True), password="0000"
+    )
+    cache = ProfileCache(tmp_path / "profiles.json")
+    cache.track(fireplace)
+    await fireplace.update_firmware_version()
+    await fireplace.update_state()
+    await asyncio.sleep(0)
+    await fireplace.disconnect()
+    assert cache.dirty
+    cache.save()
+    assert not cache.dirty
+
+    restarted, restarted_simulator = simulated()
+    assert ProfileCache(tmp_path / "profiles.json").restore(restarted)
+    assert restarted.state == fireplace.state
+    assert restarted.features == fireplace.features
+    assert restarted.state.ble_version == "8"
+    assert restarted_simulator.connect_count == 0
+    assert simulator.connect_count == 1
+
+
+@pytest.mark.asyncio
+async def test_restore_notifies_subscribers() -> None:
+    """Test that restoring a profile reports the restored fields."""
+    fireplace, _ = simulated()
+    changes = []
+    fireplace.subscribe(changes.append, ["flame_height"])
+    packed = bytearray(fireplace.state.packed)
+    packed[1] = 0x05
+    fireplace.restore_profile(DeviceProfile(state=bytes(packed)))
+    await asyncio.sleep(0)
+    assert changes == [{"flame_height": 5}]
+
+
+def test_restore_outside_event_loop() -> None:
+    """Test that subscribers are called right away without a running loop."""
+    fireplace, _ = simulated()
+    changes = []
+    fireplace.subscribe(changes.append)
+    fireplace.restore_profile(DeviceProfile(mcu_version="1.14"))
+    assert changes == [{"mcu_version": "1.14"}]
+
+
+def test_profile_lookup_ignores_case(tmp_path) -> None:
+    """Test that profiles are keyed by the address in any case."""
+    cache = ProfileCache(tmp_path / "profiles.json")
+    cache.put(ADDRESS.lower(), DeviceProfile(mcu_version="1.14"))
+    assert ADDRESS in cache
+    assert cache.get(ADDRESS).mcu_version == "1.14"
+
+    cache.remove(ADDRESS)
+    assert len(cache) == 0
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "not json",
+        json.dumps({"version": CACHE_VERSION + 1, "devices": {ADDRESS: {}}}),
+        json.dumps({"version": CACHE_VERSION, "devices": []}),
+    ],
+)
+def test_invalid_cache_file(tmp_path, content) -> None:
+    """Test that unreadable cache files and other versions are ignored."""
+    path = tmp_path / "profiles.json"
+    path.write_text(content)
+    assert len(ProfileCache(path)) == 0
+
+
+def test_invalid_entries(tmp_path) -> None:
+    """Test that entries that cannot be decoded are skipped."""
+    path = tmp_path / "profiles.json"
+    valid = DeviceProfile(features=frozenset({"timer"}), state=bytes(10))
+    data = {
+        "version": CACHE_VERSION,
+        "devices": {
+            ADDRESS: valid.to_json(),
+            "00:00:00:00:00:01": {**valid.to_json(), "state": "00"},
+            "00:00:00:00:00:02": {"features": []},
+        },
+    }
+    path.write_text(json.dumps(data))
+
+    cache = ProfileCache(path)
+    assert len(cache) == 1
+    assert cache.get(ADDRESS) == valid
+
+
+def test_unknown_features_discard_profile(tmp_path) -> None:
+    """Test that a profile with unknown features is discarded on restore."""
+    fireplace, _ = simulated()
+    cache = ProfileCache(tmp_path / "profiles.json")
+    cache.put(ADDRESS, DeviceProfile(features=frozenset({"fountain"})))
+    assert not cache.restore(fireplace)
+    assert ADDRESS not in cache
@@ -0,0 +1,232 @@
+"""Tests for decoding eFIRE traffic from HCI captures."""
+
+import math
+import struct
+
+import pytest
+
+from bonaparte.capture import (
+    BTSNOOP_EPOCH_OFFSET,
+    CapturedFrame,
+    decode_capture,
+    read_frames,
+    timeline,
+    to_columns,
+)
+from bonaparte.const import RESPONSE_HEADER, EfireCommand, PowerState, ReturnCode
+from bonaparte.exceptions import CaptureFormatError
+from bonaparte.utils import build_message
+
+ATT_WRITE_COMMAND = 0x52
+ATT_NOTIFICATION = 0x1B
+CONNECTION = 0x0040
+
+
+def request(command, *parameter):
+    """Build a request frame."""
+    return build_message(bytes([command, *parameter]))
+
+
+def response(command, *data):
+    """Build a response frame."""
+    return build_message(bytes([command, *data]), RESPONSE_HEADER)
+
+
+def acl(value, opcode=ATT_WRITE_COMMAND, connection=CONNECTION):
+    """Wrap an ATT value in L2CAP and HCI ACL headers."""
+    att = bytes([opcode]) + struct.pack("<H", 0x001E) + value
+    l2cap = struct.pack("<HH", len(att), 0x0004) + att
+    return struct.pack("<HH", connection, len(l2cap)) + l2cap
+
+
+def btsnoop(records):
+    """Build a btsnoop log with H4 records of ACL data."""
+    data = b"btsnoop\0" + struct.pack(">II", 1, 1002)
+    for timestamp, packet in records:
+        packet = b"\x02" + packet
+        data += struct.pack(
+            ">IIIIq",
+            len(packet),
+            len(packet),
+            0,
+            0,
+            round(timestamp * 1_000_000) + BTSNOOP_EPOCH_OFFSET,
+        )
+        data += packet
+    return data
+
+
+def btmon(records):
+    """Build a btsnoop log of the BlueZ monitor, with an event between records."""
+    data = b"btsnoop\0" + struct.pack(">II", 1, 2001)
+    for timestamp, packet in records:
+        # controller index 1, ACL data sent and an unrelated HCI event
+        for opcode, payload in ((0x10004, packet), (0x10003, b"\x13\x05\x01")):
+            data += struct.pack(
+                ">IIIIq",
+                len(payload),
+                len(payload),
+                opcode,
+                0,
+                round(timestamp * 1_000_000) + BTSNOOP_EPOCH_OFFSET,
+            )
+            data += payload
+    return data
+
+
+def pcap(records):
+    """Build a pcap file with H4 records with direction pseudo headers."""
+    data = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 0xFFFF, 201)
+    for timestamp, packet in records:
+        packet = b"\x00\x00\x00\x00\x02" + packet
+        seconds = int(timestamp)
+        data += struct.pack(
+            "<IIII",
+            seconds,
+            round((timestamp - seconds) * 1_000_000),
+            len(packet),
+            len(packet),
+        )
+        data += packet
+    return data
+
+
+RECORDS = [
+    (100.0, acl(request(EfireCommand.GET_IFC_CMD2_STATE))),
+    (
+        100.25,
+        acl(response(EfireCommand.GET_IFC_CMD2_STATE, 0x00, 0x34), ATT_NOTIFICATION),
+    ),
+    (101.0, acl(request(EfireCommand.SET_POWER, PowerState.ON))),
+    # the response is split across two notifications
+    (
+        101.5,
+        acl(response(EfireCommand.SET_POWER, ReturnCode.SUCCESS)[:4], ATT_NOTIFICATION),
+    ),
+    (
+        101.75,
+        acl(response(EfireCommand.SET_POWER, ReturnCode.SUCCESS)[4:], ATT_NOTIFICATION),
+    ),
+]
+
+
+@pytest.mark.parametrize("build", [btsnoop, btmon, pcap])
+def test_read_frames(tmp_path, build) -> None:
+    """Test extracting eFIRE messages from btsnoop and pcap files."""
+    path = tmp_path / "capture.log"
+    path.write_bytes(build(RECORDS))
+
+    frames = list(read_frames(path))
+
+    assert [frame.command for frame in frames] == [
+        EfireCommand.GET_IFC_CMD2_STATE,
+        EfireCommand.GET_IFC_CMD2_STATE,
+        EfireCommand.SET_POWER,
+        EfireCommand.SET_POWER,
+    ]
+    assert [frame.is_response for frame in frames] == [False, True, False, True]
+    assert frames[1].data == bytes([0x00, 0x34])
+    assert frames[1].timestamp == pytest.approx(100.25)
+    assert frames[3].timestamp == pytest.approx(101.75)
+    assert {frame.connection for frame in frames} == {CONNECTION}
+
+
+def test_read_frames_fragmented_acl(tmp_path) -> None:
+    """Test reassembling L2CAP frames from ACL continuation fragments."""
+    packet = acl(request(EfireCommand.SET_IFC_CMD2, 0x00, 0x03))
+    first = struct.pack("<HH", CONNECTION, 6) + packet[4:10]
+    second = struct.pack("<HH", CONNECTION | 0x1000, len(packet) - 10) + packet[10:]
+    path = tmp_path / "capture.log"
+    path.write_bytes(btsnoop([(1.0, first), (2.0, second)]))
+
+    (frame,) = read_frames(path)
+
+    assert frame.message == request(EfireCommand.SET_IFC_CMD2, 0x00, 0x03)
+    assert frame.timestamp == pytest.approx(2.0)
+
+
+def test_read_frames_invalid_file(tmp_path) -> None:
+    """Test that files of unknown formats are rejected."""
+    path = tmp_path / "capture.log"
+    path.write_bytes(b"\x00" * 32)
+    with pytest.raises(CaptureFormatError, match="neither a btsnoop nor a pcap"):
+        list(read_frames(path))
+
+    path.write_bytes(b"")
+    with pytest.raises(CaptureFormatError):
+        list(read_frames(path))
+
+
+def test_decode_capture(tmp_path) -> None:
+    """Test building the state timeline of a capture."""
+    path = tmp_path / "capture.log"
+    path.write_bytes(btsnoop(RECORDS))
+
+    first, second = decode_capture(path)
+
+    assert first.command == EfireCommand.GET_IFC_CMD2_STATE
+    assert first.latency == pytest.approx(0.25)
+    assert first.ok
+    assert first.state.flame_height == 4
+    assert first.state.blower_speed == 3
+    assert first.state.bt_power is False
+
+    assert second.command == EfireCommand.SET_POWER
+    assert second.parameter == bytes([PowerState.ON])
+    assert second.latency == pytest.approx(0.75)
+    assert second.state.bt_power is True
+    assert second.state.flame_height == 4
+
+
+def test_timeline_failures() -> None:
+    """Test that failed and unanswered commands appear in the timeline."""
+    frames = [
+        CapturedFrame(1.0, 1, request(EfireCommand.SET_IFC_CMD2, 0x00, 0x05)),
+        CapturedFrame(1.2, 1, response(EfireCommand.SET_IFC_CMD2, ReturnCode.FAILURE)),
+        CapturedFrame(2.0, 1, request(EfireCommand.GET_POWER_STATE)),
+        CapturedFrame(3.0, 1, request(EfireCommand.GET_POWER_STATE)),
+        CapturedFrame(4.0, 2, response(EfireCommand.GET_POWER_STATE, PowerState.ON)),
+    ]
+
+    failed, repeated, unsolicited, unanswered = timeline(frames)
+
+    assert not failed.ok
+    assert failed.state.flame_height == 0
+
+    assert repeated.response is None
+    assert repeated.sent == 2.0
+    assert repeated.timestamp == 3.0
+    assert repeated.latency is None
+    assert not repeated.ok
+
+    # responses on another connection track a separate state
+    assert unsolicited.connection == 2
+    assert unsolicited.sent is None
+    assert unsolicited.state.bt_power is True
+
+    assert unanswered.sent == 3.0
+    assert unanswered.timestamp == 4.0
+    assert unanswered.state.bt_power is False
+
+
+def test_to_columns() -> None:
+    """Test exporting the timeline as columns."""
+    frames = [
+        CapturedFrame(1.0, 1, request(EfireCommand.GET_IFC_CMD2_STATE)),
+        CapturedFrame(1.5, 1, response(EfireCommand.GET_IFC_CMD2_STATE, 0x00, 0x02)),
+        CapturedFrame(2.0, 1, request(EfireCommand.GET_TIMER)),
+    ]
+
+    columns = to_columns(timeline(frames))
+
+    assert list(columns["timestamp"]) == [1.5, 2.0]
+    assert list(columns["command"]) == [
+        EfireCommand.GET_IFC_CMD2_STATE,
+        EfireCommand.GET_TIMER,
+    ]
+    assert columns["latency"][0] == pytest.approx(0.5)
+    assert math.isnan(columns["latency"][1])
+    assert list(columns["ok"]) == [1, 0]
+    assert list(columns["flame_height"]) == [2, 2]
+    assert columns["time_left"] == [(0, 0, 0), (0, 0, 0)]
+    assert columns["flame_height"].typecode == "q"
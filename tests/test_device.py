@@ -1,11 +1,24 @@
 """Tests for device.py functionality."""
 
+import asyncio
+
 from bleak.backends.device import BLEDevice
 import pytest
 
-from bonaparte.const import FOOTER, HEADER
+from bonaparte.const import (
+    FOOTER,
+    HEADER,
+    EfireCommand,
+    PasswordCommandResult,
+    PowerState,
+)
 from bonaparte.device import EfireDevice
-from bonaparte.exceptions import EfireMessageValueError
+from bonaparte.exceptions import (
+    CommandTimeoutError,
+    DisconnectedException,
+    EfireMessageValueError,
+)
+from bonaparte.testing import SimulatedFireplace
 
 
 def test_message_validation_too_short() -> None:
@@ -124,3 +137,347 @@ def test_device_address() -> None:
     """Test that device address property works correctly."""
     device = EfireDevice(BLEDevice("aa:bb:cc:dd:ee:ff", "TestDevice", details=None))
     assert device.address == "aa:bb:cc:dd:ee:ff"
+
+
+@pytest.mark.asyncio
+async def test_concurrent_queries_are_coalesced() -> None:
+    """Test that identical concurrent queries share a single round trip."""
+    simulator = SimulatedFireplace(latency=0.01)
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    simulator.cmd2 = 0x23
+
+    results = await asyncio.gather(
+        *(device.execute_command(EfireCommand.GET_IFC_CMD2_STATE) for _ in range(3)),
+        device.execute_command(EfireCommand.GET_IFC_CMD1_STATE),
+    )
+
+    assert results == [b"\x00\x23"] * 3 + [b"\x00\x00"]
+    assert simulator.write_count == 2
+    assert not device._inflight_queries  # noqa: SLF001
+
+    await device.execute_command(EfireCommand.GET_IFC_CMD2_STATE)
+    assert simulator.write_count == 3
+
+
+@pytest.mark.asyncio
+async def test_coalesced_query_survives_cancelled_caller() -> None:
+    """Test that cancelling one caller does not cancel the shared query."""
+    simulator = SimulatedFireplace(latency=0.01)
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+
+    first = asyncio.create_task(device.execute_command(EfireCommand.GET_POWER_STATE))
+    second = asyncio.create_task(device.execute_command(EfireCommand.GET_POWER_STATE))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == bytes([PowerState.OFF])
+    assert first.cancelled()
+    assert simulator.write_count == 1
+
+
+@pytest.mark.asyncio
+async def test_pipelined_commands_routed_by_command() -> None:
+    """Test that out of order responses reach the request they belong to."""
+    simulator = SimulatedFireplace(latency=0.02, jitter=0.015, seed=1)
+    device = EfireDevice(simulator.ble_device, pipeline_depth=4)
+    simulator.attach(device)
+    simulator.cmd1 = 0x31
+    simulator.cmd2 = 0x23
+    simulator.power = True
+
+    results = await asyncio.gather(
+        device.execute_command(EfireCommand.GET_IFC_CMD1_STATE),
+        device.execute_command(EfireCommand.GET_IFC_CMD2_STATE),
+        device.execute_command(EfireCommand.GET_POWER_STATE),
+        device.execute_command(EfireCommand.GET_MCU_VERSION),
+    )
+
+    assert results == [b"\x00\x31", b"\x00\x23", b"\xff", b"\x01\x01\x04"]
+    # all four requests were outstanding at the same time
+    assert simulator.max_in_flight == 4
+
+
+@pytest.mark.asyncio
+async def test_pipeline_depth_limits_outstanding_commands() -> None:
+    """Test that no more than pipeline_depth commands are outstanding."""
+    simulator = SimulatedFireplace(latency=0.01)
+    device = EfireDevice(simulator.ble_device, pipeline_depth=2)
+    simulator.attach(device)
+    outstanding = []
+
+    write_gatt_char = simulator.write_gatt_char
+
+    async def recording_write(char, data, response=None):
+        outstanding.append(len(device._response_futures))  # noqa: SLF001
+        await write_gatt_char(char, data, response)
+
+    simulator.write_gatt_char = recording_write
+    await asyncio.gather(
+        device.execute_command(EfireCommand.GET_IFC_CMD1_STATE),
+        device.execute_command(EfireCommand.GET_IFC_CMD2_STATE),
+        device.execute_command(EfireCommand.GET_POWER_STATE),
+        device.execute_command(EfireCommand.GET_TIMER),
+    )
+
+    assert max(outstanding) == 2
+
+
+def test_invalid_pipeline_depth() -> None:
+    """Test that the pipeline depth must be positive."""
+    with pytest.raises(ValueError, match="Pipeline depth must be at least 1"):
+        EfireDevice(
+            BLEDevice("aa:bb:cc:dd:ee:ff", "Test", details=None), pipeline_depth=0
+        )
+
+
+@pytest.mark.asyncio
+async def test_unsolicited_response_is_ignored() -> None:
+    """Test that a response for a command nobody waits for is dropped."""
+    simulator = SimulatedFireplace(latency=0.01)
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    task = asyncio.create_task(device.execute_command(EfireCommand.GET_POWER_STATE))
+    await asyncio.sleep(0)
+
+    device._notification_handler(  # noqa: SLF001
+        None, bytearray.fromhex("ab bb 04 c5 35 f4 55")
+    )
+    assert await task == bytes([PowerState.OFF])
+
+
+@pytest.mark.asyncio
+async def test_disconnect_fails_all_pending_commands() -> None:
+    """Test that a disconnect fails every pending command."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, pipeline_depth=2)
+    simulator.attach(device)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    simulator.latency = 1
+    tasks = [
+        asyncio.create_task(device.execute_command(EfireCommand.GET_POWER_STATE)),
+        asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER)),
+    ]
+    await asyncio.sleep(0.01)
+    simulator.simulate_disconnect()
+
+    for task in tasks:
+        with pytest.raises(DisconnectedException):
+            await task
+
+
+@pytest.mark.asyncio
+async def test_fragmented_response() -> None:
+    """Test that a response split across notifications is reassembled."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    simulator.latency = 1
+
+    task = asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER))
+    await asyncio.sleep(0.01)
+    response = bytes.fromhex("ab bb 07 e6 14 0e 01 37 cd 55")
+    device._notification_handler(None, bytearray(response[:5]))  # noqa: SLF001
+    device._notification_handler(None, bytearray(response[5:]))  # noqa: SLF001
+
+    assert await task == bytes.fromhex("14 0e 01 37")
+
+
+@pytest.mark.asyncio
+async def test_invalid_response_fails_pending_command() -> None:
+    """Test that an invalid response fails the command it belongs to."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    simulator.latency = 1
+
+    task = asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER))
+    await asyncio.sleep(0.01)
+    device._notification_handler(  # noqa: SLF001
+        None, bytearray.fromhex("ab bb 07 e6 14 0e 01 37 00 55")
+    )
+
+    with pytest.raises(EfireMessageValueError, match="Invalid checksum"):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_set_commands_overtake_queued_queries() -> None:
+    """Test that a set command is sent before queued background queries."""
+    simulator = SimulatedFireplace(latency=0.01)
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    sent = []
+    handle_command = simulator.handle_command
+
+    def recording_handler(command, parameter):
+        sent.append(command)
+        return handle_command(command, parameter)
+
+    simulator.handle_command = recording_handler
+    queries = [
+        EfireCommand.GET_IFC_CMD1_STATE,
+        EfireCommand.GET_IFC_CMD2_STATE,
+        EfireCommand.GET_POWER_STATE,
+        EfireCommand.GET_TIMER,
+    ]
+    polls = [asyncio.create_task(device.execute_command(query)) for query in queries]
+    duplicate = asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER))
+    await asyncio.sleep(0.005)
+
+    await device.execute_command(EfireCommand.SET_POWER, PowerState.ON)
+    await asyncio.gather(*polls, duplicate)
+
+    assert sent == [queries[0], EfireCommand.SET_POWER, *queries[1:]]
+    assert device.queue_metrics.coalesced == 1
+    assert device.queue_metrics.max_depth == 4
+
+
+@pytest.mark.asyncio
+async def test_late_response_after_timeout_is_discarded() -> None:
+    """Test that a response arriving after the timeout is not used later."""
+    simulator = SimulatedFireplace(latency=0.05)
+    device = EfireDevice(simulator.ble_device, response_timeout=0.03)
+    simulator.attach(device)
+
+    with pytest.raises(CommandTimeoutError, match="No response to command e7"):
+        await device.execute_command(EfireCommand.GET_POWER_STATE)
+    assert not device._response_futures  # noqa: SLF001
+
+    # the late response still reports the fireplace as off
+    simulator.power = True
+    device._response_timeout = 1  # noqa: SLF001
+    assert await device.execute_command(EfireCommand.GET_POWER_STATE) == bytes(
+        [PowerState.ON]
+    )
+
+
+@pytest.mark.asyncio
+async def test_lost_response_does_not_block_later_commands() -> None:
+    """Test that the requests after a lost response to the same command succeed."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, response_timeout=0.02)
+    simulator.attach(device)
+    write_gatt_char = simulator.write_gatt_char
+    lost = []
+
+    async def lossy_write(char, data, response=None):
+        if not lost:
+            lost.append(bytes(data))
+            return
+        await write_gatt_char(char, data, response)
+
+    simulator.write_gatt_char = lossy_write
+    with pytest.raises(CommandTimeoutError):
+        await device.execute_command(EfireCommand.GET_POWER_STATE)
+    # the timeout is not retried, and the connection is started over
+    assert len(lost) == 1
+    assert not device.is_connected
+
+    simulator.power = True
+    for _ in range(3):
+        assert await device.execute_command(EfireCommand.GET_POWER_STATE) == bytes(
+            [PowerState.ON]
+        )
+    assert simulator.connect_count == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect_after_timeout_is_expected(caplog) -> None:
+    """Test that the disconnect after a timeout is not reported as unexpected."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, pipeline_depth=2, response_timeout=0.02)
+    simulator.attach(device)
+    await device.prepare()
+    simulator.latency = 1
+    disconnects = []
+    device._register_disconnect_callback(disconnects.append)  # noqa: SLF001
+
+    first = asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER))
+    await asyncio.sleep(0.01)
+    second = asyncio.create_task(device.execute_command(EfireCommand.GET_POWER_STATE))
+
+    with pytest.raises(CommandTimeoutError):
+        await first
+    with pytest.raises(DisconnectedException):
+        await second
+    assert disconnects == [device]
+    assert "unexpectedly" not in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_timeout_discards_partial_response() -> None:
+    """Test that a fragment received before a timeout is not kept."""
+    simulator = SimulatedFireplace(latency=1)
+    device = EfireDevice(simulator.ble_device, response_timeout=0.02)
+    simulator.attach(device)
+
+    task = asyncio.create_task(device.execute_command(EfireCommand.GET_TIMER))
+    await asyncio.sleep(0.005)
+    device._notification_handler(None, bytearray.fromhex("ab bb 07 e6"))  # noqa: SLF001
+    with pytest.raises(CommandTimeoutError):
+        await task
+    assert len(device._reassembler) == 0  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_lost_response_after_cancellation_expires() -> None:
+    """Test that a cancelled request whose response is lost is forgotten."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, response_timeout=0.02)
+    simulator.attach(device)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    write_gatt_char = simulator.write_gatt_char
+
+    async def lossy_write(char, data, response=None):
+        simulator.write_count += 1
+
+    simulator.write_gatt_char = lossy_write
+    task = asyncio.create_task(
+        device.execute_command(EfireCommand.SEND_PASSWORD, b"0000")
+    )
+    await asyncio.sleep(0.005)
+    task.cancel()
+    simulator.write_gatt_char = write_gatt_char
+    await asyncio.sleep(0.03)
+
+    response = await device.execute_command(EfireCommand.SEND_PASSWORD, b"0000")
+    assert response[0] == PasswordCommandResult.LOGIN_SUCCESS
+    assert simulator.connect_count == 1
+
+
+@pytest.mark.asyncio
+async def test_late_response_after_cancellation_is_discarded() -> None:
+    """Test that the response to a cancelled request is not used later."""
+    simulator = SimulatedFireplace(latency=0.03)
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+
+    task = asyncio.create_task(
+        device.execute_command(EfireCommand.SEND_PASSWORD, b"9999")
+    )
+    await asyncio.sleep(0.01)
+    task.cancel()
+
+    response = await device.execute_command(EfireCommand.SEND_PASSWORD, b"0000")
+    assert response[0] == PasswordCommandResult.LOGIN_SUCCESS
+
+
+@pytest.mark.asyncio
+async def test_call_deadline() -> None:
+    """Test that a call times out without failing a shared query."""
+    simulator = SimulatedFireplace(latency=0.03)
+    device = EfireDevice(simulator.ble_device, command_timeout=0.01)
+    simulator.attach(device)
+
+    shared = asyncio.create_task(
+        device.execute_command(EfireCommand.GET_POWER_STATE, timeout=1)
+    )
+    await asyncio.sleep(0)
+    with pytest.raises(CommandTimeoutError, match="did not complete within 0.01 s"):
+        await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+    assert await shared == bytes([PowerState.OFF])
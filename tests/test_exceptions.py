@@ -4,8 +4,10 @@ import pytest
 
 from bonaparte.exceptions import (
     AuthError,
+    CaptureFormatError,
     CharacteristicMissingError,
     CommandFailedException,
+    DeviceUnreachableError,
     DisconnectedException,
     EfireException,
     EfireMessageValueError,
@@ -86,3 +88,9 @@ def test_exception_hierarchy() -> None:
     # EfireMessageValueError inherits from ValueError
     assert issubclass(EfireMessageValueError, ValueError)
     assert issubclass(EfireMessageValueError, Exception)
+    assert issubclass(CaptureFormatError, ValueError)
+
+
+def test_device_unreachable_error() -> None:
+    """Test DeviceUnreachableError exception."""
+    assert issubclass(DeviceUnreachableError, EfireException)
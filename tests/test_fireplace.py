@@ -1,9 +1,21 @@
 """Tests for Fireplace class functionality."""
 
+import asyncio
+import time
+
 from bleak.backends.device import BLEDevice
+from bleak.exc import BleakError
 import pytest
 
 from bonaparte import Fireplace, FireplaceFeatures, FireplaceState
+from bonaparte.const import EfireCommand
+from bonaparte.exceptions import (
+    AuthError,
+    CharacteristicMissingError,
+    CommandTimeoutError,
+)
+from bonaparte.state import QUERY_FIELDS
+from bonaparte.testing import SimulatedFireplace
 
 
 def test_fireplace_initialization() -> None:
@@ -228,3 +240,448 @@ def test_fireplace_state_updates() -> None:
     assert fireplace.state.flame_height == 5
     assert fireplace.state.blower_speed == 3
     assert fireplace.state.led_color == (255, 128, 0)
+
+
+@pytest.mark.asyncio
+async def test_update_state_skips_fresh_values() -> None:
+    """Test that update_state only queries values that are not fresh."""
+    simulator = SimulatedFireplace()
+    features = FireplaceFeatures(blower=True, led_lights=True)
+    fireplace = Fireplace(simulator.ble_device, features)
+    simulator.attach(fireplace)
+    await fireplace.authenticate("0000")
+
+    await fireplace.update_state()
+    assert simulator.write_count == 7
+
+    await fireplace.set_blower_speed(2)
+    await fireplace.led_on()
+    writes = simulator.write_count
+    await fireplace.update_state(max_age=60)
+    assert simulator.write_count == writes
+
+    # values are re-read once they are older than max_age
+    await fireplace.update_state(max_age=0)
+    assert simulator.write_count == writes + 6
+    assert fireplace.state.blower_speed == 2
+    assert fireplace.state.led is True
+
+
+@pytest.mark.asyncio
+async def test_update_state_uses_configured_ttls() -> None:
+    """Test that configured TTLs apply when no max_age is given."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(
+        simulator.ble_device, state_ttls={EfireCommand.GET_IFC_CMD1_STATE: 60}
+    )
+    simulator.attach(fireplace)
+    await fireplace.authenticate("0000")
+
+    await fireplace.set_night_light_brightness(3)
+    writes = simulator.write_count
+    await fireplace.update_state()
+    assert simulator.write_count == writes + 2
+
+    simulator.simulate_disconnect()
+    await fireplace.update_state()
+    assert simulator.write_count == writes + 6
+
+
+@pytest.mark.asyncio
+async def test_update_state_pipelined() -> None:
+    """Test that update_state pipelines its queries."""
+    simulator = SimulatedFireplace(latency=0.02)
+    features = FireplaceFeatures(led_lights=True, timer=True)
+    fireplace = Fireplace(simulator.ble_device, features, pipeline_depth=8)
+    simulator.attach(fireplace)
+    await fireplace.authenticate("0000")
+    simulator.led = True
+
+    await fireplace.update_state()
+
+    assert simulator.max_in_flight == 7
+    assert simulator.write_count == 8
+    assert fireplace.state.led is True
+
+
+@pytest.mark.asyncio
+async def test_connection_is_authenticated_on_connect() -> None:
+    """Test that a known password authenticates new connections."""
+    simulator = SimulatedFireplace(password="1234")
+    fireplace = Fireplace(simulator.ble_device, password="1234")
+    simulator.attach(fireplace)
+
+    await asyncio.gather(
+        fireplace.set_night_light_brightness(2), fireplace.update_ifc_cmd2_state()
+    )
+
+    # a single login is shared by both commands
+    assert simulator.write_count == 3
+    assert simulator.authenticated is True
+
+    simulator.simulate_disconnect()
+    assert await fireplace.set_flame_height(3) is True
+    assert simulator.connect_count == 2
+    assert simulator.write_count == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_authentication_on_connect() -> None:
+    """Test that a wrong password still fails the command."""
+    simulator = SimulatedFireplace(password="1234")
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+
+    with pytest.raises(AuthError):
+        await fireplace.set_night_light_brightness(2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("error", [None, BleakError("write failed")])
+async def test_interrupted_authentication_on_connect(error) -> None:
+    """Test that a login that times out or fails to send releases the device."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000", response_timeout=0.02)
+    simulator.attach(fireplace)
+    write_gatt_char = simulator.write_gatt_char
+
+    async def failing_write(char, data, response=None):
+        if data[3] != EfireCommand.SEND_PASSWORD:
+            await write_gatt_char(char, data, response)
+        elif error is not None:
+            raise error
+
+    simulator.write_gatt_char = failing_write
+    async with asyncio.timeout(1):
+        with pytest.raises((CommandTimeoutError, CharacteristicMissingError)):
+            await fireplace.set_flame_height(2)
+    assert not fireplace.is_connected
+    assert not fireplace._connect_lock.locked()  # noqa: SLF001
+
+    simulator.write_gatt_char = write_gatt_char
+    async with asyncio.timeout(1):
+        assert await fireplace.set_flame_height(2) is True
+    assert simulator.connect_count == 2
+    assert simulator.authenticated is True
+
+
+@pytest.mark.asyncio
+async def test_changes_before_subscribing_are_not_reported() -> None:
+    """Test that changes are only tracked while someone is subscribed."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    published = fireplace._published  # noqa: SLF001
+    simulator.cmd1 = 0x31
+    await fireplace.update_ifc_cmd1_state()
+    assert fireplace._published is published  # noqa: SLF001
+
+    changes = []
+    fireplace.subscribe(changes.append)
+    simulator.cmd2 = 0x03
+    await fireplace.update_ifc_cmd2_state()
+    await asyncio.sleep(0)
+    assert changes == [{"flame_height": 3}]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_reports_changed_fields() -> None:
+    """Test that subscribers receive one diff per update."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    changes = []
+    fireplace.subscribe(changes.append)
+    simulator.cmd1 = 0x31
+    simulator.cmd2 = 0x23
+    simulator.power = True
+
+    await fireplace.update_state()
+    await asyncio.sleep(0)
+    assert changes == [
+        {
+            "blower_speed": 2,
+            "bt_power": True,
+            "flame_height": 3,
+            "ifc_power": True,
+            "night_light_brightness": 3,
+        }
+    ]
+
+    # nothing changed, so nothing is reported
+    await fireplace.update_state()
+    await asyncio.sleep(0)
+    assert len(changes) == 1
+
+    await fireplace.set_flame_height(4)
+    await asyncio.sleep(0)
+    assert changes[-1] == {"flame_height": 4}
+
+
+@pytest.mark.asyncio
+async def test_subscribe_to_fields() -> None:
+    """Test that subscribers only receive the fields they are interested in."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    changes = []
+    unsubscribe = fireplace.subscribe(changes.append, fields={"flame_height"})
+
+    await fireplace.set_night_light_brightness(2)
+    await fireplace.set_flame_height(3)
+    await asyncio.sleep(0)
+    assert changes == [{"flame_height": 3}]
+
+    unsubscribe()
+    await fireplace.set_flame_height(2)
+    await asyncio.sleep(0)
+    assert len(changes) == 1
+
+    with pytest.raises(ValueError, match="Invalid state fields"):
+        fireplace.subscribe(changes.append, fields={"foo"})
+
+
+@pytest.mark.asyncio
+async def test_slow_operation_does_not_hold_back_notifications() -> None:
+    """Test that an operation is reported without waiting for concurrent ones."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(
+        simulator.ble_device, password="0000", pipeline_depth=2, response_timeout=0.05
+    )
+    simulator.attach(fireplace)
+    await fireplace.update_state()
+    changes = []
+    fireplace.subscribe(changes.append)
+    write_gatt_char = simulator.write_gatt_char
+
+    async def stalling_write(char, data, response=None):
+        if data[3] != EfireCommand.GET_TIMER:
+            await write_gatt_char(char, data, response)
+
+    simulator.write_gatt_char = stalling_write
+    slow = asyncio.create_task(fireplace.update_timer_state())
+    await asyncio.sleep(0)
+    await fireplace.set_night_light_brightness(2)
+    await asyncio.sleep(0)
+
+    assert changes == [{"night_light_brightness": 2}]
+    assert not slow.done()
+    with pytest.raises(CommandTimeoutError):
+        await slow
+
+
+@pytest.mark.asyncio
+async def test_subscriber_errors_are_contained(caplog) -> None:
+    """Test that a failing subscriber does not affect others."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    changes = []
+
+    def broken(_changes):
+        raise RuntimeError
+
+    fireplace.subscribe(broken)
+    fireplace.subscribe(changes.append)
+    await fireplace.set_night_light_brightness(3)
+    await asyncio.sleep(0)
+
+    assert changes == [{"night_light_brightness": 3}]
+    assert "Error in state subscriber" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_debounced_writes_share_one_write() -> None:
+    """Test that rapid IFC changes are sent as one write of the final state."""
+    simulator = SimulatedFireplace(latency=0.005)
+    features = FireplaceFeatures(blower=True)
+    fireplace = Fireplace(
+        simulator.ble_device, features, password="0000", write_debounce=0.02
+    )
+    simulator.attach(fireplace)
+    simulator.cmd2 = 0x03
+    await fireplace.update_state()
+    writes = simulator.write_count
+
+    heights = [1, 2, 3, 4, 5, 6, 5, 4, 3, 2]
+    results = await asyncio.gather(
+        *(fireplace.set_flame_height(height) for height in heights),
+        fireplace.set_blower_speed(4),
+    )
+
+    assert results == [True] * 11
+    assert simulator.write_count == writes + 1
+    assert simulator.cmd2 == 0x42
+    assert fireplace.state.flame_height == 2
+
+    # a change after the write was sent is written again
+    assert await fireplace.set_flame_height(3) is True
+    assert simulator.write_count == writes + 2
+    assert simulator.cmd2 == 0x43
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_debounced_write() -> None:
+    """Test that the shared write survives a cancelled caller."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000", write_debounce=0.01)
+    simulator.attach(fireplace)
+    fireplace.state.flame_height = 1
+
+    first = asyncio.create_task(fireplace.set_night_light_brightness(2))
+    second = asyncio.create_task(fireplace.set_night_light_brightness(3))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second is True
+    assert first.cancelled()
+    assert simulator.cmd1 == 0x30
+
+
+@pytest.mark.asyncio
+async def test_timer_counted_down_locally() -> None:
+    """Test that a running timer is only re-read when a resync is due."""
+    simulator = SimulatedFireplace()
+    features = FireplaceFeatures(timer=True)
+    fireplace = Fireplace(simulator.ble_device, features, password="0000")
+    simulator.attach(fireplace)
+    assert await fireplace.power_on() is True
+    assert await fireplace.set_timer(1, 30, enabled=True) is True
+    assert fireplace.state.time_left in {(1, 30, 0), (1, 29, 59)}
+
+    writes = simulator.write_count
+    await fireplace.update_state()
+    # the timer is not read, only CMD1, CMD2 and the power state
+    assert simulator.write_count == writes + 3
+
+    fireplace.state.start_countdown(time.monotonic() - 60)
+    assert fireplace.state.time_left in {(1, 29, 0), (1, 28, 59)}
+
+    # a countdown that ran out suggests drift and is read again
+    fireplace.state.start_countdown(time.monotonic() - 5400)
+    await fireplace.update_state()
+    assert simulator.write_count == writes + 7
+    assert fireplace.state.time_left[:2] in {(1, 30), (1, 29)}
+
+
+async def optimistic_fireplace(simulator):
+    """Return a fireplace in optimistic mode with its state read once."""
+    fireplace = Fireplace(simulator.ble_device, password="0000", optimistic=True)
+    simulator.attach(fireplace)
+    simulator.power = True
+    simulator.cmd2 = 0x03
+    await fireplace.update_state()
+    return fireplace
+
+
+@pytest.mark.asyncio
+async def test_optimistic_write_is_confirmed() -> None:
+    """Test that written fields are pending until they are read back."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    changes = []
+    fireplace.subscribe(changes.append)
+
+    assert await fireplace.set_flame_height(4) is True
+    await asyncio.sleep(0)
+    pending = QUERY_FIELDS[EfireCommand.GET_IFC_CMD2_STATE]
+    assert changes == [{"flame_height": 4, "pending": pending}]
+    assert fireplace.pending_fields == pending
+
+    await asyncio.sleep(0.03)
+    assert changes[-1] == {"pending": frozenset()}
+    assert not fireplace.pending_fields
+
+
+@pytest.mark.asyncio
+async def test_optimistic_write_is_rolled_back() -> None:
+    """Test that a value the fireplace did not take is corrected."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    changes = []
+    fireplace.subscribe(changes.append, ["flame_height"])
+
+    assert await fireplace.set_flame_height(4) is True
+    simulator.cmd2 = 0x02
+    await asyncio.sleep(0.03)
+
+    assert changes == [{"flame_height": 4}, {"flame_height": 2}]
+    assert fireplace.state.flame_height == 2
+
+
+@pytest.mark.asyncio
+async def test_optimistic_power_on_is_confirmed() -> None:
+    """Test that the flame height set by powering on is confirmed."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    await fireplace.power_off()
+    await asyncio.sleep(0.03)
+    assert not fireplace.pending_fields
+
+    assert await fireplace.power_on() is True
+    assert fireplace.pending_fields
+    await asyncio.sleep(0.03)
+
+    assert simulator.cmd2 == 0x06
+    assert fireplace.state.flame_height == 6
+    assert not fireplace.pending_fields
+
+
+@pytest.mark.asyncio
+async def test_failed_read_back_is_no_longer_pending() -> None:
+    """Test that fields are not left pending when their read back fails."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    changes = []
+    fireplace.subscribe(changes.append, ["pending"])
+    handle_command = simulator.handle_command
+
+    def failing_handler(command, parameter):
+        if command == EfireCommand.GET_IFC_CMD2_STATE:
+            simulator.simulate_disconnect()
+        return handle_command(command, parameter)
+
+    simulator.handle_command = failing_handler
+    assert await fireplace.set_flame_height(4) is True
+    await asyncio.sleep(0.03)
+
+    assert changes[-1] == {"pending": frozenset()}
+    assert not fireplace.pending_fields
+    assert not fireplace._written_states  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_read_back_overtaken_by_write() -> None:
+    """Test that a read back sent before a newer write is not applied."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    heights = []
+    fireplace.subscribe(
+        lambda changes: heights.append(changes["flame_height"]), ["flame_height"]
+    )
+
+    await fireplace.set_flame_height(4)
+    # the read back of the first write is queued behind the second write
+    await fireplace.set_flame_height(5)
+    await asyncio.sleep(0.05)
+
+    assert heights == [4, 5]
+    assert fireplace.state.flame_height == 5
+    assert not fireplace.pending_fields
+
+
+@pytest.mark.asyncio
+async def test_read_back_does_not_undo_unsent_change() -> None:
+    """Test that a read back leaves a change waiting for its write alone."""
+    simulator = SimulatedFireplace(latency=0.005)
+    fireplace = await optimistic_fireplace(simulator)
+    fireplace.write_debounce = 0.03
+
+    await fireplace.set_flame_height(4)
+    # the read back of the first write returns while this change is debounced
+    assert await fireplace.set_flame_height(5) is True
+    await asyncio.sleep(0.02)
+
+    assert simulator.cmd2 & 0x07 == 5
+    assert fireplace.state.flame_height == 5
+    assert not fireplace.pending_fields
@@ -0,0 +1,192 @@
+"""Tests for managing a fleet of fireplaces."""
+
+import asyncio
+import itertools
+
+import pytest
+
+from bonaparte import Fireplace, FireplaceFleet
+from bonaparte.exceptions import AuthError
+from bonaparte.testing import SimulatedFireplace
+
+
+def make_fleet(count, **kwargs):
+    """Create a fleet of fireplaces connected to simulators."""
+    simulators = [
+        SimulatedFireplace(f"00:00:00:00:00:{index:02x}", latency=0.02)
+        for index in range(count)
+    ]
+    fireplaces = []
+    for simulator in simulators:
+        fireplace = Fireplace(simulator.ble_device)
+        simulator.attach(fireplace)
+        fireplaces.append(fireplace)
+    return FireplaceFleet(fireplaces, **kwargs), simulators
+
+
+async def login(fireplace):
+    """Authenticate with the default password of the simulator."""
+    return await fireplace.authenticate("0000")
+
+
+def sample_simulators(simulators, sample):
+    """Record a sample of all simulators whenever one of them gets a request."""
+    samples = []
+    for simulator in simulators:
+        handle_command = simulator.handle_command
+
+        def recording_handler(command, parameter, handle_command=handle_command):
+            samples.append(sample(simulators))
+            return handle_command(command, parameter)
+
+        simulator.handle_command = recording_handler
+    return samples
+
+
+@pytest.mark.asyncio
+async def test_refresh_runs_concurrently() -> None:
+    """Test that the devices are refreshed at the same time."""
+    fleet, simulators = make_fleet(6, max_connections=6, connect_interval=0)
+    await fleet.execute(lambda fireplace: fireplace.authenticate("0000"))
+    simulators[2].cmd2 = 0x04
+    in_flight = sample_simulators(
+        simulators, lambda sims: sum(sim.in_flight for sim in sims)
+    )
+
+    result = await fleet.refresh()
+
+    # every other device had a request in flight while one was sent
+    assert max(in_flight) == 5
+    assert result.ok
+    assert set(result.results) == {
+        simulator.ble_device.address for simulator in simulators
+    }
+    assert fleet["00:00:00:00:00:02"].state.flame_height == 4
+
+
+@pytest.mark.asyncio
+async def test_connection_slots_and_stagger() -> None:
+    """Test that connection slots are limited and connects are spaced out."""
+    fleet, _ = make_fleet(4, max_connections=2, connect_interval=0.05)
+    active = 0
+    peak = 0
+    connect_times = []
+    loop = asyncio.get_running_loop()
+
+    async def action(fireplace):
+        nonlocal active, peak
+        connect_times.append(loop.time())
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.12)
+        active -= 1
+
+    result = await fleet.execute(action)
+
+    assert result.ok
+    assert peak == 2
+    gaps = [b - a for a, b in itertools.pairwise(connect_times)]
+    assert min(gaps) >= 0.04
+
+
+@pytest.mark.asyncio
+async def test_connections_hold_their_slots() -> None:
+    """Test that no more fireplaces stay connected than there are slots."""
+    fleet, simulators = make_fleet(4, max_connections=2, connect_interval=0)
+    connected = sample_simulators(
+        simulators, lambda sims: sum(sim.is_connected for sim in sims)
+    )
+
+    result = await fleet.execute(lambda fireplace: fireplace.authenticate("0000"))
+
+    assert result.ok
+    assert max(connected) == 2
+    assert fleet.connections == 2
+    assert sum(simulator.is_connected for simulator in simulators) == 2
+
+    # the fireplaces that are still connected are reused
+    fireplace = fleet["00:00:00:00:00:03"]
+    assert fireplace.is_connected
+    await fleet.execute(lambda fireplace: fireplace.query_mcu_version())
+    assert max(connected) == 2
+
+
+@pytest.mark.asyncio
+async def test_slots_are_not_held_up_by_disconnects() -> None:
+    """Test that slots are granted while an idle fireplace is disconnecting."""
+    fleet, _ = make_fleet(3, max_connections=2, connect_interval=0)
+    first, second, third = fleet
+    fleet.remove(third.address)
+    await fleet.execute(login)
+    # the first fireplace becomes the least recently used one
+    await fleet._run(second, login)  # noqa: SLF001
+    fleet.add(third)
+    disconnect = first.disconnect
+    disconnecting = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_disconnect():
+        disconnecting.set()
+        await release.wait()
+        await disconnect()
+
+    first.disconnect = slow_disconnect
+    task = asyncio.create_task(
+        fleet._run(third, login)  # noqa: SLF001
+    )
+    await disconnecting.wait()
+    # the connected fireplace is served while the other slot is being freed
+    async with asyncio.timeout(1):
+        await fleet._run(second, login)  # noqa: SLF001
+    release.set()
+    await task
+    assert fleet.connections == 2
+    assert not first.is_connected
+    assert third.is_connected
+
+
+@pytest.mark.asyncio
+async def test_removed_fireplace_frees_its_slot() -> None:
+    """Test that a fireplace removed from the fleet no longer holds a slot."""
+    fleet, simulators = make_fleet(2, max_connections=1, connect_interval=0)
+    first, second = fleet
+    fleet.remove(second.address)
+    await fleet.execute(login)
+    fleet.add(second)
+    fleet.remove(first.address)
+    assert fleet.connections == 0
+
+    await fleet.execute(login)
+    assert first.is_connected
+    assert fleet.connections == 1
+    assert all(simulator.is_connected for simulator in simulators)
+
+
+@pytest.mark.asyncio
+async def test_partial_failure() -> None:
+    """Test that failures are reported per device."""
+    fleet, simulators = make_fleet(3, connect_interval=0)
+    simulators[1].password = "9999"
+
+    await fleet.execute(lambda fireplace: fireplace.authenticate("0000"))
+    fleet["00:00:00:00:00:01"]._password = "0000"  # noqa: SLF001
+    result = await fleet.power_off()
+
+    assert not result.ok
+    assert set(result.results) == {"00:00:00:00:00:00", "00:00:00:00:00:02"}
+    assert isinstance(result.errors["00:00:00:00:00:01"], AuthError)
+
+
+def test_fleet_membership() -> None:
+    """Test adding and removing fireplaces."""
+    fleet, _ = make_fleet(2)
+    assert len(fleet) == 2
+
+    fireplace = fleet.remove("00:00:00:00:00:00")
+    assert len(fleet) == 1
+    assert list(fleet) == [fleet["00:00:00:00:00:01"]]
+    fleet.add(fireplace)
+    assert len(fleet) == 2
+
+    with pytest.raises(ValueError, match="at least one connection slot"):
+        FireplaceFleet(max_connections=0)
@@ -0,0 +1,121 @@
+"""Tests for idle disconnect policies."""
+
+import asyncio
+
+import pytest
+
+from bonaparte import device
+from bonaparte.const import EfireCommand
+from bonaparte.device import EfireDevice
+from bonaparte.keepalive import (
+    DISCONNECT_DELAY,
+    AdaptiveKeepAlive,
+    AlwaysConnected,
+    FixedKeepAlive,
+    KeepAlivePolicy,
+)
+from bonaparte.testing import SimulatedFireplace
+
+
+def test_fixed_keep_alive() -> None:
+    """Test the fixed idle timeout."""
+    assert FixedKeepAlive().idle_timeout() == DISCONNECT_DELAY
+    assert FixedKeepAlive(30).idle_timeout() == 30
+
+
+def test_policy_is_abstract() -> None:
+    """Test that a policy must provide the idle timeout."""
+    with pytest.raises(TypeError):
+        KeepAlivePolicy()  # type: ignore[abstract]
+    assert device.DISCONNECT_DELAY == DISCONNECT_DELAY
+
+
+def test_always_connected() -> None:
+    """Test that the connection is never released."""
+    assert AlwaysConnected().idle_timeout() is None
+
+
+def test_adaptive_keep_alive_frequent_use() -> None:
+    """Test that frequently used devices stay connected between uses."""
+    policy = AdaptiveKeepAlive(min_timeout=15, max_timeout=600, factor=1.5)
+    assert policy.idle_timeout() == DISCONNECT_DELAY
+
+    for now in (0, 1, 2, 202, 203, 403, 603):
+        policy.record_activity(now)
+
+    # bursts are ignored, the typical gap is 200 seconds
+    assert policy.idle_timeout() == 300
+
+
+def test_adaptive_keep_alive_idle_use() -> None:
+    """Test that rarely used devices release the connection quickly."""
+    policy = AdaptiveKeepAlive(min_timeout=15, max_timeout=600)
+
+    for now in (0, 3600, 7200, 10800):
+        policy.record_activity(now)
+
+    assert policy.idle_timeout() == 15
+
+
+@pytest.mark.asyncio
+async def test_idle_disconnect() -> None:
+    """Test that the device disconnects once the idle deadline has passed."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, keep_alive=FixedKeepAlive(0.05))
+    simulator.attach(device)
+
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    timer = device._disconnect_timer  # noqa: SLF001
+    await asyncio.sleep(0.03)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+    # activity moves the deadline without re-creating the timer
+    assert device._disconnect_timer is timer  # noqa: SLF001
+    await asyncio.sleep(0.04)
+    assert device.is_connected
+
+    await asyncio.sleep(0.03)
+    assert not device.is_connected
+    assert device._disconnect_timer is None  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_always_connected_device() -> None:
+    """Test that no idle disconnect is scheduled when always connected."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device, keep_alive=AlwaysConnected())
+    simulator.attach(device)
+
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+    assert device._disconnect_timer is None  # noqa: SLF001
+    assert device.is_connected
+
+
+class _RecordingKeepAlive(FixedKeepAlive):
+    """Fixed keep alive remembering the recorded activity."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.activity: list[float] = []
+
+    def record_activity(self, now: float) -> None:
+        """Remember the activity."""
+        self.activity.append(now)
+
+
+@pytest.mark.asyncio
+async def test_background_queries_are_not_recorded() -> None:
+    """Test that only user commands feed the keep alive policy."""
+    simulator = SimulatedFireplace()
+    keep_alive = _RecordingKeepAlive()
+    device = EfireDevice(simulator.ble_device, keep_alive=keep_alive)
+    simulator.attach(device)
+
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    assert device.is_connected
+    assert not keep_alive.activity
+
+    await device.execute_command(EfireCommand.SEND_PASSWORD, b"0000")
+    assert len(keep_alive.activity) == 1
+    await device.disconnect()
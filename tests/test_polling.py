@@ -0,0 +1,157 @@
+"""Tests for adaptive polling of the fireplace state."""
+
+import asyncio
+
+import pytest
+
+from bonaparte import Fireplace
+from bonaparte.polling import AdaptivePoller
+from bonaparte.testing import SimulatedFireplace
+
+
+@pytest.fixture
+def simulator():
+    """Create a simulated controller."""
+    return SimulatedFireplace()
+
+
+@pytest.fixture
+def fireplace(simulator):
+    """Create a fireplace attached to the simulator."""
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    return fireplace
+
+
+def counting_poller(fireplace, **kwargs):
+    """Create a poller that counts its polls."""
+    poller = AdaptivePoller(fireplace, **kwargs)
+    polls = []
+    poll = poller.poll
+
+    async def counted_poll():
+        polls.append(asyncio.get_running_loop().time())
+        await poll()
+
+    poller.poll = counted_poll
+    return poller, polls
+
+
+@pytest.mark.asyncio
+async def test_interval_backs_off_while_idle_and_off(fireplace) -> None:
+    """Test that an idle fireplace that is off is polled less and less often."""
+    poller = AdaptivePoller(fireplace, interval=10, max_interval=50, backoff=2)
+    intervals = []
+    for idle_polls in range(4):
+        poller._idle_polls = idle_polls  # noqa: SLF001
+        intervals.append(poller.next_interval())
+
+    assert intervals == [10, 20, 40, 50]
+
+
+@pytest.mark.asyncio
+async def test_interval_depends_on_state(fireplace) -> None:
+    """Test the interval of a fireplace that is on or controlled by the remote."""
+    poller = AdaptivePoller(fireplace, fast_interval=1, remote_interval=5, interval=10)
+    poller._idle_polls = 3  # noqa: SLF001
+
+    fireplace.state.bt_power = True
+    assert poller.next_interval() == 10
+
+    fireplace.state.remote_in_use = True
+    assert poller.next_interval() == 5
+
+    poller.notify_activity()
+    assert poller.next_interval() == 1
+    assert poller._idle_polls == 0  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_activity_expires(fireplace) -> None:
+    """Test that fast polling ends after the active period."""
+    poller = AdaptivePoller(fireplace, fast_interval=1, active_period=0.02)
+    poller.notify_activity()
+    assert poller.next_interval() == 1
+
+    await asyncio.sleep(0.03)
+    assert poller.next_interval() == poller._interval  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_write_triggers_fast_poll(fireplace, simulator) -> None:
+    """Test that a state change from a write wakes up a sleeping poller."""
+    poller, polls = counting_poller(fireplace, fast_interval=0.02, interval=10)
+    poller.start()
+    await asyncio.sleep(0.05)
+    assert len(polls) == 1
+
+    await fireplace.set_flame_height(4)
+    await asyncio.sleep(0.05)
+    await poller.stop()
+
+    assert len(polls) >= 2
+    assert polls[1] - polls[0] < 1
+    assert fireplace.state.flame_height == simulator.cmd2 & 0x07 == 4
+
+
+@pytest.mark.asyncio
+async def test_first_poll_is_not_activity(fireplace, simulator) -> None:
+    """Test that loading the initial state does not trigger fast polling."""
+    simulator.cmd2 = 0x03
+    poller, polls = counting_poller(fireplace, fast_interval=0.01, interval=10)
+    poller.start()
+    await asyncio.sleep(0.05)
+    await poller.stop()
+
+    assert fireplace.state.flame_height == 3
+    assert len(polls) == 1
+
+
+@pytest.mark.asyncio
+async def test_remote_usage_is_polled(fireplace, simulator) -> None:
+    """Test that use of the remote is picked up and shortens the interval."""
+    simulator.remote_in_use = True
+    poller = AdaptivePoller(fireplace, remote_interval=5, interval=10)
+    await poller.poll()
+
+    assert fireplace.state.remote_in_use is True
+    assert poller.next_interval() == 5
+
+    simulator.remote_in_use = False
+    await poller.poll()
+    assert fireplace.state.remote_in_use is False
+
+
+@pytest.mark.asyncio
+async def test_failed_poll_keeps_polling(fireplace, simulator) -> None:
+    """Test that the poller survives failing polls."""
+    simulator.password = "1234"
+    poller, polls = counting_poller(
+        fireplace, interval=0.01, max_interval=0.01, track_remote=False
+    )
+    poller.start()
+    await asyncio.sleep(0.05)
+
+    assert poller.is_running
+    assert len(polls) > 1
+
+    await poller.stop()
+    assert not poller.is_running
+    assert not fireplace._subscribers  # noqa: SLF001
+
+
+@pytest.mark.asyncio
+async def test_programming_error_stops_polling(fireplace) -> None:
+    """Test that errors other than failures to reach the fireplace propagate."""
+    poller = AdaptivePoller(fireplace, interval=0.01, max_interval=0.01)
+
+    async def broken_poll():
+        raise ZeroDivisionError
+
+    poller.poll = broken_poll
+    poller.start()
+    await asyncio.sleep(0.01)
+
+    assert not poller.is_running
+    with pytest.raises(ZeroDivisionError):
+        await poller.stop()
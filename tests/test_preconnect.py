@@ -0,0 +1,137 @@
+"""Tests for connecting to devices ahead of their use."""
+
+import asyncio
+from datetime import datetime, time
+
+from bleak.backends.scanner import AdvertisementData
+import pytest
+
+from bonaparte import Fireplace
+from bonaparte.const import EfireCommand
+from bonaparte.preconnect import (
+    PreconnectPolicy,
+    RecentActivityPreconnect,
+    ScheduledPreconnect,
+)
+from bonaparte.testing import SimulatedFireplace
+
+
+def advertise(fireplace, simulator):
+    """Pass an advertisement of the simulated fireplace."""
+    fireplace.set_ble_device_and_advertisement_data(
+        simulator.ble_device, AdvertisementData(None, {}, {}, [], None, -60, ())
+    )
+
+
+def test_policy_is_abstract() -> None:
+    """Test that a policy must decide when to connect."""
+    with pytest.raises(TypeError):
+        PreconnectPolicy()  # type: ignore[abstract]
+
+
+def test_recent_activity() -> None:
+    """Test that only recently used devices are connected ahead of use."""
+    policy = RecentActivityPreconnect(window=60)
+    assert not policy.should_connect(100)
+
+    policy.record_activity(100)
+    assert policy.should_connect(160)
+    assert not policy.should_connect(161)
+
+
+@pytest.mark.parametrize(
+    ("now", "expected"),
+    [
+        (time(6, 59), False),
+        (time(7, 0), True),
+        (time(8, 59), True),
+        (time(9, 0), False),
+        (time(22, 30), True),
+        (time(0, 30), True),
+        (time(1, 0), False),
+    ],
+)
+def test_schedule(now, expected) -> None:
+    """Test the daily periods of a schedule, including one past midnight."""
+    policy = ScheduledPreconnect(
+        [(time(7), time(9)), (time(22), time(1))],
+        clock=lambda: datetime.combine(datetime(2024, 1, 1), now),
+    )
+    assert policy.should_connect(0) is expected
+
+
+@pytest.mark.asyncio
+async def test_prepare_authenticates() -> None:
+    """Test that prepare connects and authenticates right away."""
+    simulator = SimulatedFireplace()
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+
+    await fireplace.prepare()
+
+    assert fireplace.is_connected
+    assert simulator.authenticated
+    writes = simulator.write_count
+    await fireplace.power_on()
+    assert simulator.write_count == writes + 1
+    await fireplace.disconnect()
+
+
+@pytest.mark.asyncio
+async def test_preconnect_on_advertisement() -> None:
+    """Test that a recently used fireplace is connected when seen again."""
+    simulator = SimulatedFireplace()
+    policy = RecentActivityPreconnect(window=0.2)
+    fireplace = Fireplace(simulator.ble_device, password="0000", preconnect=policy)
+    simulator.attach(fireplace)
+
+    advertise(fireplace, simulator)
+    await asyncio.sleep(0.01)
+    assert simulator.connect_count == 0
+
+    await fireplace.execute_command(EfireCommand.GET_POWER_STATE)
+    await fireplace.disconnect()
+    await asyncio.sleep(0.12)
+    advertise(fireplace, simulator)
+    await asyncio.sleep(0.01)
+    assert fireplace.is_connected
+    assert simulator.authenticated
+    assert simulator.connect_count == 2
+
+    # authenticating the connection made ahead of use is not use
+    await fireplace.disconnect()
+    await asyncio.sleep(0.12)
+    advertise(fireplace, simulator)
+    await asyncio.sleep(0.01)
+    assert not fireplace.is_connected
+
+
+@pytest.mark.asyncio
+async def test_failed_preconnect_releases_device() -> None:
+    """Test that a login that times out ahead of use does not block commands."""
+    simulator = SimulatedFireplace()
+    policy = RecentActivityPreconnect(window=1)
+    fireplace = Fireplace(
+        simulator.ble_device,
+        password="0000",
+        preconnect=policy,
+        response_timeout=0.02,
+    )
+    simulator.attach(fireplace)
+    await fireplace.execute_command(EfireCommand.GET_POWER_STATE)
+    await fireplace.disconnect()
+    write_gatt_char = simulator.write_gatt_char
+
+    async def lossy_write(char, data, response=None):
+        if data[3] != EfireCommand.SEND_PASSWORD:
+            await write_gatt_char(char, data, response)
+
+    simulator.write_gatt_char = lossy_write
+    advertise(fireplace, simulator)
+    await asyncio.sleep(0.05)
+    assert not fireplace.is_connected
+
+    simulator.write_gatt_char = write_gatt_char
+    async with asyncio.timeout(1):
+        await fireplace.power_on()
+    assert simulator.connect_count == 3
@@ -0,0 +1,65 @@
+"""Tests for the protocol-only import path."""
+
+from pathlib import Path
+import subprocess
+import sys
+
+import pytest
+
+import bonaparte
+from bonaparte import protocol
+from bonaparte.const import EfireCommand
+
+
+def run_isolated(code):
+    """Run code in a fresh interpreter in which bleak cannot be imported."""
+    blocker = (
+        "import sys\n"
+        f"sys.path.insert(0, {str(Path(bonaparte.__file__).parents[1])!r})\n"
+        "for name in ('bleak', 'bleak_retry_connector'):\n"
+        "    sys.modules[name] = None\n"
+    )
+    return subprocess.run(
+        [sys.executable, "-c", blocker + code],
+        capture_output=True,
+        check=False,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize(
+    "module",
+    ["bonaparte", "bonaparte.protocol", "bonaparte.capture", "bonaparte.state"],
+)
+def test_import_without_bleak(module) -> None:
+    """Test that the protocol modules do not need bleak."""
+    result = run_isolated(f"import {module}")
+    assert result.returncode == 0, result.stderr
+
+
+def test_protocol_does_not_load_asyncio() -> None:
+    """Test that the codec can be used without loading the async layer."""
+    result = run_isolated(
+        "import bonaparte.protocol\nassert 'asyncio' not in sys.modules"
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_bluetooth_layer_is_lazy() -> None:
+    """Test that the Bluetooth layer is only imported when it is used."""
+    result = run_isolated("import bonaparte\nbonaparte.Fireplace")
+    assert "ModuleNotFoundError" in result.stderr
+
+    assert bonaparte.Fireplace.__module__ == "bonaparte.fireplace"
+    assert "Fireplace" in dir(bonaparte)
+    with pytest.raises(AttributeError, match="no attribute 'Missing'"):
+        _ = bonaparte.Missing
+
+
+def test_protocol_round_trip() -> None:
+    """Test that the protocol module builds and splits messages."""
+    message = protocol.build_message(bytes([EfireCommand.GET_POWER_STATE]))
+    protocol.validate_message(message)
+    (frame,) = protocol.FrameReassembler().feed(message + message[:3])
+    assert frame.command == EfireCommand.GET_POWER_STATE
+    assert set(protocol.__all__) <= set(dir(protocol))
@@ -0,0 +1,115 @@
+"""Tests for recording and replaying device sessions."""
+
+import asyncio
+
+import pytest
+
+from bonaparte import Fireplace
+from bonaparte.const import EfireCommand
+from bonaparte.exceptions import CaptureFormatError, ReplayMismatchError
+from bonaparte.replay import (
+    EventKind,
+    RecordedExchange,
+    RecordedSession,
+    ReplayTransport,
+    SessionRecorder,
+    load_sessions,
+    read_events,
+)
+from bonaparte.testing import SimulatedFireplace
+from bonaparte.utils import build_message
+
+
+async def exercise(fireplace):
+    """Run a few commands and return the resulting flame height."""
+    await fireplace.set_flame_height(3)
+    await fireplace.update_state()
+    return fireplace.state.flame_height
+
+
+async def record(path):
+    """Record two sessions against the simulator, the first one dropped."""
+    simulator = SimulatedFireplace(latency=0.01)
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    with SessionRecorder(path) as recorder:
+        recorder.attach(fireplace)
+        await exercise(fireplace)
+        simulator.simulate_disconnect()
+        await fireplace.power_off()
+        await fireplace.disconnect()
+    return path
+
+
+@pytest.mark.asyncio
+async def test_recording(tmp_path) -> None:
+    """Test the events and sessions of a recording."""
+    recording = await record(tmp_path / "session.bin")
+    kinds = [kind for kind, _, _ in read_events(recording)]
+    assert kinds.count(EventKind.CONNECT) == 2
+    assert kinds.count(EventKind.WRITE) == kinds.count(EventKind.NOTIFY)
+    assert kinds.count(EventKind.DROP) == 1
+    assert kinds[-1] == EventKind.CLOSE
+
+    first, second = load_sessions(recording)
+    assert first.exchanges[0].request[3] == EfireCommand.SEND_PASSWORD
+    assert all(len(exchange.notifications) == 1 for exchange in first.exchanges)
+    assert first.exchanges[-1].dropped is not None
+    delay, response = first.exchanges[0].notifications[0]
+    assert delay >= 0.01
+    assert response[3] == EfireCommand.SEND_PASSWORD
+    assert second.exchanges[-1].dropped is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("time_scale", [0.0, 1.0])
+async def test_replay(tmp_path, time_scale) -> None:
+    """Test that a recording replays against a fresh device."""
+    recording = await record(tmp_path / "session.bin")
+    transport = ReplayTransport.load(recording, time_scale=time_scale)
+    fireplace = Fireplace(transport.ble_device, password="0000")
+    transport.attach(fireplace)
+
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    assert await exercise(fireplace) == 3
+    elapsed = loop.time() - start
+    await asyncio.sleep(0.05)
+    assert not fireplace.is_connected
+
+    assert await fireplace.power_off() is True
+    assert transport.remaining_sessions == 0
+    await fireplace.disconnect()
+
+    if time_scale:
+        # seven round trips of at least 10 ms
+        assert elapsed > 0.07
+    else:
+        assert elapsed < 0.05
+
+
+@pytest.mark.asyncio
+async def test_replay_mismatch() -> None:
+    """Test that requests missing from the recording are reported."""
+    request = build_message(bytes([EfireCommand.GET_POWER_STATE]))
+    response = build_message(bytes([EfireCommand.GET_POWER_STATE, 0xFF]), 0xBB)
+    session = RecordedSession(exchanges=[RecordedExchange(request, [(0.0, response)])])
+    transport = ReplayTransport([session], time_scale=0)
+    fireplace = Fireplace(transport.ble_device)
+    transport.attach(fireplace)
+
+    assert await fireplace.execute_command(EfireCommand.GET_POWER_STATE) == b"\xff"
+    with pytest.raises(ReplayMismatchError, match="No recorded exchange"):
+        await fireplace.execute_command(EfireCommand.GET_POWER_STATE)
+
+    await fireplace.disconnect()
+    with pytest.raises(ReplayMismatchError, match="No recorded session"):
+        await fireplace.execute_command(EfireCommand.GET_POWER_STATE)
+
+
+def test_read_events_invalid_file(tmp_path) -> None:
+    """Test that other files are rejected."""
+    path = tmp_path / "session.bin"
+    path.write_bytes(b"btsnoop\0")
+    with pytest.raises(CaptureFormatError):
+        list(read_events(path))
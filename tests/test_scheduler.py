@@ -0,0 +1,78 @@
+"""Tests for the priority scheduling of commands."""
+
+import asyncio
+
+import pytest
+
+from bonaparte.scheduler import CommandScheduler, Priority
+
+
+async def hold(scheduler, priority, name, order, delay=0.0):
+    """Hold a slot, recording the order in which slots were granted."""
+    async with scheduler.slot(priority):
+        order.append(name)
+        await asyncio.sleep(delay)
+
+
+@pytest.mark.asyncio
+async def test_user_commands_go_first() -> None:
+    """Test that user commands overtake queued background commands."""
+    scheduler = CommandScheduler()
+    order = []
+    tasks = [
+        asyncio.create_task(hold(scheduler, Priority.BACKGROUND, "poll", order, 0.01))
+    ]
+    await asyncio.sleep(0)
+    tasks.extend(
+        asyncio.create_task(hold(scheduler, priority, name, order))
+        for priority, name in [
+            (Priority.BACKGROUND, "first"),
+            (Priority.BACKGROUND, "second"),
+            (Priority.USER, "user"),
+        ]
+    )
+    await asyncio.sleep(0)
+    assert scheduler.locked()
+    assert scheduler.depth == 3
+
+    await asyncio.gather(*tasks)
+
+    assert order == ["poll", "user", "first", "second"]
+    assert scheduler.depth == 0
+    assert scheduler.metrics.max_depth == 3
+    assert scheduler.metrics.wait[Priority.BACKGROUND].count == 3
+    assert scheduler.metrics.wait[Priority.USER].count == 1
+    assert not scheduler.locked()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_gives_up_its_place() -> None:
+    """Test that a cancelled waiter neither blocks nor leaks a slot."""
+    scheduler = CommandScheduler()
+    order = []
+    holder = asyncio.create_task(hold(scheduler, Priority.USER, "holder", order, 0.01))
+    await asyncio.sleep(0)
+    cancelled = asyncio.create_task(hold(scheduler, Priority.USER, "cancelled", order))
+    waiting = asyncio.create_task(hold(scheduler, Priority.BACKGROUND, "poll", order))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.gather(holder, waiting, return_exceptions=True)
+
+    assert order == ["holder", "poll"]
+    assert scheduler.depth == 0
+    await asyncio.wait_for(scheduler.acquire(Priority.USER), 0.1)
+
+
+@pytest.mark.asyncio
+async def test_granted_slot_is_released_on_cancel() -> None:
+    """Test that a slot granted to a cancelled waiter is passed on."""
+    scheduler = CommandScheduler()
+    await scheduler.acquire(Priority.USER)
+    waiter = asyncio.create_task(scheduler.acquire(Priority.USER))
+    await asyncio.sleep(0)
+    scheduler.release()
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert not scheduler.locked()
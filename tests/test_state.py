@@ -0,0 +1,137 @@
+"""Tests for the packed fireplace state."""
+
+import copy
+import dataclasses
+import time
+
+import pytest
+
+from bonaparte.const import LedMode
+from bonaparte.parser import parse_ifc_cmd1_state, parse_ifc_cmd2_state
+from bonaparte.state import PACKED_SIZE, STATE_FIELDS, FireplaceState
+
+
+def test_ifc_bytes_are_stored_raw() -> None:
+    """Test that the IFC fields use the layout of the controller bytes."""
+    state = FireplaceState()
+    (
+        state.ifc_power,
+        state.thermostat,
+        state.night_light_brightness,
+        state.pilot,
+    ) = parse_ifc_cmd1_state(bytes([0x00, 0xB5]))
+    (
+        state.flame_height,
+        state.blower_speed,
+        state.aux,
+        state.split_flow,
+    ) = parse_ifc_cmd2_state(bytes([0x00, 0xBC]))
+
+    assert state.packed[:2] == bytes([0xB5, 0xBC])
+    assert state.night_light_brightness == 3
+    assert state.flame_height == 4
+    assert state.blower_speed == 3
+    assert state.aux is True
+    assert state.split_flow is True
+
+
+def test_fields_round_trip() -> None:
+    """Test that every field reads back what was stored."""
+    state = FireplaceState()
+    state.bt_power = True
+    state.led = True
+    state.led_color = (1, 2, 3)
+    state.led_mode = LedMode.EMBER_BED
+    state.time_left = (1, 30, 59)
+    state.timer = True
+    state.remote_in_use = True
+    state.mcu_version = "1.14"
+
+    restored = FireplaceState(packed=state.packed, mcu_version="1.14")
+
+    assert restored == state
+    assert len(state.packed) == PACKED_SIZE
+    assert restored.led_color == (1, 2, 3)
+    assert restored.led_mode == LedMode.EMBER_BED
+    assert restored.time_left == (1, 30, 59)
+    assert restored.bt_power is restored.led is restored.timer is True
+    assert restored.flame_height == 0
+
+
+def test_out_of_range_values() -> None:
+    """Test that values that do not fit their bits are rejected."""
+    state = FireplaceState()
+    with pytest.raises(ValueError, match="out of range for flame_height"):
+        state.flame_height = 8
+    with pytest.raises(ValueError, match="must be 10 bytes"):
+        FireplaceState(packed=bytes(3))
+
+
+def test_snapshots() -> None:
+    """Test that snapshots are independent, equal and hashable."""
+    state = FireplaceState()
+    state.flame_height = 2
+    snapshot = state.copy()
+
+    assert snapshot == state
+    assert copy.copy(state) == state
+    assert copy.copy(snapshot) is snapshot
+    assert hash(snapshot) == hash(state.copy())
+    assert len({snapshot, state.copy()}) == 1
+    with pytest.raises(TypeError, match="unhashable"):
+        hash(state)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.flame_height = 3
+
+    state.flame_height = 3
+    assert snapshot.flame_height == 2
+    assert snapshot != state
+    assert state.changes(snapshot) == {"flame_height": 3}
+    assert snapshot.changes(snapshot.copy()) == {}
+
+    state.ble_version = "8"
+    assert state.changes(snapshot) == {"ble_version": "8", "flame_height": 3}
+
+
+def test_dataclass_api() -> None:
+    """Test that the fields can be listed and converted like a dataclass."""
+    state = FireplaceState()
+    state.flame_height = 3
+
+    assert {field.name for field in dataclasses.fields(state)} == set(STATE_FIELDS)
+    values = dataclasses.asdict(state)
+    assert values["flame_height"] == 3
+    assert values["time_left"] == (0, 0, 0)
+
+
+def test_countdown() -> None:
+    """Test that a timer reading is counted down locally."""
+    state = FireplaceState()
+    state.time_left = (1, 0, 5)
+    state.timer = True
+    state.start_countdown(time.monotonic() - 65.5)
+
+    assert state.time_left == (0, 59, 0)
+    assert state.counting_down
+    assert state.copy().time_left == (0, 59, 0)
+    # comparisons use the reading, not the countdown
+    assert state.packed[-3:] == bytes([1, 0, 5])
+
+    state.start_countdown(time.monotonic() - 7200)
+    assert state.time_left == (0, 0, 0)
+    assert not state.counting_down
+
+    state.start_countdown()
+    state.timer = False
+    assert state.time_left == (1, 0, 5)
+    state.timer = True
+    state.time_left = (0, 10, 0)
+    assert not state.counting_down
+
+
+def test_repr_lists_all_fields() -> None:
+    """Test the representation of the state."""
+    representation = repr(FireplaceState())
+
+    assert representation.startswith("FireplaceState(aux=False, ")
+    assert all(f"{name}=" in representation for name in STATE_FIELDS)
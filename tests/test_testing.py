@@ -0,0 +1,108 @@
+"""Tests for the simulated eFIRE controller."""
+
+import time
+
+import pytest
+
+from bonaparte import Fireplace, FireplaceFeatures
+from bonaparte.const import LedMode
+from bonaparte.testing import SimulatedFireplace
+
+
+@pytest.fixture
+def simulator():
+    """Create a simulated controller."""
+    return SimulatedFireplace(password="1234")
+
+
+@pytest.fixture
+def fireplace(simulator):
+    """Create a fireplace connected to the simulated controller."""
+    features = FireplaceFeatures(blower=True, led_lights=True, timer=True)
+    fireplace = Fireplace(simulator.ble_device, features)
+    simulator.attach(fireplace)
+    return fireplace
+
+
+@pytest.mark.asyncio
+async def test_authenticate(fireplace, simulator) -> None:
+    """Test authentication against the simulator."""
+    assert await fireplace.authenticate("0000") is False
+    assert await fireplace.authenticate("1234") is True
+    assert simulator.authenticated is True
+    assert simulator.connect_count == 1
+
+
+@pytest.mark.asyncio
+async def test_commands_round_trip(fireplace, simulator) -> None:
+    """Test that commands change simulator state and are read back."""
+    await fireplace.authenticate("1234")
+    assert await fireplace.power_on() is True
+    assert await fireplace.set_flame_height(3) is True
+    assert await fireplace.set_blower_speed(2) is True
+    assert await fireplace.set_night_light_brightness(4) is True
+    await fireplace.set_led_mode(LedMode.CYCLE, on=True)
+    assert await fireplace.led_on() is True
+    assert await fireplace.set_timer(1, 30, enabled=True) is True
+    assert simulator.cmd2 == 0x23
+
+    other = Fireplace(simulator.ble_device, fireplace.features)
+    simulator.attach(other)
+    await other.authenticate("1234")
+    await other.update_state()
+
+    assert other.state.bt_power is True
+    assert other.state.flame_height == 3
+    assert other.state.blower_speed == 2
+    assert other.state.night_light_brightness == 4
+    assert other.state.led is True
+    assert other.state.led_mode == LedMode.CYCLE
+    assert other.state.timer is True
+    assert other.state.time_left[0] == 1
+
+
+@pytest.mark.asyncio
+async def test_firmware_versions(fireplace) -> None:
+    """Test querying firmware versions from the simulator."""
+    fireplace._password = "1234"  # noqa: SLF001
+    await fireplace.update_firmware_version()
+
+    assert fireplace.state.mcu_version == "1.14"
+    assert fireplace.state.ble_version == "8"
+
+
+@pytest.mark.asyncio
+async def test_latency(fireplace, simulator) -> None:
+    """Test that responses are delivered after the configured latency."""
+    simulator.latency = 0.02
+    simulator.jitter = 0.005
+    await fireplace.authenticate("1234")
+
+    start = time.monotonic()
+    await fireplace.update_ifc_cmd2_state()
+    assert time.monotonic() - start >= 0.015
+
+
+@pytest.mark.asyncio
+async def test_disconnect_reconnects(fireplace, simulator) -> None:
+    """Test that a dropped connection is re-established on the next command."""
+    await fireplace.authenticate("1234")
+    simulator.simulate_disconnect()
+    assert fireplace._is_authenticated is False  # noqa: SLF001
+
+    await fireplace.set_flame_height(2)
+    assert simulator.connect_count == 2
+    assert simulator.cmd2 & 0x07 == 2
+    await fireplace.disconnect()
+    assert simulator.is_connected is False
+
+
+@pytest.mark.asyncio
+async def test_power_off_sends_parameter(fireplace, simulator) -> None:
+    """Test that powering off sends the zero power state parameter."""
+    await fireplace.authenticate("1234")
+    await fireplace.power_on()
+    assert simulator.power is True
+
+    assert await fireplace.power_off() is True
+    assert simulator.power is False
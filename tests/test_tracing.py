@@ -0,0 +1,171 @@
+"""Tests for command latency tracing."""
+
+import asyncio
+
+import pytest
+
+from bonaparte import Fireplace
+from bonaparte.const import EfireCommand
+from bonaparte.device import EfireDevice
+from bonaparte.exceptions import DisconnectedException
+from bonaparte.testing import SimulatedFireplace
+from bonaparte.tracing import (
+    STAGE_ATTEMPT,
+    STAGE_CONNECTED,
+    STAGE_ESTABLISHED,
+    STAGE_NOTIFYING,
+    STAGE_PREPARED,
+    STAGE_QUEUED,
+    STAGE_RESPONDED,
+    STAGE_TOTAL,
+    STAGE_WRITTEN,
+    CommandTrace,
+    CommandTracer,
+    Histogram,
+)
+
+
+@pytest.fixture
+def simulator():
+    """Create a simulated controller with some latency."""
+    return SimulatedFireplace(latency=0.01)
+
+
+@pytest.fixture
+def device(simulator):
+    """Create a device connected to the simulator."""
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+    return device
+
+
+@pytest.mark.asyncio
+async def test_stages_are_traced(device) -> None:
+    """Test that every stage of a command is recorded."""
+    traces = []
+    device.tracer = CommandTracer(span_hook=traces.append)
+
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+    cold, warm = traces
+    assert [stage for stage, _ in cold.stages] == [
+        STAGE_ESTABLISHED,
+        STAGE_NOTIFYING,
+        STAGE_PREPARED,
+        STAGE_CONNECTED,
+        STAGE_QUEUED,
+        STAGE_ATTEMPT,
+        STAGE_WRITTEN,
+        STAGE_RESPONDED,
+    ]
+    assert [stage for stage, _ in warm.stages] == [
+        STAGE_CONNECTED,
+        STAGE_QUEUED,
+        STAGE_ATTEMPT,
+        STAGE_WRITTEN,
+        STAGE_RESPONDED,
+    ]
+    assert cold.command == EfireCommand.GET_POWER_STATE
+    assert cold.attempts == 1
+    assert cold.error is None
+    assert cold.durations()[STAGE_ESTABLISHED] >= 0.009
+    assert warm.durations()[STAGE_RESPONDED] >= 0.009
+    stage_durations = warm.durations()
+    assert warm.duration == stage_durations.pop(STAGE_TOTAL)
+    assert sum(stage_durations.values()) <= warm.duration
+
+
+@pytest.mark.asyncio
+async def test_authenticated_connection_is_traced(simulator) -> None:
+    """Test that connecting and logging in are traced with the first command."""
+    fireplace = Fireplace(simulator.ble_device, password="0000")
+    simulator.attach(fireplace)
+    traces = []
+    fireplace.tracer = CommandTracer(span_hook=traces.append)
+
+    await fireplace.set_night_light_brightness(2)
+
+    login, *commands = traces
+    assert login.command == EfireCommand.SEND_PASSWORD
+    first = commands[0]
+    assert [stage for stage, _ in first.stages[:3]] == [
+        STAGE_ESTABLISHED,
+        STAGE_NOTIFYING,
+        STAGE_PREPARED,
+    ]
+    assert first.start < login.start
+    assert first.durations()[STAGE_PREPARED] >= 0.009
+    assert all(STAGE_ESTABLISHED not in dict(trace.stages) for trace in commands[1:])
+
+    # a warm command does not connect
+    traces.clear()
+    await fireplace.set_night_light_brightness(3)
+    assert all(STAGE_ESTABLISHED not in dict(trace.stages) for trace in traces)
+
+
+@pytest.mark.asyncio
+async def test_histograms(device) -> None:
+    """Test that stage durations are collected per command."""
+    tracer = CommandTracer()
+    device.tracer = tracer
+
+    for _ in range(3):
+        await device.execute_command(EfireCommand.GET_TIMER)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+    total = tracer.histograms[(EfireCommand.GET_TIMER, STAGE_TOTAL)]
+    assert total.count == 3
+    assert total.mean >= 0.009
+    assert tracer.histograms[(EfireCommand.GET_POWER_STATE, STAGE_TOTAL)].count == 1
+    assert (EfireCommand.GET_POWER_STATE, STAGE_ESTABLISHED) not in tracer.histograms
+
+
+@pytest.mark.asyncio
+async def test_failed_command_is_traced(device, simulator) -> None:
+    """Test that a failing command finishes its trace with the error."""
+    traces = []
+    device.tracer = CommandTracer(span_hook=traces.append)
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+    simulator.latency = 1
+
+    with pytest.raises(DisconnectedException):
+        await asyncio.gather(
+            device.execute_command(EfireCommand.GET_TIMER), disconnect_soon(simulator)
+        )
+
+    assert isinstance(traces[-1].error, DisconnectedException)
+    assert traces[-1].stages[-1][0] == STAGE_WRITTEN
+
+
+async def disconnect_soon(simulator):
+    """Drop the simulated connection after a short while."""
+    await asyncio.sleep(0.01)
+    simulator.simulate_disconnect()
+
+
+@pytest.mark.asyncio
+async def test_tracing_disabled_by_default(device) -> None:
+    """Test that no tracer is active unless enabled."""
+    assert device.tracer is None
+    await device.execute_command(EfireCommand.GET_POWER_STATE)
+
+
+def test_histogram_buckets() -> None:
+    """Test that durations are counted in the right buckets."""
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.add(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(2.65)
+
+
+def test_trace_durations_add_up_repeated_stages() -> None:
+    """Test that repeated stages accumulate their durations."""
+    trace = CommandTrace(0xE6, 0.0, [("attempt", 1.0), ("attempt", 3.0)], end=4.0)
+
+    assert trace.attempts == 2
+    assert trace.durations() == {"attempt": 3.0, "total": 4.0}
+    assert trace.duration == 4.0
@@ -1,8 +1,22 @@
 """Additional tests for utility functions."""
 
+from unittest.mock import patch
+
 import pytest
 
-from bonaparte.utils import build_message, checksum, checksum_message
+from bonaparte.const import QUERY_COMMANDS, RESPONSE_HEADER, EfireCommand, PowerState
+from bonaparte.device import EfireDevice
+from bonaparte.exceptions import EfireMessageValueError
+from bonaparte.testing import SimulatedFireplace
+from bonaparte.utils import (
+    FIXED_FRAMES,
+    Frame,
+    FrameReassembler,
+    build_message,
+    checksum,
+    checksum_message,
+    validate_message,
+)
 
 
 def test_checksum_empty() -> None:
@@ -161,3 +175,178 @@ def test_roundtrip_message_building() -> None:
 
     # The extracted payload should match original
     assert extracted_payload == original_payload
+
+
+def test_fixed_frames_match_built_messages() -> None:
+    """Test that every precomputed frame equals the built message."""
+    for payload, message in FIXED_FRAMES.items():
+        assert build_message(payload) == message
+
+
+def test_fixed_frames_cover_fixed_commands() -> None:
+    """Test that the frame table covers queries and finite set commands."""
+    assert FIXED_FRAMES[bytes([EfireCommand.GET_TIMER])] == bytes.fromhex(
+        "ab aa 03 e6 e5 55"
+    )
+    assert bytes([EfireCommand.SET_POWER, PowerState.ON]) in FIXED_FRAMES
+    assert bytes([EfireCommand.SET_IFC_CMD2, 0x00, 0xFF]) in FIXED_FRAMES
+    assert bytes([EfireCommand.SET_LED_MODE, 0x35]) in FIXED_FRAMES
+    assert bytes([EfireCommand.SEND_PASSWORD, 0x31]) not in FIXED_FRAMES
+    assert len(FIXED_FRAMES) == len(QUERY_COMMANDS) + 2 + 2 + 6 + 512
+
+    with pytest.raises(TypeError):
+        FIXED_FRAMES[b"\x00"] = b""  # type: ignore[index]
+
+
+@pytest.mark.asyncio
+async def test_execute_command_uses_fixed_frames() -> None:
+    """Test that fixed commands are sent without building the frame."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+
+    with patch("bonaparte.device.Frame.encode") as mock_build:
+        await device.execute_command(EfireCommand.SET_IFC_CMD2, b"\x00\x03")
+        await device.execute_command(EfireCommand.GET_IFC_CMD2_STATE)
+        mock_build.assert_not_called()
+
+    assert simulator.cmd2 == 0x03
+
+
+def test_reassembler_single_message() -> None:
+    """Test that a complete message is returned as is."""
+    reassembler = FrameReassembler()
+    message = bytes.fromhex("ab bb 04 c5 35 f4 55")
+
+    assert reassembler.feed(bytearray(message)) == [message]
+    assert len(reassembler) == 0
+
+
+def test_reassembler_fragmented_message() -> None:
+    """Test that a message split across notifications is reassembled."""
+    reassembler = FrameReassembler()
+    message = bytes.fromhex("ab bb 07 e6 14 0e 01 37 cd 55")
+
+    assert reassembler.feed(message[:1]) == []
+    assert reassembler.feed(message[1:4]) == []
+    assert reassembler.feed(message[4:]) == [message]
+    assert len(reassembler) == 0
+
+
+def test_reassembler_concatenated_messages() -> None:
+    """Test that several messages in one notification are split."""
+    reassembler = FrameReassembler()
+    first = bytes.fromhex("ab bb 04 c5 35 f4 55")
+    second = bytes.fromhex("ab bb 05 e3 00 01 e7 55")
+
+    assert reassembler.feed(first + second[:3]) == [first]
+    assert reassembler.feed(second[3:] + first) == [second, first]
+
+
+def test_reassembler_skips_garbage() -> None:
+    """Test that data outside of messages is discarded."""
+    reassembler = FrameReassembler()
+    message = bytes.fromhex("ab bb 04 c5 35 f4 55")
+
+    assert reassembler.feed(b"\x00\x01" + message + b"\x02") == [message]
+    assert len(reassembler) == 0
+
+
+def test_reassembler_resynchronizes_after_invalid_message() -> None:
+    """Test that an invalid message is reported and the stream recovers."""
+    invalid = []
+    reassembler = FrameReassembler(lambda message, ex: invalid.append(message))
+    truncated = bytes.fromhex("ab bb 07 e6 14 0e")
+    message = bytes.fromhex("ab bb 04 c5 35 f4 55")
+
+    assert reassembler.feed(truncated) == []
+    assert reassembler.feed(message) == [message]
+    assert invalid == [truncated + message[:4]]
+
+    reassembler.reset()
+    assert len(reassembler) == 0
+
+
+def test_reassembler_skips_header_with_impossible_length() -> None:
+    """Test that a stray header does not hold back the messages behind it."""
+    reassembler = FrameReassembler()
+    message = bytes.fromhex("ab bb 04 c5 35 f4 55")
+
+    assert reassembler.feed(b"\xab\xbb\xfe" + message) == [message]
+    assert reassembler.feed(b"\xab\xbb\x01" + message) == [message]
+    assert len(reassembler) == 0
+
+
+def test_frame_encode_matches_build_message() -> None:
+    """Test that encoded frames are identical to built messages."""
+    for payload in (
+        bytes([EfireCommand.GET_TIMER]),
+        bytes([EfireCommand.SET_LED_COLOR, 0xFF, 0x80, 0x00]),
+        bytes([EfireCommand.SEND_PASSWORD, *b"1234"]),
+    ):
+        frame = Frame.encode(payload[0], payload[1:])
+        assert frame == build_message(payload)
+        assert bytes(frame) == build_message(payload)
+        assert frame.command == payload[0]
+        assert frame.payload == payload[1:]
+        assert frame.checksum == build_message(payload)[-2]
+        validate_message(frame.view)
+
+
+def test_frame_encode_into_buffer() -> None:
+    """Test that frames can be encoded into a reused buffer."""
+    buffer = bytearray(16)
+    first = Frame.encode(EfireCommand.SET_TIMER, b"\x01\x1e\x01", buffer=buffer)
+    assert first.view.obj is buffer
+    assert first == build_message(bytes([EfireCommand.SET_TIMER, 1, 30, 1]))
+
+    second = Frame.encode(EfireCommand.GET_TIMER, buffer=buffer)
+    assert second == build_message(bytes([EfireCommand.GET_TIMER]))
+    assert len(second) == 6
+
+    with pytest.raises(EfireMessageValueError, match="Buffer too small"):
+        Frame.encode(EfireCommand.SEND_PASSWORD, bytes(11), buffer=buffer)
+
+
+def test_frame_from_bytes() -> None:
+    """Test wrapping a received message."""
+    message = bytearray.fromhex("ab bb 07 e6 14 0e 01 37 cd 55")
+    frame = Frame.from_bytes(message)
+
+    assert frame.view.obj is message
+    assert frame.message_type == RESPONSE_HEADER
+    assert frame.command == EfireCommand.GET_TIMER
+    assert frame.payload == bytes.fromhex("14 0e 01 37")
+    assert frame.view.readonly
+    assert str(frame) == "ab bb 07 e6 14 0e 01 37 cd 55"
+    assert hash(frame) == hash(bytes(message))
+    assert frame == Frame.from_bytes(bytes(message))
+
+    with pytest.raises(EfireMessageValueError, match="Invalid checksum"):
+        Frame.from_bytes(message[:-2] + b"\x00\x55")
+
+
+def test_reassembler_wraps_single_message_in_place() -> None:
+    """Test that a notification with one message is not copied."""
+    reassembler = FrameReassembler()
+    message = bytearray.fromhex("ab bb 04 c5 35 f4 55")
+
+    (frame,) = reassembler.feed(message)
+
+    assert frame.view.obj is message
+
+
+@pytest.mark.asyncio
+async def test_response_is_validated_once() -> None:
+    """Test that a response is only validated by the reassembler."""
+    simulator = SimulatedFireplace()
+    device = EfireDevice(simulator.ble_device)
+    simulator.attach(device)
+
+    with patch(
+        "bonaparte.utils.validate_message", wraps=validate_message
+    ) as mock_validate:
+        assert await device.execute_command(EfireCommand.GET_POWER_STATE) == bytes(
+            [PowerState.OFF]
+        )
+        mock_validate.assert_called_once()